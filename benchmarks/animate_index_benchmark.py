@@ -0,0 +1,99 @@
+"""
+Cost of recording progress in animate_album_art for many artworks: the previous
+full rewrite of index.json and mapping.properties after every artwork versus the
+journaled GenerationIndex and interval-flushed PropertiesFile.
+
+Each artwork is marked done in the index and mapped for --files-per-art audio files.
+The full rewrite grows quadratically, so it only runs for the first --legacy-artworks
+artworks, and its time for all artworks is extrapolated from that.
+
+Usage:
+  python benchmarks/animate_index_benchmark.py [--artworks 50000] [--legacy-artworks 2000] [--files-per-art 10]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from animate_album_art import GenerationIndex, PropertiesFile  # noqa: E402
+
+
+def digest(i: int) -> str:
+    return f'{i:064x}'
+
+
+def audio_files(i: int, per_art: int):
+    return [Path(f'/music/Artist {i % 500}/Album {i}/{track:02d} Track.mp3') for track in range(per_art)]
+
+
+def run_full_rewrites(root: Path, artworks: int, per_art: int) -> float:
+    """Previous behaviour: both files rewritten after every artwork."""
+    index_path = root / 'index.json'
+    props = PropertiesFile(root / 'mapping.properties')
+    data = {}
+    start = time.perf_counter()
+    for i in range(artworks):
+        data[digest(i)] = {'status': 'done', 'path': str(root / f'{digest(i)}.mp4')}
+        index_path.write_text(json.dumps(data, indent=2))
+        for audio_file in audio_files(i, per_art):
+            props.set(audio_file, audio_file.with_suffix('.mp4'))
+        props.save()
+    return time.perf_counter() - start
+
+
+def run_journaled(root: Path, artworks: int, per_art: int) -> float:
+    index = GenerationIndex(root)
+    props = PropertiesFile(root / 'mapping.properties', flush_interval=30.0)
+    start = time.perf_counter()
+    for i in range(artworks):
+        index.mark_done(digest(i), root / f'{digest(i)}.mp4')
+        for audio_file in audio_files(i, per_art):
+            props.set(audio_file, audio_file.with_suffix('.mp4'))
+        props.flush()
+    index.close()
+    props.save()
+    return time.perf_counter() - start
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--artworks', type=int, default=50000, help='Number of unique artworks')
+    p.add_argument('--legacy-artworks', type=int, default=2000, help='Artworks measured with full rewrites')
+    p.add_argument('--files-per-art', type=int, default=10, help='Audio files using each artwork')
+    args = p.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix='index_bench_'))
+    try:
+        legacy_dir = root / 'legacy'
+        legacy_dir.mkdir()
+        legacy = run_full_rewrites(legacy_dir, args.legacy_artworks, args.files_per_art)
+        # Bytes written per artwork grow linearly, so total time grows with the square of artworks
+        estimated = legacy * (args.artworks / args.legacy_artworks) ** 2
+
+        journaled_dir = root / 'journaled'
+        journaled_dir.mkdir()
+        journaled = run_journaled(journaled_dir, args.artworks, args.files_per_art)
+        index = GenerationIndex(journaled_dir)
+        assert len(index.data) == args.artworks
+        assert len(PropertiesFile(journaled_dir / 'mapping.properties').entries) == \
+            args.artworks * args.files_per_art
+
+        print(f'full rewrites:   {legacy:8.2f}s for {args.legacy_artworks} artworks, '
+              f'~{estimated:.0f}s estimated for {args.artworks}')
+        print(f'journal + flush: {journaled:8.2f}s for {args.artworks} artworks')
+        print(f'speedup: ~{estimated / journaled:.0f}x')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
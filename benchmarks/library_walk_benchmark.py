@@ -0,0 +1,81 @@
+"""
+Listing audio files of a generated library: the previous get_song_list, which ran
+glob2 '**/*.ext' for every extension (twice on Linux, for upper case extensions),
+versus the single-pass os.scandir walker.
+
+Usage:
+  python benchmarks/library_walk_benchmark.py [--files 100000] [--files-per-dir 12]
+"""
+
+import argparse
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import List
+
+import glob2
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from song_helper import audio_formats, iter_song_files  # noqa: E402
+
+# Extensions written to the generated tree, with some upper case ones and non audio files
+EXTENSIONS = ['mp3', 'flac', 'm4a', 'ogg', 'MP3', 'Flac', 'jpg', 'txt']
+
+
+def glob_song_list(path: str) -> List[str]:
+    """ get_song_list before the walker was introduced """
+    song_list = []
+    for ext in audio_formats:
+        song_list.extend(glob2.glob(os.path.join(path, '**/*.' + ext)))
+        if platform.system() == 'Linux':
+            song_list.extend(glob2.glob(os.path.join(path, '**/*.' + ext.upper())))
+    return song_list
+
+
+def build_tree(root: str, files: int, files_per_dir: int):
+    for file_no in range(files):
+        dir_no = file_no // files_per_dir
+        dir_path = os.path.join(root, f'artist{dir_no // 10}', f'album{dir_no % 10}')
+        if file_no % files_per_dir == 0:
+            os.makedirs(dir_path)
+        open(os.path.join(dir_path, f'{file_no}.{EXTENSIONS[file_no % len(EXTENSIONS)]}'), 'w').close()
+
+
+def measure(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--files', type=int, default=100000, help='Number of generated files')
+    p.add_argument('--files-per-dir', type=int, default=12)
+    args = p.parse_args()
+
+    root = tempfile.mkdtemp(prefix='walk_bench_')
+    try:
+        start = time.perf_counter()
+        build_tree(root, args.files, args.files_per_dir)
+        print(f'Generated {args.files} files in {time.perf_counter() - start:.1f}s under {root}')
+
+        walk_time, walked = measure(lambda: list(iter_song_files(root)))
+        first_time, _ = measure(lambda: next(iter_song_files(root)))
+        glob_time, globbed = measure(lambda: glob_song_list(root))
+
+        print(f'glob2 per extension: {glob_time:7.2f}s, {len(globbed)} songs ({len(set(globbed))} unique)')
+        print(f'single pass walker:  {walk_time:7.2f}s, {len(walked)} songs, first one after {first_time * 1000:.1f}ms')
+        print(f'speedup: {glob_time / walk_time:.1f}x')
+        assert set(globbed) == set(walked) and len(walked) == len(set(walked))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Start up cost of checking which songs already have a lyrics file in lyrico's lyrics_dir:
+the previous glob2 listing kept as a list (every check scans the list) versus
+Config.lyrics_file_exists (one walk into a set of normalized paths).
+
+Usage:
+  python benchmarks/lyrics_lookup_benchmark.py [--files 40000] [--songs 40000]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import glob2
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from lyrico.config import Config  # noqa: E402
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--files', type=int, default=40000, help='Number of existing lyrics files')
+    p.add_argument('--songs', type=int, default=40000, help='Number of songs checked')
+    args = p.parse_args()
+
+    root = tempfile.mkdtemp(prefix='lyrics_bench_')
+    try:
+        start = time.perf_counter()
+        for i in range(args.files):
+            open(os.path.join(root, f'Artist {i % 1000} - Title {i}.txt'), 'w').close()
+        print(f'Generated {args.files} lyrics files in {time.perf_counter() - start:.1f}s under {root}')
+        # Every second song has lyrics
+        songs = [os.path.join(root, f'Artist {i * 2 % 1000} - Title {i * 2}.txt') for i in range(args.songs)]
+
+        start = time.perf_counter()
+        files = glob2.glob(os.path.join(root, '**/*.txt'))
+        list_found = sum(1 for song in songs if song in files)
+        list_time = time.perf_counter() - start
+
+        Config.lyrics_dir = root
+        Config.lyric_files_in_dir = None
+        start = time.perf_counter()
+        set_found = sum(1 for song in songs if Config.lyrics_file_exists(song))
+        set_time = time.perf_counter() - start
+
+        assert list_found == set_found
+        print(f'glob2 + list lookups:  {list_time:7.2f}s, {list_found} songs with lyrics')
+        print(f'walk + set lookups:    {set_time:7.2f}s, case-insensitive: {Config.lyrics_dir_ignores_case}')
+        print(f'speedup: {list_time / set_time:.0f}x')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
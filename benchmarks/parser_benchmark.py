@@ -0,0 +1,75 @@
+"""
+Per-page parse time and peak memory of every installed HTML parser backend,
+over the pages stored in test_data/storage.
+
+For each backend two variants are measured:
+  full     - whole page parsed into a tree (what sources did before)
+  strained - only the lyrics region parsed, the way DarkLyrics.parse_album does it now
+
+Usage:
+  python benchmarks/parser_benchmark.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from lyrico.lyrico_sources import html_parser  # noqa: E402
+from sources.darklyrics import DarkLyrics  # noqa: E402
+
+PAGES_DIR = os.path.join(ROOT_DIR, 'test_data', 'storage')
+
+
+def load_pages():
+    # Only the stored album pages, sub directories hold Storage fixtures with placeholder text
+    pages = {}
+    for entry in os.scandir(PAGES_DIR):
+        if entry.is_file():
+            with open(entry.path, encoding='UTF-8') as f:
+                pages[entry.name] = f.read()
+    return pages
+
+
+def measure(func, repeat: int):
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--repeat', type=int, default=20, help='Parses per page and variant')
+    args = p.parse_args()
+
+    pages = load_pages()
+    print(f'{"page":<24} {"bytes":>7} {"backend":<12} {"variant":<9} {"ms/page":>9} {"peak KiB":>9}')
+    for name, html in sorted(pages.items()):
+        for backend in html_parser.available_backends():
+            variants = {
+                'full': lambda: html_parser.make_soup(html, backend=backend),
+                # New instance per call, so the parsed album cache does not hide the parsing cost
+                'strained': lambda: DarkLyrics().parse_album(html),
+            }
+            html_parser.set_parser_backend(backend)
+            for variant, func in variants.items():
+                elapsed, peak = measure(func, args.repeat)
+                print(f'{name:<24} {len(html):>7} {backend:<12} {variant:<9} '
+                      f'{elapsed * 1000:>9.2f} {peak / 1024:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
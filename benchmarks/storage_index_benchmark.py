@@ -0,0 +1,92 @@
+"""
+Storage.get_sources over a synthetic html cache tree: per-song os.walk of the
+album directory (previous implementation) versus the in-memory index built by
+one walk of the whole tree.
+
+Usage:
+  python benchmarks/storage_index_benchmark.py [--entries 50000] [--titles-per-album 12]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from song_data import SongData  # noqa: E402
+from storage import Storage  # noqa: E402
+
+
+def walk_get_sources(root: str, song_data: SongData) -> List[str]:
+    """ Storage.get_sources before the index was introduced """
+    result = []
+    album_path = os.path.join(root, song_data.artist, song_data.album)
+    title_path = os.path.join(root, song_data.artist, song_data.album, song_data.title)
+    for (curr_dir, _, filenames) in os.walk(album_path):
+        if album_path == curr_dir or title_path == curr_dir:
+            result.extend(filenames)
+    return result
+
+
+def build_tree(root: str, entries: int, titles_per_album: int) -> List[SongData]:
+    songs = []
+    albums = max(1, entries // titles_per_album)
+    for album_no in range(albums):
+        artist = f'artist{album_no // 10}'
+        album = f'album{album_no % 10}'
+        album_dir = os.path.join(root, artist, album)
+        os.makedirs(album_dir, exist_ok=True)
+        with open(os.path.join(album_dir, 'Dark_Lyrics'), 'w') as f:
+            f.write('album')
+        for title_no in range(titles_per_album):
+            title = f'title{title_no}'
+            title_dir = os.path.join(album_dir, title)
+            os.makedirs(title_dir)
+            with open(os.path.join(title_dir, 'Lyrics_Mode'), 'w') as f:
+                f.write('song')
+            songs.append(SongData(None, artist, album, title, None, 'mp3'))
+    return songs
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--entries', type=int, default=50000, help='Number of cached song pages')
+    p.add_argument('--titles-per-album', type=int, default=12)
+    args = p.parse_args()
+
+    root = tempfile.mkdtemp(prefix='storage_bench_')
+    try:
+        start = time.perf_counter()
+        songs = build_tree(root, args.entries, args.titles_per_album)
+        print(f'Generated {len(songs)} song entries in {time.perf_counter() - start:.1f}s under {root}')
+
+        start = time.perf_counter()
+        walked = [walk_get_sources(root, song) for song in songs]
+        walk_time = time.perf_counter() - start
+
+        storage = Storage(root)
+        start = time.perf_counter()
+        # First lookup builds the index
+        indexed = [storage.get_sources(songs[0])]
+        build_time = time.perf_counter() - start
+        indexed += [storage.get_sources(song) for song in songs[1:]]
+        index_time = time.perf_counter() - start
+
+        assert [sorted(s) for s in walked] == [sorted(s) for s in indexed]
+        print(f'os.walk per song:    {walk_time:6.2f}s ({walk_time / len(songs) * 1e6:7.1f} us/song)')
+        print(f'index build:         {build_time:6.2f}s (one walk of the whole tree)')
+        print(f'index lookups:       {index_time - build_time:6.2f}s '
+              f'({(index_time - build_time) / len(songs) * 1e6:7.1f} us/song)')
+        print(f'total speedup:       {walk_time / index_time:6.1f}x')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
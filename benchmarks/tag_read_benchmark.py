@@ -0,0 +1,116 @@
+"""
+Bytes read and wall time per file of get_song_data with mutagen (whole tag parsed)
+versus header-only reads (fast_tags), on art-heavy copies of the files in test_data/audio.
+
+Every file gets cover art of --art-kib KiB and lyrics. Bytes read are taken from
+/proc/self/io (rchar), so they are only reported on Linux.
+
+Usage:
+  python benchmarks/tag_read_benchmark.py [--files 200] [--art-kib 2048]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from mutagen.flac import FLAC, Picture
+from mutagen.id3 import APIC, ID3, USLT
+from mutagen.mp4 import MP4, MP4Cover
+from mutagen.oggvorbis import OggVorbis
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from song_helper import get_song_data  # noqa: E402
+
+AUDIO_DIR = os.path.join(ROOT_DIR, 'test_data', 'audio')
+FORMATS = ['mp3', 'm4a', 'flac', 'ogg']
+LYRICS = 'Some lyrics line\n' * 40
+
+
+def add_art(path: str, song_format: str, artwork: bytes):
+    if song_format == 'mp3':
+        tag = ID3(path)
+        tag.add(APIC(encoding=3, mime='image/jpeg', type=3, desc='cover', data=artwork))
+        tag.add(USLT(encoding=3, lang='eng', desc='', text=LYRICS))
+        tag.save()
+    elif song_format == 'm4a':
+        tag = MP4(path)
+        tag['covr'] = [MP4Cover(artwork, MP4Cover.FORMAT_JPEG)]
+        tag['\xa9lyr'] = LYRICS
+        tag.save()
+    elif song_format == 'flac':
+        tag = FLAC(path)
+        picture = Picture()
+        picture.type = 3
+        picture.mime = 'image/jpeg'
+        picture.data = artwork
+        tag.add_picture(picture)
+        tag['LYRICS'] = LYRICS
+        tag.save()
+    else:
+        # Vorbis comments keep artwork inside the comment packet, so it is read by both readers
+        tag = OggVorbis(path)
+        tag['LYRICS'] = LYRICS
+        tag.save()
+
+
+def build_files(root: str, song_format: str, count: int, art_kib: int) -> List[str]:
+    paths = []
+    artwork = os.urandom(art_kib * 1024)
+    for i in range(count):
+        path = os.path.join(root, f'{song_format}_{i}.{song_format}')
+        shutil.copy(os.path.join(AUDIO_DIR, 'song.' + song_format), path)
+        add_art(path, song_format, artwork)
+        paths.append(path)
+    return paths
+
+
+def bytes_read() -> Optional[int]:
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def measure(paths: List[str], header_only: bool):
+    before = bytes_read()
+    start = time.perf_counter()
+    for path in paths:
+        song_data = get_song_data(path, header_only=header_only)
+        assert song_data is not None and song_data.lyrics
+    elapsed = time.perf_counter() - start
+    after = bytes_read()
+    read = None if before is None else (after - before) / len(paths)
+    return elapsed / len(paths), read
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--files', type=int, default=200, help='Files per format')
+    p.add_argument('--art-kib', type=int, default=2048, help='Size of embedded cover art')
+    args = p.parse_args()
+
+    root = tempfile.mkdtemp(prefix='tag_bench_')
+    try:
+        print(f'{"format":<7} {"reader":<12} {"ms/file":>9} {"KiB read/file":>14}')
+        for song_format in FORMATS:
+            paths = build_files(root, song_format, args.files, args.art_kib)
+            for reader, header_only in (('mutagen', False), ('header-only', True)):
+                elapsed, read = measure(paths, header_only)
+                read = 'n/a' if read is None else f'{read / 1024:.1f}'
+                print(f'{song_format:<7} {reader:<12} {elapsed * 1000:>9.3f} {read:>14}')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
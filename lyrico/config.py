@@ -5,7 +5,6 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import os
-import glob2
 
 
 try:
@@ -21,6 +20,8 @@ except ImportError:
 
 from .helper import get_config_path
 from .helper import BadConfigError
+from .helper import iter_files
+from .helper import is_case_insensitive
 
 # Maintian a dict of lyrico actions to check target on update_lyrico_actions()
 # Also save the corresponding section in 
@@ -72,7 +73,11 @@ class Config():
 	save_to_tag = False
 
 	overwrite = False
+
+	# Set of normalized paths of lyrics files in 'lyrics_dir'.
+	# Built on first call to 'lyrics_file_exists', use that instead of reading this directly.
 	lyric_files_in_dir = None
+	lyrics_dir_ignores_case = False
 
 	# Flag to test if the config has been loaded
 	is_loaded = False
@@ -129,8 +134,8 @@ class Config():
 				not Config.az_lyrics and not Config.musix_match and not Config.lyricsmode) and check_config):
 				raise BadConfigError(3, 'Bad Config')
 
-			# Loading this with user config, we need to call the load_config only once at start.
-			Config.lyric_files_in_dir = glob2.glob(os.path.join(Config.lyrics_dir, '**/*.txt'))
+			# Existing lyrics files are listed lazily by 'lyrics_file_exists'
+			Config.lyric_files_in_dir = None
 
 			Config.is_loaded = True
 
@@ -169,6 +174,29 @@ class Config():
 			print('Unable to load config.')
 			print(e)
 
+	@staticmethod
+	def lyrics_file_exists(path):
+
+		"""
+			Check if a lyrics file exists in 'lyrics_dir'. All '.txt' files in 'lyrics_dir'
+			are listed once, on the first call, into a set of normalized paths.
+			Paths are case-folded when 'lyrics_dir' is on a case-insensitive filesystem.
+		"""
+
+		if Config.lyric_files_in_dir is None:
+			Config.lyrics_dir_ignores_case = is_case_insensitive(Config.lyrics_dir)
+			Config.lyric_files_in_dir = set(Config.normalize_path(file_path)
+				for file_path in iter_files(Config.lyrics_dir, ['txt']))
+		return Config.normalize_path(path) in Config.lyric_files_in_dir
+
+	@staticmethod
+	def normalize_path(path):
+		path = os.path.normcase(os.path.normpath(path))
+		if Config.lyrics_dir_ignores_case:
+			# str.casefold is not available in python27
+			path = path.casefold() if hasattr(path, 'casefold') else path.lower()
+		return path
+
 	@staticmethod
 	def set_dir(dir_type, path):
 
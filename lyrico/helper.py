@@ -47,4 +47,73 @@ def sanitize_data(s):
 	# remove double white-spaces or tabs if any
 	s = re.sub(r'\s+', ' ', s)
 
-	return s
\ No newline at end of file
+	return s
+
+def iter_audio_files(path, extensions, follow_symlinks=False, skip_hidden=True):
+
+	"""
+		Yield paths of all audio files under 'path' with one of the audio format 'extensions', see iter_files.
+	"""
+
+	return iter_files(path, extensions, follow_symlinks, skip_hidden)
+
+
+def iter_files(path, extensions, follow_symlinks=False, skip_hidden=True):
+
+	"""
+		Yield paths of all files under 'path' whose extension is in 'extensions'.
+		The tree is walked once and extensions are matched case-insensitively,
+		so ex. '.ogg' and '.OGG' files are found on every platform.
+
+		Files of a directory are yielded before its sub directories, both in name order.
+		Symlinked directories are only entered when 'follow_symlinks' is set (each real
+		directory once). Names starting with '.' are skipped when 'skip_hidden' is set.
+	"""
+
+	extensions = set('.' + ext.lower() for ext in extensions)
+	visited = set()
+	stack = [path]
+	while stack:
+		dir_path = stack.pop()
+		try:
+			if follow_symlinks:
+				stat = os.stat(dir_path)
+				if (stat.st_dev, stat.st_ino) in visited:
+					continue
+				visited.add((stat.st_dev, stat.st_ino))
+			with os.scandir(dir_path) as it:
+				entries = sorted(it, key=lambda entry: entry.name)
+		except OSError:
+			# Unreadable directories are skipped, like glob does
+			continue
+
+		sub_dirs = []
+		for entry in entries:
+			if skip_hidden and entry.name.startswith('.'):
+				continue
+			try:
+				if entry.is_dir(follow_symlinks=follow_symlinks):
+					sub_dirs.append(entry.path)
+				elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+					yield entry.path
+			except OSError:
+				continue
+
+		# Reversed, so sub directories are popped in name order
+		stack.extend(reversed(sub_dirs))
+
+
+def is_case_insensitive(path):
+
+	"""
+		Check if the filesystem holding directory 'path' ignores case of file names,
+		by looking the directory up with swapped case. Falls back to the platform
+		default when its name has no letters.
+	"""
+
+	path = os.path.abspath(path)
+	parent, name = os.path.split(path)
+	swapped = os.path.join(parent, name.swapcase())
+	if swapped == path or not os.path.isdir(path):
+		return os.path.normcase('A') == os.path.normcase('a')
+	return os.path.isdir(swapped) and os.path.samefile(path, swapped)
@@ -24,7 +24,7 @@ import platform
 from .docopt import docopt
 
 from .song import Song
-from .song_helper import get_song_list
+from .song_helper import iter_song_list
 from .config import Config
 
 # testpypi 0.6.0
@@ -103,10 +103,12 @@ def main():
 			# update class variable so that new setting is reflected across modules.
 			Config.source_dir = args['<source_dir>']
 				
-		song_list = [Song(song_path) for song_path in get_song_list(Config.source_dir)]
-		print(len(song_list), 'songs detected.')
-		print('Metadata extracted for', (str(Song.valid_metadata_count) + '/' + str(len(song_list))), 'songs.')
-		for song in song_list:
+		# Songs are read, downloaded and saved one at a time. Only a compact result
+		# is kept per song, so tags (with artwork) of the whole library are never in memory.
+		results = []
+		for song_path in iter_song_list(Config.source_dir):
+			song = Song(song_path)
+
 			# Only download lyrics if 'title' and 'artist' is present
 			# Error str is already present in song.error
 			if song.artist and song.title:
@@ -121,9 +123,14 @@ def main():
 				else:
 					print(song.path, 'was ignored.', song.error)
 
+			results.append(song.release())
+
+		print()
+		print(len(results), 'songs detected.')
+		print('Metadata extracted for', (str(Song.valid_metadata_count) + '/' + str(len(results))), 'songs.')
 
 		print('\nBuilding log...')
-		Song.log_results(song_list)
+		Song.log_results(results)
 		print('FINISHED')
 		
 		# Disable windows unicode console anyways
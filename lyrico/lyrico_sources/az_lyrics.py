@@ -23,12 +23,12 @@ from __future__ import unicode_literals
 
 import re
 import sys
-import requests
 
 from requests import ConnectionError, HTTPError, Timeout
-from bs4 import BeautifulSoup
 
 from .build_requests import get_lyrico_headers
+from .html_parser import make_soup
+from .http_session import http_get
 from .lyrics_helper import test_lyrics
 
 
@@ -92,7 +92,7 @@ def donwload_from_az_lyrics(song):
 	try:
 		print('\tTrying AZLyrics:', azlyrics_url)
 
-		res = requests.get(azlyrics_url, headers = request_headers)
+		res = http_get(azlyrics_url, headers = request_headers)
 		res.raise_for_status()
 		# 'requests' was guessing the encoding from azlyrics as ISO-8859-1.
 		# AZLyrics sends 'UTF-8' in its meta tag
@@ -110,7 +110,9 @@ def donwload_from_az_lyrics(song):
 	
 	# No exceptions raised and the HTML for lyrics was downloaded		
 	else:
-		soup = BeautifulSoup(res.text, 'html.parser')
+		# Parsing below relies on how 'html.parser' recovers from the broken <br> tag,
+		# so this page is always parsed whole with it regardless of selected backend.
+		soup = make_soup(res.text, backend='html.parser')
 		lyricsh = soup.find(class_='lyricsh')
 		siblings = lyricsh.find_next_siblings() if lyricsh else None
 
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+	Pluggable HTML parser backend shared by all lyrics sources.
+
+	Sources build their trees through 'make_soup' instead of calling BeautifulSoup
+	with a hard-coded 'html.parser'. The tree builder is selected once per run
+	with 'set_parser_backend' ('lxml' is several times faster than the pure python
+	'html.parser'). Sources also pass a SoupStrainer describing the only region they
+	need (e.g. the div holding lyrics), so the rest of the page never becomes a tree.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+
+DEFAULT_BACKEND = 'html.parser'
+
+# Backends in order of preference. 'html.parser' is always available.
+KNOWN_BACKENDS = ['lxml', 'html5lib', 'html.parser']
+
+parser_backend = DEFAULT_BACKEND
+
+
+def is_available(backend):
+	try:
+		BeautifulSoup('', backend)
+		return True
+	except FeatureNotFound:
+		return False
+
+
+def available_backends():
+	return [backend for backend in KNOWN_BACKENDS if is_available(backend)]
+
+
+def set_parser_backend(backend):
+
+	"""
+		Select tree builder used by 'make_soup'. Falls back to 'html.parser' when
+		the requested backend is not installed. Returns the backend actually used.
+	"""
+
+	global parser_backend
+	if is_available(backend):
+		parser_backend = backend
+	else:
+		print('HTML parser "%s" is not installed, using "%s".' % (backend, DEFAULT_BACKEND))
+		parser_backend = DEFAULT_BACKEND
+	return parser_backend
+
+
+def strainer(name=None, **attrs):
+
+	"""
+		Describe the only part of the page a source needs, ex. strainer('div', id='main').
+	"""
+
+	if 'class_' in attrs:
+		attrs['class'] = attrs.pop('class_')
+	return SoupStrainer(name, attrs)
+
+
+def make_soup(html, parse_only=None, backend=None):
+	return BeautifulSoup(html, backend or parser_backend, parse_only=parse_only)
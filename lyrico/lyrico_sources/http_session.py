@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+	Shared HTTP layer for all lyrics sources.
+
+	Every request goes through a pooled 'requests.Session' per host, so repeated
+	requests to the same site reuse the keep-alive connection instead of paying
+	a new TCP + TLS handshake. Sessions retry transient failures (connection errors,
+	429 and 5xx responses) with exponential backoff and honour the 'Retry-After'
+	header. All requests have a timeout, so a hung socket can not stall the run.
+
+	Validators of a response (ETag, Last-Modified) can be kept with a stored page,
+	so it can later be revalidated with a conditional request: an unchanged page
+	is answered with '304 Not Modified' and no body.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+	from urllib.parse import urlsplit
+except ImportError:
+	# Python27
+	from urlparse import urlsplit
+
+
+# Responses with these statuses are retried
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# (connect, read) timeouts in seconds
+timeout = (10, 30)
+
+# How many times a failed request is retried and base of the exponential backoff in seconds:
+# waits are backoff_factor * (2 ** (retry - 1)), unless server asks for more with 'Retry-After'.
+retries = 3
+backoff_factor = 2.0
+
+# Max keep-alive connections kept open per host
+pool_size = 4
+
+# Response headers kept with stored pages, by metadata key
+METADATA_HEADERS = (('etag', 'ETag'), ('last_modified', 'Last-Modified'), ('content_encoding', 'Content-Encoding'))
+
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+def configure(timeout=None, retries=None, backoff_factor=None, pool_size=None):
+
+	"""
+		Override default network settings. Already opened sessions are closed,
+		so new settings apply to all following requests.
+	"""
+
+	settings = globals()
+	for name, value in (('timeout', timeout), ('retries', retries),
+						('backoff_factor', backoff_factor), ('pool_size', pool_size)):
+		if value is not None:
+			settings[name] = value
+	close_sessions()
+
+
+def make_session():
+	retry = Retry(
+		total=retries,
+		connect=retries,
+		read=retries,
+		status=retries,
+		backoff_factor=backoff_factor,
+		status_forcelist=RETRY_STATUSES,
+		allowed_methods=frozenset(['GET', 'HEAD']),
+		respect_retry_after_header=True,
+		# Return the last response so callers can 'raise_for_status' as before
+		raise_on_status=False,
+	)
+	adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+	session = requests.Session()
+	session.mount('http://', adapter)
+	session.mount('https://', adapter)
+	return session
+
+
+def get_session(url):
+
+	"""
+		Returns the pooled session of the host 'url' points to.
+	"""
+
+	host = urlsplit(url).netloc.lower()
+	with sessions_lock:
+		session = sessions.get(host)
+		if session is None:
+			session = make_session()
+			sessions[host] = session
+		return session
+
+
+def http_get(url, headers=None, params=None, request_timeout=None):
+
+	"""
+		Drop-in replacement for 'requests.get' going through the pooled session of the host.
+	"""
+
+	session = get_session(url)
+	return session.get(url, headers=headers, params=params, timeout=request_timeout or timeout)
+
+
+def split_timeout():
+
+	"""
+		Returns (connect, read) timeouts, 'timeout' may also be a single number used for both.
+	"""
+
+	if isinstance(timeout, (tuple, list)):
+		return timeout[0], timeout[1]
+	return timeout, timeout
+
+
+def backoff_seconds(retry, retry_after=None):
+
+	"""
+		Wait before retry number 'retry' (starting at 1) of a failed request, same policy as
+		the sessions: 'Retry-After' (seconds or HTTP date) when the server sent it, otherwise
+		the exponential backoff.
+	"""
+
+	if retry_after:
+		try:
+			return max(0.0, float(retry_after))
+		except ValueError:
+			parsed = parsedate_tz(retry_after)
+			if parsed is not None:
+				return max(0.0, mktime_tz(parsed) - time.time())
+	return backoff_factor * (2 ** (retry - 1))
+
+
+def close_sessions():
+	with sessions_lock:
+		for session in sessions.values():
+			session.close()
+		sessions.clear()
+
+
+def response_metadata(headers):
+
+	"""
+		Returns validators and encoding of a response as a dict, 'headers' is the case-insensitive
+		header mapping of a requests or aiohttp response. Missing headers are left out.
+	"""
+
+	metadata = {}
+	for key, header in METADATA_HEADERS:
+		value = headers.get(header)
+		if value:
+			metadata[key] = value
+	return metadata
+
+
+def conditional_headers(metadata):
+
+	"""
+		Request headers asking the server to answer '304 Not Modified' when the page
+		stored with 'metadata' did not change.
+	"""
+
+	headers = {}
+	if metadata.get('etag'):
+		headers['If-None-Match'] = metadata['etag']
+	if metadata.get('last_modified'):
+		headers['If-Modified-Since'] = metadata['last_modified']
+	return headers
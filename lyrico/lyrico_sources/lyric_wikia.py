@@ -14,7 +14,6 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import sys
-import requests
 
 try:
 	from urllib.parse  import quote
@@ -23,9 +22,10 @@ except ImportError:
 	from urllib import quote
 
 from requests import ConnectionError, HTTPError, Timeout
-from bs4 import BeautifulSoup
 
 from .build_requests import get_lyrico_headers
+from .html_parser import make_soup, strainer
+from .http_session import http_get
 from .lyrics_helper import test_lyrics
 
 
@@ -33,6 +33,9 @@ from .lyrics_helper import test_lyrics
 # per lyrico operation and not a new profile per each download in an operation.
 request_headers = get_lyrico_headers()
 
+# Only the element holding lyrics is parsed
+lyrics_strainer = strainer(class_='lyricbox')
+
 
 def donwload_from_lyric_wikia(song):
 	
@@ -77,7 +80,7 @@ def donwload_from_lyric_wikia(song):
 	try:
 		print('\tTrying Lyric Wikia:', lyrics_wikia_url)
 
-		res = requests.get(lyrics_wikia_url, headers = request_headers)
+		res = http_get(lyrics_wikia_url, headers = request_headers)
 		res.raise_for_status()
 		
 	# Catch network errors
@@ -88,7 +91,7 @@ def donwload_from_lyric_wikia(song):
 	
 	# No exceptions raised and the HTML for lyrics page was fetched		
 	else:
-		soup = BeautifulSoup(res.text, 'html.parser')
+		soup = make_soup(res.text, lyrics_strainer)
 
 		# For lyrics.wikia, the lyrics are present in a div with class 'lyricbox'
 		lyricbox = soup.find(class_='lyricbox')
@@ -17,12 +17,12 @@ from __future__ import unicode_literals
 
 import re
 import json
-import requests
 
 from requests import ConnectionError, HTTPError, Timeout
-from bs4 import BeautifulSoup
 
 from .build_requests import get_lyrico_headers, get_lnm_api_key
+from .html_parser import make_soup, strainer
+from .http_session import http_get
 from .lyrics_helper import test_lyrics
 
 
@@ -31,6 +31,9 @@ base_lnm_url = 'http://api.lyricsnmusic.com/songs'
 # Defining these outside donwload_from_lnm function makes
 # random visitor per lyrico operation and not per each download in an operation
 request_headers = get_lyrico_headers()
+
+# Only the element holding lyrics is parsed
+lyrics_strainer = strainer(id='main')
 api_key = get_lnm_api_key()
 
 
@@ -62,7 +65,7 @@ def donwload_from_lnm(song):
 		print('\tTrying LYRICSnMUSIC...')
 		# On unable to find data, this request returns and empty list(JSON string)
 		# but with 200 success code
-		r_json = requests.get(base_lnm_url, params=data, headers = request_headers)
+		r_json = http_get(base_lnm_url, params=data, headers = request_headers)
 		# Raise HTTPError for bad requests
 		r_json.raise_for_status()
 
@@ -84,7 +87,7 @@ def donwload_from_lnm(song):
 		del request_headers['Content-type']
 
 		# make the second request for lyrics HTML page
-		r_html = requests.get(lyrics_url, headers = request_headers)
+		r_html = http_get(lyrics_url, headers = request_headers)
 		r_html.raise_for_status()
 
 	# Catch network errors
@@ -95,7 +98,7 @@ def donwload_from_lnm(song):
 	
 	# No exceptions raised and the HTML for lyrics page was fetched		
 	else:
-		soup = BeautifulSoup(r_html.text, 'html.parser')
+		soup = make_soup(r_html.text, lyrics_strainer)
 
 		# LYRICSnMUSIC pages hold lyrics in a <pre> tag contained in <div> with id='main'
 		main_div = soup.find(id="main")
@@ -18,7 +18,6 @@ from __future__ import unicode_literals
 
 import re
 import string
-import requests
 
 try:
 	from string  import ascii_lowercase as LOWERCASE_CHARS
@@ -27,9 +26,10 @@ except ImportError:
 	from string  import lowercase as LOWERCASE_CHARS
 
 from requests import ConnectionError, HTTPError, Timeout
-from bs4 import BeautifulSoup
 
 from .build_requests import get_lyrico_headers
+from .html_parser import make_soup, strainer
+from .http_session import http_get
 from .lyrics_helper import remove_accents, test_lyrics
 
 
@@ -37,6 +37,9 @@ from .lyrics_helper import remove_accents, test_lyrics
 # per lyrico operation and not a new profile per each download in an operation.
 request_headers = get_lyrico_headers()
 
+# Only the element holding lyrics is parsed
+lyrics_strainer = strainer(id='lyrics_text')
+
 # This correction mapping only is valid for top approx 3000 artists which LYRICSMODE
 # displays as lists.
 LYRICSMODE_CORRECTION = {
@@ -84,7 +87,7 @@ def donwload_from_lyricsmode(song=None):
 	try:
 		print('\tTrying LYRICSMODE:', lyricsmode_url)
 
-		res = requests.get(lyricsmode_url, headers = request_headers)
+		res = http_get(lyricsmode_url, headers = request_headers)
 		res.raise_for_status()
 		
 	# Catch network errors
@@ -95,7 +98,7 @@ def donwload_from_lyricsmode(song=None):
 	
 	# No exceptions raised and the HTML for lyrics page was fetched		
 	else:
-		soup = BeautifulSoup(res.text, 'html.parser')
+		soup = make_soup(res.text, lyrics_strainer)
 
 		# For lyricsmode, the lyrics are present in a div with id 'lyrics_text'
 		lyrics_text = soup.find(id='lyrics_text')
@@ -16,7 +16,6 @@ from __future__ import unicode_literals
 
 import re
 import sys
-import requests
 
 try:
 	from urllib.parse  import quote
@@ -25,15 +24,19 @@ except ImportError:
 	from urllib import quote
 
 from requests import ConnectionError, HTTPError, Timeout
-from bs4 import BeautifulSoup
 
 from .build_requests import get_lyrico_headers
+from .html_parser import make_soup, strainer
+from .http_session import http_get
 from .lyrics_helper import test_lyrics
 
 # Defining 'request_headers' outside donwload function makes a single profile
 # per lyrico operation and not a new profile per each download in an operation.
 request_headers = get_lyrico_headers()
 
+# Only the element holding lyrics is parsed
+lyrics_strainer = strainer(id='lyrics-html')
+
 
 def donwload_from_musix_match(song):
 	
@@ -73,7 +76,7 @@ def donwload_from_musix_match(song):
 	try:
 		print('\tTrying musixmatch:', mxm_url)
 
-		res = requests.get(mxm_url, headers = request_headers)
+		res = http_get(mxm_url, headers = request_headers)
 		res.raise_for_status()
 
 	# Catch network errors
@@ -84,7 +87,7 @@ def donwload_from_musix_match(song):
 	
 	# No exceptions raised and the HTML for lyrics page was fetched		
 	else:
-		soup = BeautifulSoup(res.text, 'html.parser')
+		soup = make_soup(res.text, lyrics_strainer)
 
 		# For lyrics.wikia, the lyrics are present in a span with id 'lyrics-html'
 		lyric_html = soup.find(id='lyrics-html')
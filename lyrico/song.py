@@ -36,6 +36,10 @@ if sys.version_info[0] < 3:
 class Song():
 	"""Container objects repersenting each song globbed from source_dir"""
 
+	# No per-instance __dict__, see also SongResult
+	__slots__ = ('path', 'tag', 'artist', 'title', 'album', 'format', 'lyrics_file_name', 'lyrics_file_path',
+		'lyrics_file_present', 'lyrics_tag_present', 'lyrics', 'saved_to_tag', 'saved_to_file', 'source', 'error')
+
 	# holds count for songs for valid metadata
 	valid_metadata_count = 0
 
@@ -244,13 +248,11 @@ class Song():
 			# Data is then saved accordingly to the settings.
 			return file_required or tag_required
 
-	def get_log_string(self):
+	def get_status(self):
 		"""
-		returns the log string of the song which is used in final log.
+		returns (file, tag) status of the song used in final log.
 
 		"""
-		template = '. \t{file}\t{tag}\t{source}\t\t{song}\t\t{error}\n'
-		log = {}
 
 		# file_status and tag each have 4 possible values
 			# 'Saved' - File or tag was saved successfully
@@ -279,24 +281,34 @@ class Song():
 					tag = 'Failed'
 		else:
 			tag = 'Ignored'
-		
-		# avoid exceptions raised for concatinating Unicode and None types
-		if self.artist and self.title:
-			log['song'] = self.artist + ' - ' + self.title
-		else:
-			log['song'] = self.path
 
-		log['error'] = self.error
+		return file_status, tag
 
-		log['file'] = file_status
-		log['tag'] = tag
-		log['source'] = self.source
+	def get_log_string(self):
+		"""
+		returns the log string of the song which is used in final log.
 
-		return template.format(**log)
+		"""
+		return SongResult(self).get_log_string()
+
+	def release(self):
+		"""
+		Drops the tag and downloaded lyrics once the song is saved and
+		returns the compact SongResult used to build the final log.
+
+		"""
+		result = SongResult(self)
+		self.tag = None
+		self.lyrics = None
+		return result
 
 	@staticmethod
 	def log_results(song_list):
 
+		"""
+			Write log.txt. 'song_list' holds SongResult (or Song) objects.
+		"""
+
 		try:
 			log_date = time.strftime("%H:%M:%S  %d/%m/%y")
 			log_file_name = 'log.txt'
@@ -388,3 +400,22 @@ class Song():
 			print('"lyrics_dir" does not exist. Please set "lyric_dir" to a folder which exists.')
 
 
+class SongResult():
+	"""Outcome of a processed song, all that is needed to log it after the Song is released"""
+
+	__slots__ = ('song', 'file', 'tag', 'source', 'error')
+
+	def __init__(self, song):
+		# avoid exceptions raised for concatinating Unicode and None types
+		if song.artist and song.title:
+			self.song = song.artist + ' - ' + song.title
+		else:
+			self.song = song.path
+
+		self.file, self.tag = song.get_status()
+		self.source = song.source
+		self.error = song.error
+
+	def get_log_string(self):
+		template = '. \t{file}\t{tag}\t{source}\t\t{song}\t\t{error}\n'
+		return template.format(file=self.file, tag=self.tag, source=self.source, song=self.song, error=self.error)
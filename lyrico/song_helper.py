@@ -9,8 +9,6 @@ from __future__ import unicode_literals
 
 import sys
 import os
-import glob2
-import platform
 
 try:
 	from urllib.parse  import quote
@@ -27,7 +25,7 @@ from mutagen.asf import ASF
 from mutagen import MutagenError
 
 from .config import Config
-from .helper import sanitize_data
+from .helper import sanitize_data, iter_audio_files
 from .audio_format_keys import FORMAT_KEYS
 
 
@@ -223,7 +221,7 @@ def get_song_data(path):
 
 
 	# check if lyrics file already exists in LYRICS_DIR
-	if lyrics_file_path in Config.lyric_files_in_dir:
+	if lyrics_file_path and Config.lyrics_file_exists(lyrics_file_path):
 		lyrics_file_present = True
 
 	# check if lyrics already embedded in tag
@@ -253,19 +251,10 @@ def get_song_list(path):
 		Valid audio formats are imported from settings module.
 		Also checks for any inner directories."""
 
-	song_list = []
+	return list(iter_song_list(path))
 
-	for ext in Config.audio_formats:
-		pattern = '**/*.' + ext
-		pattern_uppercase = '**/*.' + ext.upper()
+def iter_song_list(path):
 
-		song_list.extend(glob2.glob(os.path.join(path, pattern)))
+	""" Lazily yield paths of all valid audio files in dir located at path, see 'get_song_list'. """
 
-		# Windows is case-insensitive towards extensions. So the glob2 module detects
-		# ex. .ogg and .OGG as well. But in Linux the extensions are case-sensitive.
-
-		# Add detection for uppercase extensions
-		if platform.system() == 'Linux':
-			song_list.extend(glob2.glob(os.path.join(path, pattern_uppercase)))
-
-	return song_list
\ No newline at end of file
+	return iter_audio_files(path, Config.audio_formats)
@@ -22,12 +22,32 @@ Design notes
   Hardlinks share the same data on disk, so mirroring costs no extra
   space even though the same animation appears under many paths.
 
+- Scan: tags are read and cover art hashed on a process pool
+  (--scan-workers). Workers send back only (path, digest, mime, size);
+  cover bytes are read again from one of the files when that digest is
+  actually animated, so memory does not grow with the number of
+  unique covers.
+
+- Scan cache: <output_root>/.generated/art_cache.json remembers size,
+  mtime, digest and mime of every scanned file. Files whose size and
+  mtime did not change are not opened again, so re-running over an
+  unchanged library is a stat pass (--rescan reads everything).
+
 - Resume: a small JSON index at <output_root>/.generated/index.json
   tracks which hashes are already done, so re-running the script
   after an interruption skips completed work (unless --force).
+  Updates are appended to index.journal (JSON lines) and folded into
+  index.json every few thousand updates and at the end of the run.
+
+- Export pipeline: the model runs on the main thread; MP4 encoding
+  and hardlinking run on background threads fed through bounded
+  queues, so the model does not wait for ffmpeg or the disk. Time spent
+  in each stage is reported in the summary.
 
 - The properties file is rewritten from a merged in-memory dict each
-  run, so re-running is safe and idempotent.
+  run, so re-running is safe and idempotent. It is written at most
+  every --flush-interval seconds, and on exit, Ctrl+C or SIGTERM;
+  always through a temporary file renamed over the old one.
 
 Usage
 -----
@@ -45,15 +65,21 @@ See README.md for setup, VRAM tuning, and expected runtimes.
 from __future__ import annotations
 
 import argparse
+import contextlib
 import hashlib
 import json
 import logging
 import os
+import queue
 import shutil
+import signal
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional, Union
 
 # --- Optional progress bar -------------------------------------------------
 try:
@@ -88,17 +114,78 @@ class CoverArt:
 
 def extract_cover_art(path: Path) -> Optional[CoverArt]:
     """Extract the embedded cover art from an mp3/m4a/alac file, if present."""
-    suffix = path.suffix.lower()
     try:
-        if suffix == ".mp3":
-            return _extract_from_id3(path)
-        elif suffix in (".m4a", ".m4b", ".alac"):
-            return _extract_from_mp4(path)
+        return _read_cover_art(path)
     except Exception as exc:  # noqa: BLE001 - log and continue scanning
         log.warning("Failed reading tags from %s: %s", path, exc)
     return None
 
 
+def _read_cover_art(path: Path) -> Optional[CoverArt]:
+    """Like extract_cover_art, but raises when the tags can not be read."""
+    suffix = path.suffix.lower()
+    if suffix == ".mp3":
+        return _extract_from_id3(path)
+    elif suffix in (".m4a", ".m4b", ".alac"):
+        return _extract_from_mp4(path)
+    return None
+
+
+@dataclass(frozen=True)
+class ScannedArt:
+    """What the scan pass keeps of a file's cover art: everything but the image bytes."""
+    path: Path
+    digest: str
+    mime: str
+    size: int
+
+
+@dataclass(frozen=True)
+class ScanError:
+    """A file whose tags could not be read (locked file, network share hiccup). Never cached."""
+    path: Path
+    error: str
+
+
+def scan_cover_art(path: Path) -> Union[ScannedArt, ScanError, None]:
+    """Extract and hash the cover art of one file. Runs in scan worker processes."""
+    try:
+        art = _read_cover_art(path)
+    except Exception as exc:  # noqa: BLE001 - reported, the file is read again next run
+        log.warning("Failed reading tags from %s: %s", path, exc)
+        return ScanError(path=path, error=str(exc))
+    if art is None:
+        return None
+    return ScannedArt(path=path, digest=art.sha256, mime=art.mime, size=len(art.data))
+
+
+def scan_library(audio_files: Iterable[Path],
+                 workers: int) -> Iterator[tuple[Path, Union[ScannedArt, ScanError, None]]]:
+    """Yield (path, scanned art, scan error or None for no art) for every file, in input order."""
+    if workers <= 1:
+        for audio_file in audio_files:
+            yield audio_file, scan_cover_art(audio_file)
+        return
+    audio_files = list(audio_files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Chunks keep the per-file IPC overhead small, results still stream back in order
+        yield from zip(audio_files, pool.map(scan_cover_art, audio_files, chunksize=16))
+
+
+def load_cover_art(digest: str, audio_files: Iterable[Path]) -> Optional[CoverArt]:
+    """Read the cover art with this digest again from the first file that still has it."""
+    for audio_file in audio_files:
+        art = extract_cover_art(audio_file)
+        if art is None:
+            # Read errors are already logged by extract_cover_art
+            log.warning("No cover art could be read from %s anymore", audio_file)
+        elif art.sha256 == digest:
+            return art
+        else:
+            log.warning("Cover art of %s changed since the scan", audio_file)
+    return None
+
+
 def _extract_from_id3(path: Path) -> Optional[CoverArt]:
     from mutagen.id3 import ID3, APIC
     from mutagen.mp3 import MP3
@@ -162,37 +249,131 @@ def cache_path_for_hash(output_root: Path, digest: str) -> Path:
     return output_root / ".generated" / digest[:2] / f"{digest}.mp4"
 
 
+# =============================================================================
+# Scan cache (skip unchanged files)
+# =============================================================================
+
+class ArtScanCache:
+    """Scan results by path, valid while the file's size and mtime stay the same."""
+
+    def __init__(self, output_root: Path, enabled: bool = True):
+        self.path = output_root / ".generated" / "art_cache.json"
+        # path -> [size, mtime_ns, digest, mime, art size]; digest is None for files without art
+        self.data: dict[str, list] = {}
+        self.seen: dict[str, list] = {}
+        if enabled and self.path.exists():
+            try:
+                self.data = json.loads(self.path.read_text())
+            except Exception as exc:  # noqa: BLE001
+                log.warning("Could not read scan cache %s: %s", self.path, exc)
+
+    def lookup(self, audio_file: Path, st: os.stat_result) -> tuple[bool, Optional[ScannedArt]]:
+        """Returns (hit, cached art). A hit with None art is a file known to have no art."""
+        entry = self.data.get(str(audio_file))
+        if entry is None or entry[0] != st.st_size or entry[1] != st.st_mtime_ns:
+            return False, None
+        self.seen[str(audio_file)] = entry
+        size, mtime_ns, digest, mime, art_size = entry
+        if digest is None:
+            return True, None
+        return True, ScannedArt(path=audio_file, digest=digest, mime=mime, size=art_size)
+
+    def update(self, audio_file: Path, st: os.stat_result, art: Union[ScannedArt, ScanError, None]):
+        """Record a scan result, with the stat taken before the file was read. Scan errors are not recorded."""
+        if isinstance(art, ScanError):
+            return
+        if art is None:
+            entry = [st.st_size, st.st_mtime_ns, None, None, 0]
+        else:
+            entry = [st.st_size, st.st_mtime_ns, art.digest, art.mime, art.size]
+        self.seen[str(audio_file)] = entry
+
+    def save(self):
+        """Writes only files seen in this run, so removed files drop out."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.seen))
+        os.replace(tmp, self.path)
+
+
 # =============================================================================
 # Generation index (resume support)
 # =============================================================================
 
 class GenerationIndex:
-    """Tracks which content hashes have already been animated."""
+    """Tracks which content hashes have already been animated.
+
+    index.json is a snapshot; every update after it is appended to
+    index.journal, replayed on load. The journal is folded into a new
+    snapshot (written to a temp file and renamed) every `compact_every`
+    updates and by close(), so a run costs O(n) bytes written instead of
+    a full rewrite per artwork.
+    """
 
-    def __init__(self, output_root: Path):
+    def __init__(self, output_root: Path, compact_every: int = 5000):
         self.path = output_root / ".generated" / "index.json"
+        self.journal_path = self.path.with_name("index.journal")
+        self.compact_every = compact_every
         self.data: dict[str, dict] = {}
+        self._journal = None
+        self._journaled = 0
         if self.path.exists():
             try:
                 self.data = json.loads(self.path.read_text())
             except Exception as exc:  # noqa: BLE001
                 log.warning("Could not read existing index %s: %s", self.path, exc)
+        if self.journal_path.exists():
+            self._replay()
+
+    def _replay(self):
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    digest, entry = json.loads(line)
+                except ValueError:
+                    # Last line of an interrupted run may be cut short
+                    continue
+                self.data[digest] = entry
+                self._journaled += 1
 
     def is_done(self, digest: str, cache_file: Path) -> bool:
         entry = self.data.get(digest)
         return bool(entry) and entry.get("status") == "done" and cache_file.exists()
 
     def mark_done(self, digest: str, cache_file: Path):
-        self.data[digest] = {"status": "done", "path": str(cache_file)}
-        self.save()
+        self._update(digest, {"status": "done", "path": str(cache_file)})
 
     def mark_failed(self, digest: str, error: str):
-        self.data[digest] = {"status": "failed", "error": error}
-        self.save()
+        self._update(digest, {"status": "failed", "error": error})
+
+    def _update(self, digest: str, entry: dict):
+        self.data[digest] = entry
+        if self._journal is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal.write(json.dumps([digest, entry]) + "\n")
+        self._journal.flush()
+        self._journaled += 1
+        if self._journaled >= self.compact_every:
+            self.save()
 
     def save(self):
+        """Write a full snapshot and start a new journal."""
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self.path.write_text(json.dumps(self.data, indent=2))
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2))
+        os.replace(tmp, self.path)
+        # Entries of the journal are in the snapshot now, replaying them again would be harmless
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self._journaled = 0
+
+    def close(self):
+        if self._journaled or self._journal is not None:
+            self.save()
 
 
 # =============================================================================
@@ -209,9 +390,14 @@ def escape_properties_value(value: str) -> str:
 
 
 class PropertiesFile:
-    def __init__(self, path: Path):
+    """Mapping file kept in memory; set() only marks it dirty, flush() writes it every `flush_interval` seconds."""
+
+    def __init__(self, path: Path, flush_interval: float = 30.0):
         self.path = path
+        self.flush_interval = flush_interval
         self.entries: dict[str, str] = {}
+        self.dirty = False
+        self._flushed_at = time.monotonic()
         if path.exists():
             for line in path.read_text(encoding="utf-8").splitlines():
                 line = line.strip()
@@ -224,14 +410,44 @@ class PropertiesFile:
     def set(self, source_audio: Path, generated_mp4: Path):
         key = escape_properties_value(str(source_audio))
         value = escape_properties_value(str(generated_mp4))
-        self.entries[key] = value
+        if self.entries.get(key) != value:
+            self.entries[key] = value
+            self.dirty = True
+
+    def flush(self):
+        """Save if there are changes and the flush interval passed since the last save."""
+        if self.dirty and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.save()
 
     def save(self):
         self.path.parent.mkdir(parents=True, exist_ok=True)
         lines = ["# source_audio_file=generated_animation_file", "# auto-generated by animate_album_art.py"]
         for k, v in sorted(self.entries.items()):
             lines.append(f"{k}={v}")
-        self.path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        # A crash while writing leaves the previous file intact
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.dirty = False
+        self._flushed_at = time.monotonic()
+
+
+@contextlib.contextmanager
+def sigterm_as_exit():
+    """Turn SIGTERM into SystemExit, so `finally` blocks save progress like they do on Ctrl+C."""
+    def _exit(signum, frame):
+        raise SystemExit(128 + signum)
+
+    try:
+        previous = signal.signal(signal.SIGTERM, _exit)
+    except ValueError:
+        # Not the main thread, signals can not be handled here
+        yield
+        return
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
 
 
 # =============================================================================
@@ -239,7 +455,12 @@ class PropertiesFile:
 # =============================================================================
 
 class Animator:
-    """Lazily loads Stable Video Diffusion and animates a still image."""
+    """Lazily loads Stable Video Diffusion and animates still images.
+
+    Images are pushed through the pipeline `batch_size` at a time. A batch
+    that runs out of memory is retried at half the size, and the smaller
+    size is kept for the rest of the run.
+    """
 
     def __init__(
         self,
@@ -252,6 +473,7 @@ class Animator:
         noise_aug_strength: float,
         decode_chunk_size: int,
         seed: Optional[int],
+        batch_size: int = 1,
     ):
         self.model_id = model_id
         self.width = width
@@ -262,6 +484,7 @@ class Animator:
         self.noise_aug_strength = noise_aug_strength
         self.decode_chunk_size = decode_chunk_size
         self.seed = seed
+        self.batch_size = max(1, batch_size)
         self._pipe = None
 
     def _load(self):
@@ -303,21 +526,48 @@ class Animator:
     def animate(self, image_bytes: bytes) -> list:
         """Returns a list of PIL frames (square, cropped back from the
         padded canvas the model actually ran on)."""
-        import io
-        import torch
-        from PIL import Image
+        return self.animate_batch([image_bytes])[0]
 
+    def animate_batch(self, images: list[bytes]) -> list[list]:
+        """Returns one list of frames per image, in the order of `images`."""
         self._load()
 
-        src = Image.open(io.BytesIO(image_bytes))
-        canvas, offset, side = self._pad_square_to_canvas(src, self.width, self.height)
+        results: list[list] = []
+        start = 0
+        while start < len(images):
+            chunk = images[start:start + self.batch_size]
+            try:
+                results.extend(self._run_batch(chunk))
+            except Exception as exc:  # noqa: BLE001 - only out of memory is retried
+                if len(chunk) == 1 or not _is_out_of_memory(exc):
+                    raise
+                self.batch_size = max(1, len(chunk) // 2)
+                log.warning("Out of memory animating %d images at once, retrying %d at a time",
+                            len(chunk), self.batch_size)
+                _free_gpu_memory()
+                continue
+            start += len(chunk)
+        return results
+
+    def _run_batch(self, images: list[bytes]) -> list[list]:
+        import io
+        from PIL import Image
+
+        canvases, crops = [], []
+        for image_bytes in images:
+            src = Image.open(io.BytesIO(image_bytes))
+            canvas, (ox, oy), side = self._pad_square_to_canvas(src, self.width, self.height)
+            canvases.append(canvas)
+            crops.append((ox, oy, ox + side, oy + side))
 
         generator = None
         if self.seed is not None:
-            generator = torch.manual_seed(self.seed)
+            import torch
+            # One generator per image, so an image gets the same noise whatever batch it is in
+            generator = [torch.Generator().manual_seed(self.seed) for _ in images]
 
         result = self._pipe(
-            canvas,
+            canvases,
             height=self.height,
             width=self.width,
             num_frames=self.num_frames,
@@ -326,11 +576,21 @@ class Animator:
             noise_aug_strength=self.noise_aug_strength,
             generator=generator,
         )
-        frames = result.frames[0]
+        return [[f.crop(box) for f in frames] for frames, box in zip(result.frames, crops)]
 
-        ox, oy = offset
-        cropped = [f.crop((ox, oy, ox + side, oy + side)) for f in frames]
-        return cropped
+
+def _is_out_of_memory(exc: Exception) -> bool:
+    # torch.cuda.OutOfMemoryError is a RuntimeError saying "CUDA out of memory"
+    return isinstance(exc, MemoryError) or "out of memory" in str(exc).lower()
+
+
+def _free_gpu_memory():
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
 
 
 def add_boomerang(frames: list) -> list:
@@ -348,6 +608,98 @@ def export_mp4(frames: list, dest: Path, fps: int):
     export_to_video(frames, str(dest), fps=fps)
 
 
+# =============================================================================
+# Export pipeline (encode + mirror off the model thread)
+# =============================================================================
+
+class ExportStages:
+    """Encode and mirror stages running behind the generation stage.
+
+    generation (caller) -> encode queue -> encode workers -> mirror queue -> mirror thread
+
+    Both queues are bounded: generation only blocks when `encode_backlog`
+    animations are waiting to be encoded, which also caps how many frame
+    lists are held in memory. `encode` returns the written file, or None
+    when it failed, in which case nothing is mirrored. Errors raised by the
+    callbacks are logged and the stage goes on with the next item, so a
+    producer is never left blocked on a queue nobody drains.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[str, list], Optional[Path]],
+        mirror: Callable[[str, Path], None],
+        encode_workers: int = 1,
+        encode_backlog: int = 2,
+        mirror_backlog: int = 64,
+    ):
+        self._encode = encode
+        self._mirror = mirror
+        self._encode_queue: queue.Queue = queue.Queue(max(1, encode_backlog))
+        self._mirror_queue: queue.Queue = queue.Queue(max(1, mirror_backlog))
+        self._encoders = [threading.Thread(target=self._encode_loop, name=f"encode-{i}", daemon=True)
+                          for i in range(max(1, encode_workers))]
+        self._mirrorer = threading.Thread(target=self._mirror_loop, name="mirror", daemon=True)
+        self._lock = threading.Lock()
+        self.encode_seconds = 0.0
+        self.mirror_seconds = 0.0
+        # Time the generation stage waited for room in the encode queue
+        self.blocked_seconds = 0.0
+
+    def start(self) -> "ExportStages":
+        for thread in self._encoders:
+            thread.start()
+        self._mirrorer.start()
+        return self
+
+    def encode(self, digest: str, frames: list):
+        started = time.perf_counter()
+        self._encode_queue.put((digest, frames))
+        self.blocked_seconds += time.perf_counter() - started
+
+    def mirror(self, digest: str, cache_file: Path):
+        """Mirror an animation that already exists, without encoding it."""
+        self._mirror_queue.put((digest, cache_file))
+
+    def close(self):
+        """Wait until everything queued is encoded and mirrored."""
+        for _ in self._encoders:
+            self._encode_queue.put(None)
+        for thread in self._encoders:
+            thread.join()
+        self._mirror_queue.put(None)
+        self._mirrorer.join()
+
+    def _encode_loop(self):
+        while True:
+            item = self._encode_queue.get()
+            if item is None:
+                return
+            digest, frames = item
+            started = time.perf_counter()
+            try:
+                cache_file = self._encode(digest, frames)
+            except Exception as exc:  # noqa: BLE001 - keep draining the queue
+                log.error("Encode stage failed for hash %s: %s", digest, exc)
+                cache_file = None
+            with self._lock:
+                self.encode_seconds += time.perf_counter() - started
+            if cache_file is not None:
+                self._mirror_queue.put((digest, cache_file))
+
+    def _mirror_loop(self):
+        while True:
+            item = self._mirror_queue.get()
+            if item is None:
+                return
+            started = time.perf_counter()
+            try:
+                self._mirror(*item)
+            except Exception as exc:  # noqa: BLE001 - keep draining the queue
+                log.error("Mirror stage failed for hash %s: %s", item[0], exc)
+            self.mirror_seconds += time.perf_counter() - started
+
+
 # =============================================================================
 # Main
 # =============================================================================
@@ -361,6 +713,14 @@ class Stats:
     skipped_existing: int = 0
     failed: int = 0
     linked: int = 0
+    art_cache_hits: int = 0
+    art_extracted: int = 0
+    unreadable: int = 0
+    # Seconds spent in each stage of the animation pass
+    generate_seconds: float = 0.0
+    generate_blocked_seconds: float = 0.0
+    encode_seconds: float = 0.0
+    mirror_seconds: float = 0.0
 
 
 def parse_args(argv=None) -> argparse.Namespace:
@@ -380,6 +740,12 @@ def parse_args(argv=None) -> argparse.Namespace:
     p.add_argument("--noise-aug-strength", type=float, default=0.02, help="Higher = more deviation from source image")
     p.add_argument("--decode-chunk-size", type=int, default=2, help="Lower uses less VRAM during frame decoding")
     p.add_argument("--seed", type=int, default=None, help="Fix a seed for reproducible animations")
+    p.add_argument("--batch-size", type=int, default=1,
+                   help="Artworks animated together in one pipeline call; halved automatically on out of memory")
+    p.add_argument("--encode-workers", type=int, default=1,
+                   help="Threads encoding MP4s while the model animates the next artworks")
+    p.add_argument("--encode-backlog", type=int, default=2,
+                   help="Animations waiting for encoding before the model waits (each holds all its frames in memory)")
     p.add_argument("--boomerang", dest="boomerang", action="store_true", default=True,
                    help="Play forward then reverse for a seamless loop (default: on)")
     p.add_argument("--no-boomerang", dest="boomerang", action="store_false")
@@ -387,6 +753,12 @@ def parse_args(argv=None) -> argparse.Namespace:
     p.add_argument("--force", action="store_true", help="Regenerate even if a cached animation already exists")
     p.add_argument("--dry-run", action="store_true", help="Only scan and report; do not load the model or generate anything")
     p.add_argument("--limit", type=int, default=None, help="Only process the first N unique artworks (useful for testing)")
+    p.add_argument("--scan-workers", type=int, default=os.cpu_count() or 1,
+                   help="Processes reading tags and hashing cover art (default: number of CPUs, 1 scans in-process)")
+    p.add_argument("--rescan", action="store_true",
+                   help="Read every file again, ignoring the scan cache of previous runs")
+    p.add_argument("--flush-interval", type=float, default=30.0,
+                   help="Seconds between writes of the properties file (it is always written at exit)")
     return p.parse_args(argv)
 
 
@@ -403,7 +775,7 @@ def main(argv=None) -> int:
     output_dir.mkdir(parents=True, exist_ok=True)
 
     stats = Stats()
-    props = PropertiesFile(properties_path)
+    props = PropertiesFile(properties_path, args.flush_interval)
     index = GenerationIndex(output_dir)
 
     # ---- Pass 1: scan & group by content hash ----
@@ -411,21 +783,49 @@ def main(argv=None) -> int:
     stats.audio_files = len(audio_files)
     log.info("Found %d audio files under %s", stats.audio_files, source_dir)
 
+    # Unchanged files come from the scan cache, only the rest is read
+    art_cache = ArtScanCache(output_dir, enabled=not args.rescan)
+    scanned: dict[Path, Union[ScannedArt, ScanError, None]] = {}
+    to_scan: dict[Path, os.stat_result] = {}
+    for audio_file in audio_files:
+        st = audio_file.stat()
+        hit, art = art_cache.lookup(audio_file, st)
+        if hit:
+            scanned[audio_file] = art
+            stats.art_cache_hits += 1
+        else:
+            to_scan[audio_file] = st
+
+    scan = scan_library(to_scan, args.scan_workers)
+    for audio_file, art in tqdm(scan, desc="Scanning tags", total=len(to_scan)):
+        art_cache.update(audio_file, to_scan[audio_file], art)
+        stats.art_extracted += 1
+        if isinstance(art, ScanError):
+            stats.unreadable += 1
+        scanned[audio_file] = art
+    art_cache.save()
+    log.info("%d files unchanged since the last scan, %d read", stats.art_cache_hits, stats.art_extracted)
+
     by_hash: dict[str, list[Path]] = {}
-    art_by_hash: dict[str, CoverArt] = {}
+    unique_art_bytes = 0
 
-    for audio_file in tqdm(audio_files, desc="Scanning tags"):
-        art = extract_cover_art(audio_file)
+    for audio_file in audio_files:
+        art = scanned[audio_file]
+        if isinstance(art, ScanError):
+            # Left out of this run, the file is read again next run
+            continue
         if art is None:
             stats.no_art += 1
             continue
-        by_hash.setdefault(art.sha256, []).append(audio_file)
-        art_by_hash.setdefault(art.sha256, art)
+        if art.digest not in by_hash:
+            unique_art_bytes += art.size
+        by_hash.setdefault(art.digest, []).append(audio_file)
 
     stats.unique_art = len(by_hash)
     log.info(
-        "%d files have embedded art (%d unique images, %d have no art)",
-        stats.audio_files - stats.no_art, stats.unique_art, stats.no_art,
+        "%d files have embedded art (%d unique images, %.1f MiB, %d have no art, %d unreadable)",
+        stats.audio_files - stats.no_art - stats.unreadable, stats.unique_art, unique_art_bytes / 2 ** 20,
+        stats.no_art, stats.unreadable,
     )
 
     if args.dry_run:
@@ -443,42 +843,108 @@ def main(argv=None) -> int:
         noise_aug_strength=args.noise_aug_strength,
         decode_chunk_size=args.decode_chunk_size,
         seed=args.seed,
+        batch_size=args.batch_size,
     )
 
     hashes = list(by_hash.keys())
     if args.limit:
         hashes = hashes[: args.limit]
 
-    for digest in tqdm(hashes, desc="Animating unique artworks"):
-        cache_file = cache_path_for_hash(output_dir, digest)
+    # Index, properties and stats are updated from the generation, encode and mirror stages
+    lock = threading.Lock()
 
-        if not args.force and index.is_done(digest, cache_file):
-            stats.skipped_existing += 1
-        else:
-            try:
-                frames = animator.animate(art_by_hash[digest].data)
-                if args.boomerang:
-                    frames = add_boomerang(frames)
-                export_mp4(frames, cache_file, fps=args.fps)
-                index.mark_done(digest, cache_file)
-                stats.generated += 1
-            except Exception as exc:  # noqa: BLE001
-                log.error("Failed to animate hash %s: %s", digest, exc)
-                index.mark_failed(digest, str(exc))
-                stats.failed += 1
-                continue
-
-        # Link into every mirrored location that uses this artwork
+    def link_mirrors(digest: str, cache_file: Path):
+        """Link into every mirrored location that uses this artwork. Runs on the mirror thread."""
         for audio_file in by_hash[digest]:
             dest = mirrored_output_path(output_dir, source_dir, audio_file)
             try:
                 link_or_copy(cache_file, dest)
-                props.set(audio_file, dest)
-                stats.linked += 1
+                with lock:
+                    props.set(audio_file, dest)
+                    stats.linked += 1
             except Exception as exc:  # noqa: BLE001
                 log.error("Failed to link %s -> %s: %s", cache_file, dest, exc)
+        with lock:
+            props.flush()  # periodic save so a crash mid-run doesn't lose much progress
 
-        props.save()  # incremental save so a crash mid-run doesn't lose progress
+    def fail(digest: str, exc: Exception):
+        log.error("Failed to animate hash %s: %s", digest, exc)
+        with lock:
+            index.mark_failed(digest, str(exc))
+            stats.failed += 1
+
+    def encode(digest: str, frames: list) -> Optional[Path]:
+        """Runs on encode threads."""
+        cache_file = cache_path_for_hash(output_dir, digest)
+        try:
+            if args.boomerang:
+                frames = add_boomerang(frames)
+            export_mp4(frames, cache_file, fps=args.fps)
+        except Exception as exc:  # noqa: BLE001
+            fail(digest, exc)
+            return None
+        with lock:
+            index.mark_done(digest, cache_file)
+            stats.generated += 1
+        return cache_file
+
+    export = ExportStages(encode, link_mirrors, args.encode_workers, args.encode_backlog)
+
+    def animate_pending(digests: list[str]):
+        arts: dict[str, CoverArt] = {}
+        for digest in digests:
+            art = load_cover_art(digest, by_hash[digest])
+            if art is None:
+                fail(digest, Exception("no file has this cover art anymore"))
+            else:
+                arts[digest] = art
+        if not arts:
+            return
+        started = time.perf_counter()
+        try:
+            batch_frames = animator.animate_batch([art.data for art in arts.values()])
+        except Exception as exc:  # noqa: BLE001
+            # Only this call, the one by one retries below count their own time
+            stats.generate_seconds += time.perf_counter() - started
+            if len(arts) == 1:
+                fail(next(iter(arts)), exc)
+                return
+            # One bad image should not fail the others of its batch
+            log.warning("Batch of %d artworks failed (%s), animating them one by one", len(arts), exc)
+            for digest in arts:
+                animate_pending([digest])
+            return
+        stats.generate_seconds += time.perf_counter() - started
+
+        for digest, frames in zip(arts, batch_frames):
+            export.encode(digest, frames)
+
+    with sigterm_as_exit():
+        export.start()
+        try:
+            pending: list[str] = []
+            for digest in tqdm(hashes, desc="Animating unique artworks"):
+                cache_file = cache_path_for_hash(output_dir, digest)
+
+                with lock:
+                    done = not args.force and index.is_done(digest, cache_file)
+                if done:
+                    stats.skipped_existing += 1
+                    export.mirror(digest, cache_file)
+                else:
+                    pending.append(digest)
+                    if len(pending) >= animator.batch_size:
+                        animate_pending(pending)
+                        pending = []
+            if pending:
+                animate_pending(pending)
+        finally:
+            export.close()
+            index.close()
+            props.save()
+            stats.generate_blocked_seconds = export.blocked_seconds
+            stats.encode_seconds = export.encode_seconds
+            stats.mirror_seconds = export.mirror_seconds
 
     _print_summary(stats)
     log.info("Properties file written to %s", properties_path)
@@ -488,10 +954,17 @@ def main(argv=None) -> int:
 def _print_summary(stats: Stats):
     log.info(
         "Summary: %d audio files | %d without art | %d unique artworks | "
-        "%d generated | %d skipped (already done) | %d failed | %d mirrored links written",
+        "%d generated | %d skipped (already done) | %d failed | %d mirrored links written | "
+        "%d scan cache hits | %d files read (%d unreadable)",
         stats.audio_files, stats.no_art, stats.unique_art,
         stats.generated, stats.skipped_existing, stats.failed, stats.linked,
+        stats.art_cache_hits, stats.art_extracted, stats.unreadable,
     )
+    if stats.generate_seconds or stats.encode_seconds or stats.mirror_seconds:
+        log.info(
+            "Stages: generate %.1fs (%.1fs waiting for the encoder) | encode %.1fs | mirror %.1fs",
+            stats.generate_seconds, stats.generate_blocked_seconds, stats.encode_seconds, stats.mirror_seconds,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,372 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import stats
+from html_refresh import HtmlRefresher
+from lyrico.lyrico_sources import http_session
+from lyrico.lyrico_sources.http_session import RETRY_STATUSES, backoff_seconds, http_get, response_metadata
+from negative_cache import NO_LYRICS, NOT_FOUND, NegativeCache, failure_reason
+from scan_manifest import ScanManifest
+from scheduler import TokenBucket
+from song_data import SongData
+from song_helper import scan_song_data
+from source_ranking import SourceRanking
+from sources.helper import LruCache
+from sources.lyrics_source import LyricsSource
+from storage import Storage
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional, pooled requests sessions are used in worker threads instead
+    aiohttp = None
+
+log = logging.getLogger("async_pipeline")
+
+# Album page requests kept for tracks of the same album arriving later
+ALBUM_FETCHES_SIZE = 64
+
+
+class AsyncHttpClient:
+    """
+    Minimal aiohttp-style client: `await client.get(url, headers)` returns page text and
+    response metadata (see http_session.response_metadata), text is None for '304 Not Modified'.
+    Raises for HTTP errors. Uses aiohttp when it is installed, otherwise blocking
+    calls through the shared http session are moved to the given executor. Both follow
+    the timeouts and retry policy configured in http_session.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.__executor = executor
+        self.__session = None
+        self.bytes_received = 0
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]]) -> Tuple[Optional[str], Dict[str, str]]:
+        if aiohttp is not None:
+            if self.__session is None:
+                connect, read = http_session.split_timeout()
+                self.__session = aiohttp.ClientSession(
+                    timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read))
+            retry = 0
+            while True:
+                try:
+                    async with self.__session.get(url, headers=headers) as response:
+                        if response.status in RETRY_STATUSES and retry < http_session.retries:
+                            retry += 1
+                            wait = backoff_seconds(retry, response.headers.get('Retry-After'))
+                            log.info(f'\t{response.status} from {url}, retry {retry} in {wait:.1f}s')
+                            await asyncio.sleep(wait)
+                            continue
+                        response.raise_for_status()
+                        metadata = response_metadata(response.headers)
+                        if response.status == 304:
+                            return None, metadata
+                        text = await response.text()
+                        break
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if retry >= http_session.retries:
+                        raise
+                    retry += 1
+                    await asyncio.sleep(backoff_seconds(retry))
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.__executor, lambda: http_get(url, headers=headers))
+            response.raise_for_status()
+            metadata = response_metadata(response.headers)
+            if response.status_code == 304:
+                return None, metadata
+            text = response.text
+        self.bytes_received += len(text)
+        return text, metadata
+
+    async def close(self):
+        if self.__session is not None:
+            await self.__session.close()
+
+
+class PipelineStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.scanned = 0
+        self.queued = 0
+        self.found = 0
+        self.not_found = 0
+        self.embedded = 0
+        self.requests = 0
+        self.cached_html = 0
+        self.shared_album_pages = 0
+        self.bytes_received = 0
+
+    def log_summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        log.info("------------------------------")
+        log.info(f'Async pipeline finished in {elapsed:.1f}s')
+        log.info(f'\tScanned files: {self.scanned} ({self.scanned / elapsed:.2f}/s)')
+        log.info(f'\tSongs needing lyrics: {self.queued}, found: {self.found}, not found: {self.not_found}')
+        log.info(f'\tLyrics embedded: {self.embedded}')
+        log.info(f'\tHTTP requests: {self.requests} ({self.requests / elapsed:.2f}/s), '
+                 f'{self.bytes_received / 1024:.0f} KiB received')
+        log.info(f'\tPages served from html storage: {self.cached_html}')
+        log.info(f'\tAlbum pages shared with earlier tracks: {self.shared_album_pages}')
+        log.info(f'\tThroughput: {(self.found + self.not_found) / elapsed:.2f} songs/s')
+
+
+class AsyncPipeline:
+    """
+    Scan, fetch, parse and embed stages connected by bounded queues, so waiting for the network
+    overlaps with tag reading, html parsing and tag writing.
+
+    - scan: reads tags on a pool of `scan_workers` processes or threads like the threaded pipeline
+      (see song_helper.scan_song_data), skipping files unchanged since recorded in the scan manifest,
+      and queues songs that need lyrics
+    - fetch: `max_in_flight` workers, tries sources in order and stops on the first success.
+      At most `per_host` requests run against one source at a time and the source token bucket
+      is respected. Album sources are requested once per album, other tracks await that request.
+    - parse: extracts lyrics from fetched html and stores them
+    - embed: writes lyrics into the audio file
+    """
+
+    def __init__(self,
+                 lyrics_sources: List[LyricsSource],
+                 html_storage: Storage,
+                 lyrics_storage: Storage,
+                 buckets: Dict[str, TokenBucket],
+                 accept: Callable[[SongData], bool],
+                 embed: Optional[Callable[[SongData, str], None]],
+                 max_in_flight: int,
+                 per_host: int,
+                 queue_size: int = 64,
+                 parse_workers: int = 2,
+                 manifest: Optional[ScanManifest] = None,
+                 negative_cache: Optional[NegativeCache] = None,
+                 html_refresher: Optional[HtmlRefresher] = None,
+                 source_ranking: Optional[SourceRanking] = None,
+                 scan_workers: int = 2,
+                 scan_with_processes: bool = False,
+                 header_only: bool = False):
+        self.lyrics_sources = lyrics_sources
+        self.html_storage = html_storage
+        self.lyrics_storage = lyrics_storage
+        self.buckets = buckets
+        self.accept = accept
+        self.embed = embed
+        self.max_in_flight = max_in_flight
+        self.per_host = per_host
+        self.queue_size = queue_size
+        self.parse_workers = parse_workers
+        self.manifest = manifest
+        self.negative_cache = negative_cache
+        self.html_refresher = html_refresher
+        self.source_ranking = source_ranking
+        self.scan_workers = scan_workers
+        self.scan_with_processes = scan_with_processes
+        self.header_only = header_only
+        self.stats = PipelineStats()
+
+    def run(self, song_files: Iterable[str]) -> PipelineStats:
+        asyncio.run(self.__run(song_files))
+        self.stats.log_summary()
+        return self.stats
+
+    async def __run(self, song_files: Iterable[str]):
+        self.__executor = ThreadPoolExecutor(max_workers=self.max_in_flight + self.parse_workers + 2,
+                                             thread_name_prefix='pipeline')
+        self.__client = AsyncHttpClient(self.__executor)
+        self.__host_limits = {source.get_name(): asyncio.Semaphore(self.per_host) for source in self.lyrics_sources}
+        # (source, artist, album) -> task requesting the album page
+        self.__album_fetches = LruCache(ALBUM_FETCHES_SIZE)
+        fetch_queue = asyncio.Queue(self.queue_size)
+        parse_queue = asyncio.Queue(self.queue_size)
+        embed_queue = asyncio.Queue(self.queue_size)
+        try:
+            fetchers = [asyncio.create_task(self.__fetch_stage(fetch_queue, parse_queue, embed_queue))
+                        for _ in range(self.max_in_flight)]
+            parsers = [asyncio.create_task(self.__parse_stage(parse_queue)) for _ in range(self.parse_workers)]
+            embedder = asyncio.create_task(self.__embed_stage(embed_queue))
+
+            await self.__scan_stage(song_files, fetch_queue)
+            for _ in fetchers:
+                await fetch_queue.put(None)
+            await asyncio.gather(*fetchers)
+            for _ in parsers:
+                await parse_queue.put(None)
+            await asyncio.gather(*parsers)
+            await embed_queue.put(None)
+            await embedder
+        finally:
+            self.stats.bytes_received = self.__client.bytes_received
+            await self.__client.close()
+            self.__executor.shutdown()
+
+    async def __in_thread(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, func, *args)
+
+    async def __scan_stage(self, song_files: Iterable[str], fetch_queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+
+        def count(paths: Iterable[str]) -> Iterable[str]:
+            for path in paths:
+                self.stats.scanned += 1
+                yield path
+
+        def scan():
+            # Blocks on a full fetch queue, so the scan does not run ahead of fetching
+            for song_data in scan_song_data(count(song_files), self.scan_workers, self.scan_with_processes,
+                                            self.manifest, self.header_only):
+                if self.accept(song_data):
+                    self.stats.queued += 1
+                    asyncio.run_coroutine_threadsafe(fetch_queue.put(song_data), loop).result()
+
+        await self.__in_thread(scan)
+
+    async def __fetch_stage(self, fetch_queue: asyncio.Queue, parse_queue: asyncio.Queue,
+                            embed_queue: asyncio.Queue):
+        while True:
+            song_data = await fetch_queue.get()
+            if song_data is None:
+                return
+            lyrics = await self.__fetch_lyrics(song_data, parse_queue)
+            if lyrics:
+                self.stats.found += 1
+                stats.set_success(song_data.artist, song_data.title)
+                await embed_queue.put((song_data, lyrics))
+            else:
+                self.stats.not_found += 1
+                stats.set_failed(song_data.artist, song_data.title)
+                log.info(f'[ERR] Could not find lyrics for {song_data}')
+
+    async def __fetch_lyrics(self, song_data: SongData, parse_queue: asyncio.Queue) -> Optional[str]:
+        cached_sources = await self.__in_thread(self.html_storage.get_sources, song_data)
+        lyrics_sources = self.lyrics_sources
+        if self.source_ranking is not None:
+            lyrics_sources = self.source_ranking.order(song_data, lyrics_sources)
+        for lyrics_source in lyrics_sources:
+            source_name = lyrics_source.get_name()
+            requested = None
+            try:
+                if source_name in cached_sources and self.html_refresher is not None:
+                    html, _ = await self.__once_per_album(
+                        lyrics_source, song_data, lambda: self.__revalidate(lyrics_source, song_data))
+                    self.stats.cached_html += 1
+                elif source_name in cached_sources:
+                    html = await self.__in_thread(self.html_storage.load, source_name, song_data,
+                                                  lyrics_source.is_album())
+                    self.stats.cached_html += 1
+                elif self.negative_cache is not None and self.negative_cache.should_skip(song_data, source_name):
+                    continue
+                else:
+                    requested = time.monotonic()
+                    html, requested_here = await self.__once_per_album(
+                        lyrics_source, song_data, lambda: self.__download(lyrics_source, song_data))
+                    if not requested_here:
+                        # Only the track that made the request counts for the source ranking
+                        requested = None
+                if not html:
+                    continue
+                parsed = asyncio.get_running_loop().create_future()
+                await parse_queue.put((lyrics_source, song_data, html, parsed))
+                lyrics = await parsed
+                if requested is not None and self.source_ranking is not None:
+                    self.source_ranking.record(song_data, source_name, bool(lyrics), time.monotonic() - requested)
+                if lyrics:
+                    if self.negative_cache is not None:
+                        self.negative_cache.record_success(song_data)
+                    return lyrics
+                if self.negative_cache is not None:
+                    self.negative_cache.record_failure(song_data, source_name, NO_LYRICS)
+            except Exception as e:
+                log.error(f"Failed extracting song lyrics from {source_name}: " + str(e))
+                if self.negative_cache is not None:
+                    self.negative_cache.record_error(song_data, source_name, e)
+                if requested is not None and self.source_ranking is not None \
+                        and failure_reason(e) == NOT_FOUND:
+                    self.source_ranking.record(song_data, source_name, False, time.monotonic() - requested)
+        return None
+
+    async def __once_per_album(self, lyrics_source: LyricsSource, song_data: SongData,
+                               fetch: Callable[[], Awaitable[Optional[str]]]) -> Tuple[Optional[str], bool]:
+        """
+        Run fetch once per (source, artist, album) for album sources, later tracks get the result
+        (or error) of the first request. Returns the page and whether this call made the request.
+        """
+        if not lyrics_source.is_album():
+            return await fetch(), True
+        key = (lyrics_source.get_name(), song_data.artist, song_data.album)
+        task = self.__album_fetches.get(key)
+        if task is not None:
+            self.stats.shared_album_pages += 1
+            return await asyncio.shield(task), False
+        task = asyncio.ensure_future(fetch())
+        self.__album_fetches.put(key, task)
+        # Shielded, so a cancelled track does not cancel the request other tracks wait for
+        return await asyncio.shield(task), True
+
+    async def __download(self, lyrics_source: LyricsSource, song_data: SongData) -> Optional[str]:
+        source_name = lyrics_source.get_name()
+        url, headers = await self.__in_thread(lyrics_source.prepare_request, song_data)
+        if not url:
+            return None
+        async with self.__host_limits[source_name]:
+            bucket = self.buckets.get(source_name)
+            if bucket is not None:
+                await asyncio.sleep(bucket.reserve())
+            log.info(f'\tULR: {url}')
+            self.stats.requests += 1
+            html, metadata = await self.__client.get(url, headers)
+        await self.__in_thread(self.html_storage.store, source_name, song_data, html, lyrics_source.is_album(),
+                               metadata)
+        return html
+
+    async def __revalidate(self, lyrics_source: LyricsSource, song_data: SongData) -> str:
+        source_name = lyrics_source.get_name()
+        is_album = lyrics_source.is_album()
+        try:
+            url, headers = await self.__in_thread(lyrics_source.prepare_request, song_data)
+            if url:
+                headers = await self.__in_thread(self.html_refresher.request_headers, source_name, song_data,
+                                                 is_album, headers)
+                async with self.__host_limits[source_name]:
+                    bucket = self.buckets.get(source_name)
+                    if bucket is not None:
+                        await asyncio.sleep(bucket.reserve())
+                    self.stats.requests += 1
+                    html, metadata = await self.__client.get(url, headers)
+                if html is None:
+                    return await self.__in_thread(self.html_refresher.not_modified, source_name, song_data,
+                                                  is_album, metadata)
+                return await self.__in_thread(self.html_refresher.modified, source_name, song_data, is_album,
+                                              html, metadata)
+        except Exception as e:
+            log.warning(f'Failed revalidating {source_name} html of {song_data}, using stored page: ' + str(e))
+        return await self.__in_thread(self.html_storage.load, source_name, song_data, is_album)
+
+    async def __parse_stage(self, parse_queue: asyncio.Queue):
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                return
+            lyrics_source, song_data, html, parsed = item
+            try:
+                lyrics = await self.__in_thread(lyrics_source.parse_lyrics, html, song_data.title)
+                if lyrics:
+                    await self.__in_thread(self.lyrics_storage.store, lyrics_source.get_name(), song_data, lyrics)
+                    log.info(f'[OK] successfully parsed lyrics: {len(lyrics)}')
+                parsed.set_result(lyrics)
+            except Exception as e:
+                parsed.set_exception(e)
+
+    async def __embed_stage(self, embed_queue: asyncio.Queue):
+        while True:
+            item = await embed_queue.get()
+            if item is None:
+                return
+            if self.embed is None:
+                continue
+            song_data, lyrics = item
+            try:
+                await self.__in_thread(self.embed, song_data, lyrics)
+                self.stats.embedded += 1
+            except Exception as e:
+                log.error(f'Failed embedding lyrics in {song_data}: ' + str(e))
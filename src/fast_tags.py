@@ -0,0 +1,291 @@
+"""
+Header-only readers of artist, album, title and lyrics.
+
+Mutagen parses every frame of a tag, including multi-megabyte cover art, and keeps it
+in memory. These readers only walk the tag structure and read the few frames they need,
+seeking over everything else (artwork, audio data, sample tables):
+
+- mp3: ID3v2.3/2.4 frames TPE1, TALB, TIT2 and USLT
+- m4a/mp4: moov/udta/meta/ilst atoms
+- flac: VORBIS_COMMENT metadata block
+- ogg/oga: Vorbis comment header packet
+
+read_fields returns None whenever the file uses a feature these readers do not handle
+(unsynchronisation, compressed frames, ID3v2.2, Ogg FLAC, wma, ...), callers then read the
+file with mutagen.
+"""
+
+import logging
+import struct
+from typing import BinaryIO, Dict, List, Optional
+
+log = logging.getLogger("fast_tags")
+
+ARTIST = 'artist'
+ALBUM = 'album'
+TITLE = 'title'
+LYRICS = 'lyrics'
+
+ID3_FRAMES = {b'TPE1': ARTIST, b'TALB': ALBUM, b'TIT2': TITLE, b'USLT': LYRICS}
+MP4_ATOMS = {b'\xa9ART': ARTIST, b'\xa9alb': ALBUM, b'\xa9nam': TITLE, b'\xa9lyr': LYRICS}
+# Same lookup order as song_helper.get_key
+VORBIS_LYRICS_KEYS = ['lyrics', 'unsyncedlyrics', 'unsynced lyrics', 'synced lyrics']
+
+ID3_ENCODINGS = {0: 'latin-1', 1: 'utf-16', 2: 'utf-16-be', 3: 'utf-8'}
+
+# Atoms on the path to the iTunes metadata list
+MP4_CONTAINERS = [b'moov', b'udta', b'meta', b'ilst']
+
+
+class Unsupported(Exception):
+    """ File uses a feature the header-only readers do not handle """
+
+
+def read_fields(path: str, song_format: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Return {'artist', 'album', 'title', 'lyrics'} raw values of the file or None,
+    when the file must be read with mutagen instead.
+    """
+    reader = READERS.get(song_format)
+    if reader is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return reader(f)
+    except (Unsupported, struct.error, UnicodeDecodeError, ValueError) as e:
+        log.debug(f'Falling back to mutagen for {path}: ' + str(e))
+        return None
+
+
+def __read_exactly(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    if len(data) != size:
+        raise Unsupported('Unexpected end of file')
+    return data
+
+
+def __syncsafe(data: bytes) -> int:
+    if any(b & 0x80 for b in data):
+        raise Unsupported('Invalid syncsafe integer')
+    result = 0
+    for b in data:
+        result = (result << 7) | b
+    return result
+
+
+def read_id3(f: BinaryIO) -> Dict[str, Optional[str]]:
+    header = f.read(10)
+    if len(header) != 10 or header[:3] != b'ID3':
+        raise Unsupported('No ID3v2 header')
+    version, flags = header[3], header[5]
+    if version not in (3, 4):
+        raise Unsupported(f'ID3v2.{version}')
+    if flags & 0x80:
+        raise Unsupported('Unsynchronised tag')
+    end = 10 + __syncsafe(header[6:10])
+    if flags & 0x40:
+        # Extended header, size is syncsafe and includes itself in v2.4
+        size_bytes = __read_exactly(f, 4)
+        if version == 4:
+            f.seek(__syncsafe(size_bytes) - 4, 1)
+        else:
+            f.seek(struct.unpack('>I', size_bytes)[0], 1)
+
+    fields: Dict[str, Optional[str]] = dict()
+    while f.tell() + 10 <= end:
+        frame_header = __read_exactly(f, 10)
+        frame_id = frame_header[:4]
+        if frame_id[0] == 0:
+            break  # padding
+        if version == 4:
+            size = __syncsafe(frame_header[4:8])
+        else:
+            size = struct.unpack('>I', frame_header[4:8])[0]
+        field = ID3_FRAMES.get(frame_id)
+        if field is None or field in fields:
+            f.seek(size, 1)
+            continue
+        # Compressed, encrypted, grouped or unsynchronised frames
+        if frame_header[9] & (0x4f if version == 4 else 0xe0):
+            raise Unsupported(f'Frame flags of {frame_id}')
+        data = __read_exactly(f, size)
+        fields[field] = __id3_lyrics(data) if field == LYRICS else __id3_text(data)
+
+    if any(fields.get(field) is None for field in (ARTIST, ALBUM, TITLE)):
+        # mutagen fills missing frames from an ID3v1 tag at the end of the file
+        raise Unsupported('Missing ID3v2 frames')
+    return {ARTIST: fields[ARTIST], ALBUM: fields[ALBUM], TITLE: fields[TITLE], LYRICS: fields.get(LYRICS)}
+
+
+def __id3_encoding(data: bytes) -> str:
+    if not data or data[0] not in ID3_ENCODINGS:
+        raise Unsupported('Unknown text encoding')
+    return ID3_ENCODINGS[data[0]]
+
+
+def __id3_text(data: bytes) -> Optional[str]:
+    # Frames may hold several null separated values, the first one is used
+    values = [value for value in __id3_split(data[1:], __id3_encoding(data)) if value]
+    return values[0] if values else None
+
+
+def __id3_lyrics(data: bytes) -> Optional[str]:
+    # encoding, 3 bytes of language, null terminated description, text
+    encoding = __id3_encoding(data)
+    parts = __id3_split(data[4:], encoding, 1)
+    text = parts[1] if len(parts) > 1 else ''
+    return text.rstrip('\x00') or None
+
+
+def __id3_split(data: bytes, encoding: str, max_split: int = -1) -> List[str]:
+    if encoding in ('utf-16', 'utf-16-be'):
+        # Terminator must be aligned to a code unit
+        result = []
+        start = 0
+        position = 0
+        while position + 1 < len(data) and max_split != 0:
+            if data[position:position + 2] == b'\x00\x00':
+                result.append(data[start:position])
+                start = position + 2
+                max_split -= 1
+            position += 2
+        result.append(data[start:])
+    else:
+        result = data.split(b'\x00', max_split)
+    return [part.decode(encoding) if part else '' for part in result]
+
+
+def read_mp4(f: BinaryIO) -> Dict[str, Optional[str]]:
+    f.seek(0, 2)
+    end = f.tell()
+    f.seek(0)
+    for container in MP4_CONTAINERS:
+        end = __find_atom(f, container, end)
+        if container == b'meta':
+            f.seek(4, 1)  # version and flags of the full box
+    fields: Dict[str, Optional[str]] = {ARTIST: None, ALBUM: None, TITLE: None, LYRICS: None}
+    while f.tell() + 8 <= end:
+        size, name, header_size = __atom_header(f)
+        field = MP4_ATOMS.get(name)
+        if field is None:
+            f.seek(size - header_size, 1)
+            continue
+        fields[field] = __mp4_text(__read_exactly(f, size - header_size))
+    return fields
+
+
+def __atom_header(f: BinaryIO):
+    size, name = struct.unpack('>I4s', __read_exactly(f, 8))
+    header_size = 8
+    if size == 1:
+        size = struct.unpack('>Q', __read_exactly(f, 8))[0]
+        header_size = 16
+    if size < header_size:
+        # size 0 (until end of file) is only used for mdat
+        raise Unsupported(f'Atom {name} of size {size}')
+    return size, name, header_size
+
+
+def __find_atom(f: BinaryIO, name: bytes, end: int) -> int:
+    """ Position f after the header of the first child atom called name, return end of the atom """
+    while f.tell() + 8 <= end:
+        start = f.tell()
+        size, atom_name, header_size = __atom_header(f)
+        if atom_name == name:
+            return start + size
+        f.seek(start + size)
+    raise Unsupported(f'No {name} atom')
+
+
+def __mp4_text(data: bytes) -> Optional[str]:
+    # The value is in a 'data' child atom: size, 'data', type, locale, payload
+    if len(data) < 16 or data[4:8] != b'data':
+        raise Unsupported('Unexpected ilst item')
+    size, data_type = struct.unpack('>I4xI', data[:12])
+    data_type &= 0xffffff
+    payload = data[16:size]
+    if data_type == 1:
+        return payload.decode('utf-8')
+    if data_type == 2:
+        return payload.decode('utf-16-be')
+    raise Unsupported(f'Data type {data_type}')
+
+
+def read_flac(f: BinaryIO) -> Dict[str, Optional[str]]:
+    if f.read(4) != b'fLaC':
+        raise Unsupported('No fLaC marker')
+    while True:
+        block_type, size = struct.unpack('>B3s', __read_exactly(f, 4))
+        size = int.from_bytes(size, 'big')
+        if block_type & 0x7f == 4:
+            return __vorbis_fields(__read_exactly(f, size))
+        if block_type & 0x80:
+            # Last metadata block, no comments
+            return {ARTIST: None, ALBUM: None, TITLE: None, LYRICS: None}
+        f.seek(size, 1)
+
+
+def read_ogg(f: BinaryIO) -> Dict[str, Optional[str]]:
+    packets = __ogg_packets(f, 2)
+    if not packets[0].startswith(b'\x01vorbis') or not packets[1].startswith(b'\x03vorbis'):
+        raise Unsupported('Not an Ogg Vorbis stream')
+    return __vorbis_fields(packets[1][7:])
+
+
+def __ogg_packets(f: BinaryIO, count: int) -> List[bytes]:
+    """ Read first count packets of the first logical stream """
+    packets = []
+    packet = b''
+    serial = None
+    while len(packets) < count:
+        header = __read_exactly(f, 27)
+        if header[:4] != b'OggS':
+            raise Unsupported('No Ogg page')
+        page_serial, segments = struct.unpack('<I', header[14:18])[0], header[26]
+        lacing = __read_exactly(f, segments)
+        body = __read_exactly(f, sum(lacing))
+        if serial is None:
+            serial = page_serial
+        elif page_serial != serial:
+            raise Unsupported('Multiplexed Ogg stream')
+        position = 0
+        for segment in lacing:
+            packet += body[position:position + segment]
+            position += segment
+            if segment < 255:
+                packets.append(packet)
+                packet = b''
+                if len(packets) == count:
+                    break
+    return packets
+
+
+def __vorbis_fields(data: bytes) -> Dict[str, Optional[str]]:
+    vendor_length = struct.unpack('<I', data[:4])[0]
+    position = 4 + vendor_length
+    count = struct.unpack('<I', data[position:position + 4])[0]
+    position += 4
+    comments: Dict[str, str] = dict()
+    for _ in range(count):
+        length = struct.unpack('<I', data[position:position + 4])[0]
+        position += 4
+        comment = data[position:position + length]
+        position += length
+        key, separator, value = comment.partition(b'=')
+        if not separator:
+            raise Unsupported('Invalid Vorbis comment')
+        # Keys are case-insensitive, the first value of a key is used
+        comments.setdefault(key.decode('ascii').lower(), value.decode('utf-8'))
+    lyrics = next((comments[key] for key in VORBIS_LYRICS_KEYS if comments.get(key)), None)
+    return {ARTIST: comments.get('artist'), ALBUM: comments.get('album'), TITLE: comments.get('title'),
+            LYRICS: lyrics}
+
+
+READERS = {
+    'mp3': read_id3,
+    'mp4': read_mp4,
+    'm4a': read_mp4,
+    'flac': read_flac,
+    'ogg': read_ogg,
+    'oga': read_ogg,
+}
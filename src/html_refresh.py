@@ -0,0 +1,60 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+from lyrico.lyrico_sources.http_session import conditional_headers
+from song_data import SongData
+from storage import Storage
+
+log = logging.getLogger("html_refresh")
+
+
+class HtmlRefresher:
+    """
+    Revalidates stored pages with conditional requests (If-None-Match / If-Modified-Since built
+    from the ETag and Last-Modified stored with the page). A '304 Not Modified' answer costs no
+    body, the stored page is used. Pages stored without validators are downloaded again.
+
+    Callers send the request themselves (the threaded and the async fetchers use different clients)
+    and report the answer with not_modified() or modified().
+    """
+
+    def __init__(self, html_storage: Storage):
+        self.__html_storage = html_storage
+        self.__lock = threading.Lock()
+        # Pages answered with 304 and pages downloaded again
+        self.hits = 0
+        self.misses = 0
+        # Characters of stored pages that did not have to be downloaded again
+        self.saved = 0
+
+    def request_headers(self, source: str, song_data: SongData, is_album: bool,
+                        headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        metadata = self.__html_storage.load_metadata(source, song_data, is_album)
+        return dict(headers or {}, **conditional_headers(metadata))
+
+    def not_modified(self, source: str, song_data: SongData, is_album: bool, metadata: Dict[str, str]) -> str:
+        """
+        Return the stored page, validators sent with the 304 replace the stored ones
+        """
+        html = self.__html_storage.load(source, song_data, is_album)
+        if metadata:
+            stored = self.__html_storage.load_metadata(source, song_data, is_album)
+            self.__html_storage.store_metadata(source, song_data, dict(stored, **metadata), is_album)
+        with self.__lock:
+            self.hits += 1
+            self.saved += len(html)
+        log.info(f'\t[304] {source} page of {song_data} did not change')
+        return html
+
+    def modified(self, source: str, song_data: SongData, is_album: bool, html: str,
+                 metadata: Dict[str, str]) -> str:
+        self.__html_storage.store(source, song_data, html, is_album, metadata)
+        with self.__lock:
+            self.misses += 1
+        log.info(f'\t[200] {source} page of {song_data} changed, stored again')
+        return html
+
+    def log_summary(self):
+        log.info(f'Revalidated pages: {self.hits} not modified, {self.misses} downloaded again, '
+                 f'{self.saved / 1024:.0f} KiB not downloaded')
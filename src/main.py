@@ -1,31 +1,90 @@
+import argparse
 import logging
-import sys
-from time import sleep
-from typing import List, Optional, Set
-
-import requests
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+import stats
+from html_refresh import HtmlRefresher
+from lyrico.lyrico_sources import html_parser, http_session
+from negative_cache import NO_LYRICS, NOT_FOUND, NegativeCache, failure_reason
+from scan_manifest import ScanManifest
+from scheduler import FetchScheduler
 from song_data import SongData
-from song_helper import get_song_list, get_song_data, embedd_lyrics_in_song
+from song_helper import iter_song_files, scan_song_data
+from source_ranking import SourceRanking
 from sources.LyricsMode import LyricsMode
 from sources.darklyrics import DarkLyrics
 from sources.lyrics_source import LyricsSource
 from sources.musix_match import MusixMatch
+from sqlite_storage import SqliteStorage
 from storage import Storage
+from tag_writer import TagWriter
 
 HTML_ROOT_DIR = r'D:\Programming\git\lyrico\00_html'
 LYRICS_ROOT_DIR = r'D:\Programming\git\lyrico\00_lyrics'
+# Tags read in previous runs. Only files whose size or modification time changed are read again.
+SCAN_MANIFEST_FILE = r'D:\Programming\git\lyrico\00_scan_manifest.json'
+# Sources that failed for a song are not asked again for it until the TTL of the failure reason passes
+# (weeks for pages that do not exist, minutes for rate limiting and server errors), see negative_cache.py
+NEGATIVE_CACHE_FILE = r'D:\Programming\git\lyrico\00_negative_cache.json'
+# Hit rate and latency of every source, overall and per artist. Sources most likely to have lyrics
+# for the artist are tried first, see source_ranking.py
+SOURCE_RANKING_FILE = r'D:\Programming\git\lyrico\00_source_ranking.json'
+# When set, html is kept in this SQLite database instead of the HTML_ROOT_DIR directory tree.
+# Import an existing tree with: python sqlite_storage.py migrate <HTML_ROOT_DIR> <HTML_STORAGE_DB>
+HTML_STORAGE_DB: Optional[str] = None
+# Compression of html stored in the database: 'none', 'gzip' or 'zstd'
+HTML_STORAGE_COMPRESSION = 'gzip'
 
 EMBED_IN_SONG = True
+# Lyrics are written into songs by TAG_WRITERS background threads, so slow writes do not hold up fetching.
+# Writes not finished when a run is interrupted are kept in the journal and replayed by the next run.
+TAG_WRITE_JOURNAL = r'D:\Programming\git\lyrico\00_tag_writes.jsonl'
+TAG_WRITERS = 2
+# Max number of queued writes, fetching waits for writers when it is reached
+TAG_WRITE_BACKLOG = 256
+
+# Minimal delay between two requests to the same source, in seconds. Different sources are queried in parallel.
+REQUEST_INTERVAL_SECONDS = 10
+# Number of songs processed concurrently
+FETCH_WORKERS = 8
+# (connect, read) timeouts of a single request and how many times failed (429/5xx) requests are retried
+HTTP_TIMEOUT_SECONDS = (10, 30)
+HTTP_RETRIES = 3
+# BeautifulSoup tree builder used by all sources: 'lxml' (fast, needs lxml installed), 'html5lib' or 'html.parser'
+HTML_PARSER = 'lxml'
+# Tags are read on this many processes (threads when SCAN_WITH_PROCESSES is False).
+# Albums are queued for fetching as soon as they are scanned.
+SCAN_WORKERS = 4
+SCAN_WITH_PROCESSES = True
+# Read only artist, album, title and lyrics frames instead of the whole tag with artwork (see fast_tags.py)
+HEADER_ONLY_TAG_READS = True
 
 all_lyrics_sources: List[LyricsSource] = [DarkLyrics(), LyricsMode(), MusixMatch()]
 
 log = logging.getLogger("main")
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s [%(filename)s:%(lineno)d] %(message)s')
 
-html_storage = Storage(HTML_ROOT_DIR)
+if HTML_STORAGE_DB:
+    html_storage = SqliteStorage(HTML_STORAGE_DB, HTML_STORAGE_COMPRESSION)
+else:
+    html_storage = Storage(HTML_ROOT_DIR)
 lyrics_storage = Storage(LYRICS_ROOT_DIR)
 
+html_parser.set_parser_backend(HTML_PARSER)
+http_session.configure(timeout=HTTP_TIMEOUT_SECONDS, retries=HTTP_RETRIES, pool_size=FETCH_WORKERS)
+
+# Created in main, depends on --full-rescan, --retry-failed, --refresh-html and --fixed-source-order
+manifest: Optional[ScanManifest] = None
+negative_cache: Optional[NegativeCache] = None
+source_ranking: Optional[SourceRanking] = None
+html_refresher: Optional[HtmlRefresher] = None
+tag_writer: Optional[TagWriter] = None
+
+scheduler = FetchScheduler([source.get_name() for source in all_lyrics_sources],
+                           REQUEST_INTERVAL_SECONDS, FETCH_WORKERS)
+
 ignore_list: Set[str] = {
     'Фридерик Шопен',
     'Ференц Лист',
@@ -58,32 +117,147 @@ def shall_be_ignored(song_data: SongData) -> bool:
     return song_data.artist in ignore_list
 
 
-def main():
-    root_dir = sys.argv[1]
-    song_list = get_song_list(root_dir)
-    log.info(f'{len(song_list)} songs detected.')
-    for song_file in song_list:
-        log.info("------------------------------")
-        log.info(f'Trying file: {song_file}')
-        song_data = get_song_data(song_file)
-        if shall_be_ignored(song_data):
-            log.info(f'[IGNORE] Song is added to manual ignored list: {song_data}')
-            continue
-        if song_data.lyrics:
-            log.info(f"[EXIST] Lyrics already present in {song_data}")
-            continue
-
-        if song_data.artist and song_data.title:
-            lyrics = get_lyrics(song_data)
-            if lyrics:
-                if EMBED_IN_SONG:
-                    embedd_lyrics_in_song(song_data, lyrics)
-                else:
-                    log.info('[CFG] Configured to skip embedding lyrics into song.')
-            else:
-                log.info(f'[ERR] Could not find lyrics for {song_data}')
+def parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description='Find lyrics for songs in a library and embed them into the files.')
+    p.add_argument('root_dir', help='Root directory of the audio library')
+    p.add_argument('--full-rescan', action='store_true',
+                   help='Read tags of every file, ignoring the scan manifest of previous runs')
+    p.add_argument('--retry-failed', action='store_true',
+                   help='Ask every source again, also those that recently failed for a song')
+    p.add_argument('--refresh-html', action='store_true',
+                   help='Revalidate stored html with conditional requests before parsing it')
+    p.add_argument('--fixed-source-order', action='store_true',
+                   help='Try sources in the configured order instead of ranking them by hit rate')
+    p.add_argument('--async', dest='use_async', action='store_true',
+                   help='Run scanning, fetching, parsing and embedding as concurrent asyncio stages')
+    p.add_argument('--max-in-flight', type=int, default=8, help='Max concurrent song fetches in --async mode')
+    p.add_argument('--per-host', type=int, default=1, help='Max concurrent requests to one source in --async mode')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    global manifest, negative_cache, source_ranking, html_refresher, tag_writer
+    manifest = ScanManifest(SCAN_MANIFEST_FILE, args.full_rescan)
+    stats.register_cache('Scan manifest (files not re-read)', manifest)
+    negative_cache = NegativeCache(NEGATIVE_CACHE_FILE, enabled=not args.retry_failed)
+    stats.register_cache('Negative cache (fetches skipped)', negative_cache)
+    source_ranking = SourceRanking(SOURCE_RANKING_FILE, enabled=not args.fixed_source_order)
+    if args.refresh_html:
+        html_refresher = HtmlRefresher(html_storage)
+        stats.register_cache('Html revalidation (304 not modified)', html_refresher)
+    # Written files are recorded, so they are not read again next run
+    tag_writer = TagWriter(TAG_WRITE_JOURNAL, TAG_WRITERS, TAG_WRITE_BACKLOG,
+                           on_written=lambda song_data: manifest.update(song_data, has_lyrics=True)).start()
+    # Files are scanned while the library is still being walked
+    song_list = iter_song_files(args.root_dir)
+    try:
+        if args.use_async:
+            from async_pipeline import AsyncPipeline
+            pipeline = AsyncPipeline(all_lyrics_sources, html_storage, lyrics_storage, scheduler.buckets,
+                                     accept=needs_lyrics,
+                                     embed=embed_lyrics if EMBED_IN_SONG else None,
+                                     max_in_flight=args.max_in_flight,
+                                     per_host=args.per_host,
+                                     manifest=manifest,
+                                     negative_cache=negative_cache,
+                                     html_refresher=html_refresher,
+                                     source_ranking=source_ranking,
+                                     scan_workers=SCAN_WORKERS,
+                                     scan_with_processes=SCAN_WITH_PROCESSES,
+                                     header_only=HEADER_ONLY_TAG_READS)
+            pipeline.run(song_list)
+        else:
+            albums = scheduler.run(group_by_album(scan_songs(song_list)), process_album)
+            log.info(f'{albums} albums needing lyrics processed.')
+    finally:
+        # Also on errors and Ctrl+C, so queued tag writes and what was learned about files and sources are kept
+        tag_writer.close()
+        manifest.save()
+        negative_cache.save()
+        source_ranking.save()
+    source_ranking.log_summary()
+    if html_refresher is not None:
+        html_refresher.log_summary()
+    stats.print_stats()
+
+
+def needs_lyrics(song_data: SongData) -> bool:
+    if shall_be_ignored(song_data):
+        log.info(f'[IGNORE] Song is added to manual ignored list: {song_data}')
+        return False
+    if song_data.has_lyrics():
+        log.info(f"[EXIST] Lyrics already present in {song_data}")
+        stats.set_exists(song_data.artist, song_data.title)
+        return False
+    if not song_data.artist or not song_data.title:
+        log.error(f'[ERR] No artist or title in song: {song_data}')
+        return False
+    return True
+
+
+def scan_songs(song_list: Iterable[str]) -> Iterator[SongData]:
+    detected = 0
+
+    def count(song_files: Iterable[str]) -> Iterator[str]:
+        nonlocal detected
+        for song_file in song_files:
+            detected += 1
+            yield song_file
+
+    for song_data in scan_song_data(count(song_list), SCAN_WORKERS, SCAN_WITH_PROCESSES, manifest,
+                                    HEADER_ONLY_TAG_READS):
+        if needs_lyrics(song_data):
+            yield song_data
+    log.info(f'{detected} songs detected.')
+
+
+def group_by_album(songs: Iterable[SongData]) -> Iterator[List[SongData]]:
+    """
+    Group songs by (artist, album), so album sources fetch and parse every album page only once.
+    Songs are scanned directory by directory, so collected albums are yielded as soon as songs
+    from another directory arrive and fetching starts before the whole library is scanned.
+    """
+    albums: Dict[Tuple[str, str], List[SongData]] = dict()
+    directory = None
+    for song_data in songs:
+        song_directory = os.path.dirname(song_data.path) if song_data.path else None
+        if song_directory != directory:
+            yield from albums.values()
+            albums = dict()
+            directory = song_directory
+        albums.setdefault((song_data.artist, song_data.album), []).append(song_data)
+    yield from albums.values()
+
+
+def process_album(songs: List[SongData]):
+    # Parsed album pages by source name, shared by all tracks of the album
+    album_pages: Dict[str, Optional[Dict[str, str]]] = dict()
+    # Why the album page of a source could not be fetched or parsed
+    album_errors: Dict[str, Exception] = dict()
+    for song_data in songs:
+        process_song(song_data, album_pages, album_errors)
+
+
+def process_song(song_data: SongData, album_pages: Dict[str, Optional[Dict[str, str]]],
+                 album_errors: Dict[str, Exception]):
+    lyrics = get_lyrics(song_data, album_pages, album_errors)
+    if lyrics:
+        stats.set_success(song_data.artist, song_data.title)
+        if EMBED_IN_SONG:
+            embed_lyrics(song_data, lyrics)
         else:
-            log.error(f'[ERR] No artist or title in song_file: {song_file}')
+            log.info('[CFG] Configured to skip embedding lyrics into song.')
+    else:
+        stats.set_failed(song_data.artist, song_data.title)
+        log.info(f'[ERR] Could not find lyrics for {song_data}')
+    if not (lyrics and EMBED_IN_SONG):
+        # Otherwise the tag writer releases the tag once lyrics are written
+        song_data.release_tag()
+
+
+def embed_lyrics(song_data: SongData, lyrics: str):
+    tag_writer.submit(song_data, lyrics)
 
 
 def find_source_by_name(source_name: str, lyrics_sources: List[LyricsSource]) -> Optional[LyricsSource]:
@@ -96,10 +270,18 @@ def find_source_by_name(source_name: str, lyrics_sources: List[LyricsSource]) ->
     return None
 
 
-def get_lyrics(song_data: SongData) -> str:
+def get_lyrics(song_data: SongData, album_pages: Optional[Dict[str, Optional[Dict[str, str]]]] = None,
+               album_errors: Optional[Dict[str, Exception]] = None) -> str:
     log.info(f'Fetching lyrics for {song_data.artist}-{song_data.title}')
-    lyrics_sources = all_lyrics_sources.copy()
-    lyrics = handle_existing_html(lyrics_sources, song_data)
+    if album_pages is None:
+        album_pages = dict()
+    if album_errors is None:
+        album_errors = dict()
+    if source_ranking is not None:
+        lyrics_sources = source_ranking.order(song_data, all_lyrics_sources)
+    else:
+        lyrics_sources = all_lyrics_sources.copy()
+    lyrics = handle_existing_html(lyrics_sources, song_data, album_pages)
     if lyrics:
         return lyrics
 
@@ -107,30 +289,102 @@ def get_lyrics(song_data: SongData) -> str:
     while len(lyrics_sources) > 0:
         lyrics_source = lyrics_sources[0]
         del lyrics_sources[0]
+        requested = None
         try:
-            log.info(f'\tTrying source {lyrics_source.get_name()}')
-            log.info('\tWait 10 seconds to avoid spamming')
-            sleep(10)  # TODO: Avoid spamming to not get detected
-            url, headers = lyrics_source.prepare_request(song_data)
-            log.info(f'\tULR: {url}\n\t{headers}')
-            if not url:
-                log.info('\tUrl was not created')
+            if lyrics_source.get_name() in album_pages:
+                # Album page was already requested for another track of this album
+                album = album_pages[lyrics_source.get_name()]
+                if album is None:
+                    log.info(f'\tAlbum page of {lyrics_source.get_name()} failed for an earlier track')
+                    error = album_errors.get(lyrics_source.get_name())
+                    if negative_cache is not None and error is not None:
+                        negative_cache.record_error(song_data, lyrics_source.get_name(), error)
+                    continue
+                lyrics = lyrics_source.lyrics_for_title(album, song_data.title)
+            elif negative_cache is not None and negative_cache.should_skip(song_data, lyrics_source.get_name()):
                 continue
+            else:
+                log.info(f'\tTrying source {lyrics_source.get_name()}')
+                url, headers = lyrics_source.prepare_request(song_data)
+                log.info(f'\tULR: {url}\n\t{headers}')
+                if not url:
+                    log.info('\tUrl was not created')
+                    continue
 
-            result = requests.get(url, headers=headers)
-            log.info(str(result))
-            result.raise_for_status()
-            html_storage.store(lyrics_source.get_name(), song_data, result.text, lyrics_source.is_album())
-            html = html_storage.load(lyrics_source.get_name(), song_data, lyrics_source.is_album())
-            lyrics = lyrics_source.parse_lyrics(html, song_data.title)
+                if lyrics_source.is_album():
+                    # Remember the attempt even if it fails, so the album page is requested only once
+                    album_pages[lyrics_source.get_name()] = None
+
+                # Avoid spamming the same host to not get detected
+                scheduler.wait_turn(lyrics_source.get_name())
+
+                requested = time.monotonic()
+                result = http_session.http_get(url, headers=headers)
+                log.info(str(result))
+                result.raise_for_status()
+                html_storage.store(lyrics_source.get_name(), song_data, result.text, lyrics_source.is_album(),
+                                   http_session.response_metadata(result.headers))
+                html = html_storage.load(lyrics_source.get_name(), song_data, lyrics_source.is_album())
+                lyrics = parse_html(lyrics_source, html, song_data, album_pages)
+            if not lyrics:
+                log.info(f'\tNo lyrics for {song_data} in the {lyrics_source.get_name()} page')
+                if negative_cache is not None:
+                    negative_cache.record_failure(song_data, lyrics_source.get_name(), NO_LYRICS)
+                if requested is not None and source_ranking is not None:
+                    source_ranking.record(song_data, lyrics_source.get_name(), False, time.monotonic() - requested)
+                continue
             lyrics_storage.store(lyrics_source.get_name(), song_data, lyrics)
             log.info(f'[OK] successfully parsed lyrics: {len(lyrics)}')
+            if negative_cache is not None:
+                negative_cache.record_success(song_data)
+            if requested is not None and source_ranking is not None:
+                source_ranking.record(song_data, lyrics_source.get_name(), True, time.monotonic() - requested)
             return lyrics
         except Exception as e:
             log.error(f"Failed extracting song lyrics from {lyrics_source.get_name()}: " + str(e), exc_info=True)
+            if negative_cache is not None:
+                negative_cache.record_error(song_data, lyrics_source.get_name(), e)
+            if requested is not None and lyrics_source.is_album() and album_pages.get(lyrics_source.get_name()) is None:
+                # Later tracks of the album skip the source for the same reason
+                album_errors[lyrics_source.get_name()] = e
+            # Rate limiting, server errors and parser crashes say nothing about whether the source has the lyrics
+            if requested is not None and source_ranking is not None and failure_reason(e) == NOT_FOUND:
+                source_ranking.record(song_data, lyrics_source.get_name(), False, time.monotonic() - requested)
+
+
+def parse_html(lyrics_source: LyricsSource, html: str, song_data: SongData,
+               album_pages: Dict[str, Optional[Dict[str, str]]]) -> Optional[str]:
+    if not lyrics_source.is_album():
+        return lyrics_source.parse_lyrics(html, song_data.title)
+    album = lyrics_source.parse_album(html)
+    album_pages[lyrics_source.get_name()] = album
+    return lyrics_source.lyrics_for_title(album, song_data.title)
 
 
-def handle_existing_html(lyrics_sources, song_data) -> Optional[str]:
+def refresh_html(lyrics_source: LyricsSource, song_data: SongData) -> str:
+    """
+    Revalidate the stored page with a conditional request. The stored page is used when
+    it did not change or the request fails.
+    """
+    source_name = lyrics_source.get_name()
+    is_album = lyrics_source.is_album()
+    try:
+        url, headers = lyrics_source.prepare_request(song_data)
+        if url:
+            scheduler.wait_turn(source_name)
+            result = http_session.http_get(
+                url, headers=html_refresher.request_headers(source_name, song_data, is_album, headers))
+            metadata = http_session.response_metadata(result.headers)
+            if result.status_code == 304:
+                return html_refresher.not_modified(source_name, song_data, is_album, metadata)
+            result.raise_for_status()
+            return html_refresher.modified(source_name, song_data, is_album, result.text, metadata)
+    except Exception as e:
+        log.warning(f'Failed revalidating {source_name} html of {song_data}, using stored page: ' + str(e))
+    return html_storage.load(source_name, song_data, is_album)
+
+
+def handle_existing_html(lyrics_sources, song_data, album_pages) -> Optional[str]:
     # Do we already have a HTML saved?
     list_of_sources: List[str] = html_storage.get_sources(song_data)
     log.info(f"Already have html file for {list_of_sources}")
@@ -140,10 +394,19 @@ def handle_existing_html(lyrics_sources, song_data) -> Optional[str]:
         lyrics_source: LyricsSource = find_source_by_name(source_name, lyrics_sources)
         if lyrics_source:
             lyrics_sources.remove(lyrics_source)
-            # Try and parse lyrics for the source
-            lyrics_html = html_storage.load(source_name, song_data, lyrics_source.is_album())
             try:
-                lyrics = lyrics_source.parse_lyrics(lyrics_html, song_data.title)
+                if source_name in album_pages:
+                    if album_pages[source_name] is None:
+                        # Album page could not be parsed for an earlier track
+                        continue
+                    lyrics = lyrics_source.lyrics_for_title(album_pages[source_name], song_data.title)
+                else:
+                    # Try and parse lyrics for the source
+                    if html_refresher is not None:
+                        lyrics_html = refresh_html(lyrics_source, song_data)
+                    else:
+                        lyrics_html = html_storage.load(source_name, song_data, lyrics_source.is_album())
+                    lyrics = parse_html(lyrics_source, lyrics_html, song_data, album_pages)
                 lyrics_storage.store(source_name, song_data, lyrics)
                 log.info(f'[OK] successfully parsed lyrics: {len(lyrics) if lyrics else 0}')
                 break
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+
+from song_data import SongData
+from storage import TEMP_SUFFIX
+
+log = logging.getLogger("negative_cache")
+
+# Why a source did not give lyrics for a song
+NOT_FOUND = 'not_found'  # 404/410, the page does not exist
+NO_LYRICS = 'no_lyrics'  # page was fetched and parsed, but has no lyrics for the song
+RATE_LIMITED = 'rate_limited'  # 429
+SERVER_ERROR = 'server_error'  # 5xx and other HTTP errors
+NETWORK_ERROR = 'network_error'  # connection errors and timeouts
+
+MINUTE = 60
+DAY = 24 * 60 * MINUTE
+
+# How long a source is not asked again for a song after a failure, by reason
+DEFAULT_TTLS: Dict[str, float] = {
+    NOT_FOUND: 28 * DAY,
+    NO_LYRICS: 14 * DAY,
+    RATE_LIMITED: 10 * MINUTE,
+    SERVER_ERROR: 30 * MINUTE,
+    NETWORK_ERROR: 30 * MINUTE,
+}
+
+
+def failure_status(error: Exception) -> Optional[int]:
+    """
+    HTTP status of a failed request: requests.HTTPError or aiohttp.ClientResponseError
+    """
+    if isinstance(error, requests.HTTPError):
+        return error.response.status_code if error.response is not None else None
+    status = getattr(error, 'status', None)
+    return status if isinstance(status, int) else None
+
+
+def failure_reason(error: Exception) -> Optional[str]:
+    """
+    Reason of a failed request, None for other errors (e.g. a parser broken by a site redesign),
+    which say nothing about the song and are not cached. Pages without lyrics are recorded as
+    NO_LYRICS by the caller.
+    """
+    status = failure_status(error)
+    if status is not None:
+        return reason_for_status(status)
+    if isinstance(error, (requests.RequestException, OSError, asyncio.TimeoutError)):
+        return NETWORK_ERROR
+    return None
+
+
+def reason_for_status(status: int) -> str:
+    if status in (404, 410):
+        return NOT_FOUND
+    if status == 429:
+        return RATE_LIMITED
+    return SERVER_ERROR
+
+
+class NegativeCache:
+    """
+    Sources that recently failed to give lyrics for a song, so repeated runs do not spend
+    requests (and rate limit delays) on songs that can not succeed yet.
+
+    Saved as JSON: song -> source -> {time, status, reason}. An entry expires after the TTL of its reason.
+    """
+
+    def __init__(self, cache_path: str, ttls: Optional[Dict[str, float]] = None, enabled=True,
+                 clock: Callable[[], float] = time.time):
+        self.__cache_path = cache_path
+        self.__ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.__enabled = enabled
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__entries: Dict[str, Dict[str, dict]] = self.__read()
+        # Fetches skipped and allowed
+        self.hits = 0
+        self.misses = 0
+
+    def __read(self) -> Dict[str, Dict[str, dict]]:
+        try:
+            with open(self.__cache_path, 'r', encoding='UTF-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return dict()
+        except (OSError, ValueError) as e:
+            log.warning(f'Ignoring unreadable negative cache {self.__cache_path}: ' + str(e))
+            return dict()
+
+    @staticmethod
+    def make_key(song_data: SongData) -> str:
+        return f'{song_data.artist}-{song_data.album}-{song_data.title}'
+
+    def should_skip(self, song_data: SongData, source_name: str) -> bool:
+        with self.__lock:
+            entry = self.__entries.get(self.make_key(song_data), {}).get(source_name)
+            skip = self.__enabled and entry is not None and not self.__expired(entry)
+            if skip:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if skip:
+            log.info(f'\t[SKIP] {source_name} failed for {song_data} ({entry["reason"]}), not asking again yet')
+        return skip
+
+    def record_failure(self, song_data: SongData, source_name: str, reason: str, status: Optional[int] = None):
+        with self.__lock:
+            self.__entries.setdefault(self.make_key(song_data), dict())[source_name] = {
+                'time': self.__clock(),
+                'status': status,
+                'reason': reason,
+            }
+
+    def record_error(self, song_data: SongData, source_name: str, error: Exception):
+        reason = failure_reason(error)
+        if reason is not None:
+            self.record_failure(song_data, source_name, reason, failure_status(error))
+
+    def record_success(self, song_data: SongData):
+        with self.__lock:
+            self.__entries.pop(self.make_key(song_data), None)
+
+    def __expired(self, entry: dict) -> bool:
+        return self.__clock() - entry['time'] >= self.__ttls.get(entry['reason'], 0)
+
+    def save(self):
+        """
+        Save entries that did not expire yet
+        """
+        with self.__lock:
+            entries = dict()
+            for key, sources in self.__entries.items():
+                sources = {name: entry for name, entry in sources.items() if not self.__expired(entry)}
+                if sources:
+                    entries[key] = sources
+        cache_dir = os.path.dirname(os.path.abspath(self.__cache_path))
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = self.__cache_path + TEMP_SUFFIX
+        with open(temp_path, 'w', encoding='UTF-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(temp_path, self.__cache_path)
+        log.info(f'Saved negative cache with {len(entries)} songs to {self.__cache_path}')
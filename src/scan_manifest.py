@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from song_data import SongData
+from storage import TEMP_SUFFIX
+
+log = logging.getLogger("scan_manifest")
+
+
+class ScanManifest:
+    """
+    Tags read in previous runs, keyed by file path. An entry is used only while size and
+    mtime of the file are unchanged, so only new and modified files are opened with mutagen.
+
+    Saved as JSON: path -> {size, mtime_ns, artist, album, title, has_lyrics, format}.
+    Only files seen in the current run are saved, so deleted files drop out.
+    """
+
+    def __init__(self, manifest_path: str, full_rescan=False):
+        self.__manifest_path = manifest_path
+        self.__entries: Dict[str, dict] = dict() if full_rescan else self.__read()
+        self.__seen: Dict[str, dict] = dict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __read(self) -> Dict[str, dict]:
+        try:
+            with open(self.__manifest_path, 'r', encoding='UTF-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return dict()
+        except (OSError, ValueError) as e:
+            log.warning(f'Ignoring unreadable scan manifest {self.__manifest_path}: ' + str(e))
+            return dict()
+
+    def lookup(self, path: str) -> Optional[SongData]:
+        """
+        Return song read in a previous run, None if the file is new or was changed since.
+        Returned songs have no tag, it is opened again when lyrics are embedded.
+        """
+        entry = self.__entries.get(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        with self.__lock:
+            if entry is None or stat is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.__seen[path] = entry
+        return SongData(None, entry['artist'], entry['album'], entry['title'], None, entry['format'], path=path,
+                        has_lyrics=entry['has_lyrics'])
+
+    def update(self, song_data: SongData, has_lyrics: Optional[bool] = None):
+        """
+        Record tags of a song that were just read or written
+        """
+        try:
+            stat = os.stat(song_data.path)
+        except OSError:
+            return
+        entry = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'artist': song_data.artist,
+            'album': song_data.album,
+            'title': song_data.title,
+            'has_lyrics': song_data.has_lyrics() if has_lyrics is None else has_lyrics,
+            'format': song_data.song_format,
+        }
+        with self.__lock:
+            self.__seen[song_data.path] = entry
+
+    def save(self):
+        with self.__lock:
+            entries = dict(self.__seen)
+        manifest_dir = os.path.dirname(os.path.abspath(self.__manifest_path))
+        os.makedirs(manifest_dir, exist_ok=True)
+        temp_path = self.__manifest_path + TEMP_SUFFIX
+        with open(temp_path, 'w', encoding='UTF-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(temp_path, self.__manifest_path)
+        log.info(f'Saved scan manifest with {len(entries)} files to {self.__manifest_path}')
@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, TypeVar
+
+log = logging.getLogger("scheduler")
+
+T = TypeVar('T')
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket. Every call to acquire() takes one token, blocking until
+    one is available. Tokens are refilled at 1 / interval per second up to capacity.
+    """
+
+    def __init__(self, interval: float, capacity: int = 1):
+        self.interval = interval
+        self.capacity = capacity
+        self.__tokens = float(capacity)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token and return how many seconds the caller must wait before using it.
+        """
+        with self.__lock:
+            now = time.monotonic()
+            if self.interval > 0:
+                self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) / self.interval)
+            else:
+                self.__tokens = float(self.capacity)
+            self.__updated = now
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens * self.interval
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class FetchScheduler:
+    """
+    Processes songs on a pool of worker threads while keeping requests polite:
+    each source (host) has its own token bucket, so different hosts are queried in parallel
+    but a single host never sees more than one request per interval.
+    """
+
+    def __init__(self, source_names: Iterable[str], interval: float, workers: int, burst: int = 1):
+        self.workers = workers
+        self.buckets: Dict[str, TokenBucket] = {name: TokenBucket(interval, burst) for name in source_names}
+
+    def wait_turn(self, source_name: str):
+        bucket = self.buckets.get(source_name)
+        if bucket is None:
+            return
+        waited = bucket.acquire()
+        if waited > 0:
+            log.debug(f'\tWaited {waited:.1f}s for {source_name}')
+
+    def run(self, items: Iterable[T], job: Callable[[T], None]) -> int:
+        """
+        Run job for every item. Exceptions are logged, not propagated, so one bad song
+        does not stop the whole library. Returns number of processed items.
+        """
+        processed = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fetch') as executor:
+            futures = [executor.submit(self.__run_job, job, item) for item in items]
+            for future in futures:
+                future.result()
+                processed += 1
+        return processed
+
+    @staticmethod
+    def __run_job(job: Callable[[T], None], item: T):
+        try:
+            job(item)
+        except Exception as e:
+            log.error(f'Failed processing {item}: ' + str(e), exc_info=True)
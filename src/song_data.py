@@ -1,5 +1,12 @@
+from typing import Optional
+
+
 class SongData:
-    def __init__(self, tag, artist: str, album: str, title: str, lyrics: str, song_format: str):
+    # One instance per song of the library, no per-instance __dict__
+    __slots__ = ('song_format', 'lyrics', 'album', 'title', 'tag', 'artist', 'path', '__has_lyrics')
+
+    def __init__(self, tag, artist: str, album: str, title: str, lyrics: str, song_format: str,
+                 path: Optional[str] = None, has_lyrics: Optional[bool] = None):
         if artist is None or album is None or title is None:
             raise Exception('artist, album and title must be not None')
         self.song_format = song_format
@@ -8,6 +15,23 @@ class SongData:
         self.title = title
         self.tag = tag
         self.artist = artist
+        self.path = path
+        # Known from the scan manifest when lyrics text itself was not read
+        self.__has_lyrics = has_lyrics
+
+    def has_lyrics(self) -> bool:
+        if self.__has_lyrics is not None:
+            return self.__has_lyrics
+        return bool(self.lyrics)
+
+    def release_tag(self):
+        """
+        Drop the mutagen tag and lyrics text once they are no longer needed.
+        has_lyrics() keeps answering, the tag is re-opened from path if it is needed again.
+        """
+        self.__has_lyrics = self.has_lyrics()
+        self.tag = None
+        self.lyrics = None
 
     def __str__(self) -> str:
         return f'{self.artist}-{self.album}-{self.title}'
\ No newline at end of file
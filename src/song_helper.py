@@ -10,11 +10,10 @@ from __future__ import unicode_literals
 import logging
 import re
 import sys
-import os
-from typing import Optional, List
-
-import glob2
-import platform
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, List
 
 from mutagen.id3 import ID3, USLT
 from mutagen.mp4 import MP4
@@ -23,13 +22,54 @@ from mutagen.oggvorbis import OggVorbis
 from mutagen.oggflac import OggFLAC
 from mutagen.asf import ASF, ASFUnicodeAttribute
 
+import fast_tags
 from audio_format_keys import FORMAT_KEYS
+from lyrico.helper import iter_audio_files
 from song_data import SongData
 
 log = logging.getLogger(__file__)
 
 audio_formats = ['mp3', 'flac', 'm4a', 'mp4', 'ogg', 'oga', 'wma']
 
+# Padding left after a tag outgrew the existing one and the whole file had to be rewritten anyway,
+# so later edits fit in place
+REWRITE_PADDING = 32 * 1024
+
+
+class PaddingStats:
+    """
+    Padding strategy for mutagen saves. Existing padding is used as is whenever the new tag
+    fits, when it does not a generous one is reserved. Counts in place and rewriting saves by format.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        # format -> [in place, rewritten]
+        self.counts: Dict[str, List[int]] = dict()
+
+    def strategy(self, song_format: str):
+        def choose_padding(info) -> int:
+            in_place = info.padding >= 0
+            with self.__lock:
+                self.counts.setdefault(song_format, [0, 0])[0 if in_place else 1] += 1
+            if in_place:
+                # Also keep padding mutagen would trim, shrinking it means rewriting the file
+                return info.padding
+            return max(REWRITE_PADDING, info.get_default_padding())
+
+        return choose_padding
+
+    def in_place(self) -> int:
+        with self.__lock:
+            return sum(counts[0] for counts in self.counts.values())
+
+    def rewritten(self) -> int:
+        with self.__lock:
+            return sum(counts[1] for counts in self.counts.values())
+
+
+padding_stats = PaddingStats()
+
 
 def sanitize_data(s):
     """Removes excess white-space from strings"""
@@ -166,7 +206,23 @@ def extract_ogg_tag(path):
     return (ogg_tag, error)
 
 
-def get_song_data(path) -> Optional[SongData]:
+def read_tag(path, song_format):
+    """ Open tag of the audio file with mutagen, None for unsupported formats """
+    tag = None
+    if song_format == 'mp3':
+        tag = ID3(path)
+    if song_format == 'mp4' or song_format == 'm4a':
+        tag = MP4(path)
+    if song_format == 'flac':
+        tag = FLAC(path)
+    if song_format == 'wma':
+        tag = ASF(path)
+    if song_format == 'ogg' or song_format == 'oga':
+        tag, error = extract_ogg_tag(path)
+    return tag
+
+
+def get_song_data(path, keep_tag=True, header_only=False) -> Optional[SongData]:
     """
         Extracts song artist, album, title and lyrics if present
         from audio file.
@@ -175,6 +231,10 @@ def get_song_data(path) -> Optional[SongData]:
         the dict returned to instantiate song objects.
 
         'path' is the absolute path to the audio file.
+        When 'keep_tag' is False the mutagen tag is not kept in the result,
+        it is opened again from 'path' when lyrics are embedded.
+        With 'header_only' only the needed frames are read (see fast_tags),
+        the result has no tag. Files fast_tags can not handle are read with mutagen.
     """
 
     tag = None
@@ -189,17 +249,15 @@ def get_song_data(path) -> Optional[SongData]:
     # only use lowercase for formats
     song_format = path[path.rfind('.') + 1:].lower()
 
+    if header_only:
+        fields = fast_tags.read_fields(path, song_format)
+        if fields is not None:
+            return SongData(None, sanitize_data(fields[fast_tags.ARTIST]), sanitize_data(fields[fast_tags.ALBUM]),
+                            sanitize_data(fields[fast_tags.TITLE]), sanitize_data(fields[fast_tags.LYRICS]),
+                            song_format, path=path)
+
     try:
-        if song_format == 'mp3':
-            tag = ID3(path)
-        if song_format == 'mp4' or song_format == 'm4a':
-            tag = MP4(path)
-        if song_format == 'flac':
-            tag = FLAC(path)
-        if song_format == 'wma':
-            tag = ASF(path)
-        if song_format == 'ogg' or song_format == 'oga':
-            tag, error = extract_ogg_tag(path)
+        tag = read_tag(path, song_format)
     except Exception as e:
         log.error("Failed to parse existing html: " + str(e), exc_info=True)
         return None
@@ -210,37 +268,83 @@ def get_song_data(path) -> Optional[SongData]:
         album = get_key(tag, FORMAT_KEYS[song_format]['album'], song_format)
         lyrics = get_key(tag, FORMAT_KEYS[song_format]['lyrics'], song_format)
 
-    return SongData(tag, artist, album, title, lyrics, song_format)
+    return SongData(tag if keep_tag else None, artist, album, title, lyrics, song_format, path=path)
 
 
-def get_song_list(path) -> List[str]:
-    """ Return list of paths to all valid audio files in dir located at path.
-        Valid audio formats are imported from settings module.
-        Also checks for any inner directories."""
+def scan_song_data(paths: Iterable[str], workers: int, use_processes=True, manifest=None,
+                   header_only=False) -> Iterator[SongData]:
+    """
+        Read tags of all files on a pool of 'workers' processes (or threads) and yield
+        songs in the order of 'paths' as soon as they are read, so callers can start
+        working before the whole library is scanned.
 
-    song_list = []
+        Files that could not be read are logged and skipped. Processes do not send
+        mutagen tags back (they may hold cover art), embedding re-opens the file instead.
 
-    for ext in audio_formats:
-        pattern = '**/*.' + ext
-        pattern_uppercase = '**/*.' + ext.upper()
+        Files unchanged since they were recorded in the ScanManifest 'manifest' are not
+        opened at all, newly read files are recorded in it. 'header_only' is passed to get_song_data.
+    """
+    if use_processes:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scan')
+    keep_tag = not use_processes
+    # Bounded number of files read ahead of the consumer
+    read_ahead = workers * 4
+    pending = deque()
+    with executor:
+        for path in paths:
+            song_data = manifest.lookup(path) if manifest is not None else None
+            if song_data is not None:
+                pending.append((path, None, song_data))
+            else:
+                pending.append((path, executor.submit(get_song_data, path, keep_tag, header_only), None))
+            if len(pending) >= read_ahead:
+                song_data = _scan_result(*pending.popleft(), manifest)
+                if song_data is not None:
+                    yield song_data
+        while pending:
+            song_data = _scan_result(*pending.popleft(), manifest)
+            if song_data is not None:
+                yield song_data
+
+
+def _scan_result(path, future, song_data, manifest) -> Optional[SongData]:
+    if song_data is not None:
+        return song_data
+    log.info(f'Reading file: {path}')
+    try:
+        song_data = future.result()
+    except Exception as e:
+        log.error(f'[ERR] Failed reading tags of {path}: ' + str(e))
+        return None
+    if song_data is not None and manifest is not None:
+        manifest.update(song_data)
+    return song_data
 
-        song_list.extend(glob2.glob(os.path.join(path, pattern)))
 
-        # Windows is case-insensitive towards extensions. So the glob2 module detects
-        # ex. .ogg and .OGG as well. But in Linux the extensions are case-sensitive.
+def iter_song_files(path, follow_symlinks=False, skip_hidden=True) -> Iterator[str]:
+    """ Lazily yield paths of all valid audio files in dir located at path and its inner directories.
+        The tree is walked once, extensions are matched case-insensitively. """
+    return iter_audio_files(path, audio_formats, follow_symlinks, skip_hidden)
 
-        # Add detection for uppercase extensions
-        if platform.system() == 'Linux':
-            song_list.extend(glob2.glob(os.path.join(path, pattern_uppercase)))
 
-    return song_list
+def get_song_list(path) -> List[str]:
+    """ Return list of paths to all valid audio files in dir located at path.
+        Valid audio formats are imported from settings module.
+        Also checks for any inner directories."""
+    return list(iter_song_files(path))
 
 
-def embedd_lyrics_in_song(song_data: SongData, lyrics: str):
+def embedd_lyrics_in_song(song_data: SongData, lyrics: str) -> bool:
     song_format = song_data.song_format
     tag = song_data.tag
     lyrics_key = FORMAT_KEYS[song_format]['lyrics']
     try:
+        if tag is None:
+            # Tags read in a scan process are not kept in memory
+            tag = read_tag(song_data.path, song_format)
+
         if song_format == 'mp3':
             # encoding = 3 for UTF-8
             tag.add(USLT(encoding=3, lang=u'eng', desc=u'lyrics.wikia',
@@ -263,6 +367,8 @@ def embedd_lyrics_in_song(song_data: SongData, lyrics: str):
             # ASF Format uses ASFUnicodeAttribute objects instead of Python's Unicode
             tag[lyrics_key] = ASFUnicodeAttribute(lyrics)
 
-        tag.save()
+        tag.save(padding=padding_stats.strategy(song_format))
+        return True
     except Exception as e:
         log.error("Failed to save lyrics to file: " + str(e), exc_info=True)
+        return False
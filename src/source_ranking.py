@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from song_data import SongData
+from sources.lyrics_source import LyricsSource
+from storage import TEMP_SUFFIX
+
+log = logging.getLogger("source_ranking")
+
+# Attempts needed before stats of an artist are trusted over the overall stats of a source
+MIN_ARTIST_ATTEMPTS = 3
+
+
+class SourceStats:
+    __slots__ = ('attempts', 'hits', 'seconds')
+
+    def __init__(self, attempts=0, hits=0, seconds=0.0):
+        self.attempts = attempts
+        self.hits = hits
+        self.seconds = seconds
+
+    def hit_rate(self) -> float:
+        # Smoothed, so a source is neither written off nor trusted after a single attempt
+        return (self.hits + 1) / (self.attempts + 2)
+
+    def latency(self) -> Optional[float]:
+        return self.seconds / self.attempts if self.attempts else None
+
+    def to_json(self) -> list:
+        return [self.attempts, self.hits, round(self.seconds, 3)]
+
+
+class SourceRanking:
+    """
+    Per source hit rate and latency of requests, overall and per artist, kept between runs.
+
+    order() tries sources that found lyrics most often (for the artist, once it has MIN_ARTIST_ATTEMPTS
+    attempts, otherwise overall) first. Sources with about the same hit rate are ordered by latency and
+    sources without stats keep the configured order. Requests expected to be saved compared to the
+    configured order are summed for the summary.
+    """
+
+    def __init__(self, ranking_path: str, enabled=True):
+        self.__ranking_path = ranking_path
+        self.__enabled = enabled
+        self.__lock = threading.Lock()
+        self.__sources: Dict[str, SourceStats] = dict()
+        self.__artists: Dict[str, Dict[str, SourceStats]] = dict()
+        self.__read()
+        self.reordered = 0
+        self.expected_saved = 0.0
+
+    def __read(self):
+        try:
+            with open(self.__ranking_path, 'r', encoding='UTF-8') as f:
+                data = json.load(f)
+            self.__sources = {name: SourceStats(*values) for name, values in data['sources'].items()}
+            self.__artists = {artist: {name: SourceStats(*values) for name, values in sources.items()}
+                              for artist, sources in data['artists'].items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning(f'Ignoring unreadable source ranking {self.__ranking_path}: ' + str(e))
+
+    def order(self, song_data: SongData, lyrics_sources: Sequence[LyricsSource]) -> List[LyricsSource]:
+        if not self.__enabled:
+            return list(lyrics_sources)
+        with self.__lock:
+            rated = [self.__rate(song_data.artist, source.get_name()) for source in lyrics_sources]
+        # Within a bucket of about the same hit rate, sources without latency go after measured ones
+        ranked = sorted(range(len(lyrics_sources)),
+                        key=lambda i: (-round(rated[i][0], 1), rated[i][1] is None, rated[i][1] or 0.0))
+        ordered = [lyrics_sources[i] for i in ranked]
+        if ranked != list(range(len(lyrics_sources))):
+            configured = expected_requests([rate for rate, _ in rated])
+            saved = configured - expected_requests([rated[i][0] for i in ranked])
+            with self.__lock:
+                self.reordered += 1
+                self.expected_saved += saved
+            log.info(f'\tSource order for {song_data}: {", ".join(source.get_name() for source in ordered)} '
+                     f'(hit rates {", ".join(f"{rated[i][0]:.2f}" for i in ranked)})')
+        return ordered
+
+    def __rate(self, artist: str, source_name: str) -> Tuple[float, Optional[float]]:
+        stats = self.__artists.get(artist, {}).get(source_name)
+        if stats is None or stats.attempts < MIN_ARTIST_ATTEMPTS:
+            stats = self.__sources.get(source_name, SourceStats())
+        return stats.hit_rate(), stats.latency()
+
+    def record(self, song_data: SongData, source_name: str, found: bool, seconds: float):
+        with self.__lock:
+            for stats in (self.__sources.setdefault(source_name, SourceStats()),
+                          self.__artists.setdefault(song_data.artist, dict()).setdefault(source_name, SourceStats())):
+                stats.attempts += 1
+                stats.hits += 1 if found else 0
+                stats.seconds += seconds
+
+    def save(self):
+        with self.__lock:
+            data = {
+                'sources': {name: stats.to_json() for name, stats in self.__sources.items()},
+                'artists': {artist: {name: stats.to_json() for name, stats in sources.items()}
+                            for artist, sources in self.__artists.items()},
+            }
+        ranking_dir = os.path.dirname(os.path.abspath(self.__ranking_path))
+        os.makedirs(ranking_dir, exist_ok=True)
+        temp_path = self.__ranking_path + TEMP_SUFFIX
+        with open(temp_path, 'w', encoding='UTF-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self.__ranking_path)
+
+    def log_summary(self):
+        log.info(f'Source ranking: {self.reordered} songs tried in a different order, '
+                 f'{self.expected_saved:.1f} requests expected to be saved')
+        for name, stats in sorted(self.__sources.items()):
+            log.info(f'\t{name}: {stats.hits}/{stats.attempts} found, mean latency {stats.latency() or 0.0:.2f}s')
+
+
+def expected_requests(hit_rates: Sequence[float]) -> float:
+    """
+    Expected number of requests when sources are tried in the given order until one finds lyrics
+    """
+    expected = 0.0
+    not_found_yet = 1.0
+    for hit_rate in hit_rates:
+        expected += not_found_yet
+        not_found_yet *= 1 - hit_rate
+    return expected
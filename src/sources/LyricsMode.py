@@ -3,9 +3,8 @@ import re
 from typing import Optional
 from string import ascii_lowercase as LOWERCASE_CHARS
 
-from bs4 import BeautifulSoup
-
 from build_requests import get_request_headers
+from lyrico.lyrico_sources.html_parser import make_soup, strainer
 from lyrico.lyrico_sources.lyrics_helper import remove_accents, test_lyrics
 from song_data import SongData
 from sources.lyrics_source import LyricsSource
@@ -13,6 +12,7 @@ from sources.lyrics_source import LyricsSource
 request_headers = get_request_headers()
 regex_non_alphanumeric = re.compile(r'[^a-z0-9\s\-]+')
 regex_underscores = re.compile(r'[\s|\-]+')
+lyrics_strainer = strainer(id='lyrics_text')
 
 log = logging.getLogger("LyricsMode")
 
@@ -40,7 +40,7 @@ class LyricsMode(LyricsSource):
         return 'http://www.lyricsmode.com/lyrics/%s/%s/%s.html' % (first_artist_char, artist, title), request_headers
 
     def parse_lyrics(self, html: str, song_title) -> Optional[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html, lyrics_strainer)
 
         # For lyricsmode, the lyrics are present in a div with id 'lyrics_text'
         lyrics_text = soup.find(id='lyrics_text')
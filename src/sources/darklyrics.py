@@ -1,10 +1,12 @@
+import hashlib
 import re
 from typing import Optional, Dict
 
-from bs4 import BeautifulSoup
-
+import stats
 from build_requests import get_request_headers
+from lyrico.lyrico_sources.html_parser import make_soup, strainer
 from song_data import SongData
+from sources.helper import LruCache
 from sources.lyrics_source import LyricsSource
 
 regex_non_alphanumeric = re.compile(r'[^a-z0-9]+')
@@ -12,6 +14,12 @@ request_headers = get_request_headers()
 
 starts_with_number_pattern = re.compile(r'^\d+\.\s')
 
+# Lyrics of all songs of the album are in 'div.lyrics', nothing else of the page is parsed
+lyrics_strainer = strainer('div', class_='lyrics')
+
+# How many parsed album pages are kept in memory
+ALBUM_CACHE_SIZE = 64
+
 
 def format_song(current_song):
     lower_case_song_name = current_song.lower()
@@ -22,6 +30,9 @@ def format_song(current_song):
 class DarkLyrics(LyricsSource):
     def __init__(self):
         super().__init__('Dark_Lyrics')
+        # Parsed album pages keyed by hash of the page, so every track of an album reuses one parse
+        self.album_cache = LruCache(ALBUM_CACHE_SIZE)
+        stats.register_cache('Dark_Lyrics parsed albums', self.album_cache)
 
     def is_album(self) -> bool:
         return True
@@ -32,12 +43,25 @@ class DarkLyrics(LyricsSource):
         return f'http://www.darklyrics.com/lyrics/{artist}/{album}.html', request_headers
 
     def parse_lyrics(self, html: str, song_title) -> Optional[str]:
-        soup = BeautifulSoup(html, 'html.parser')
-        songs_with_lyrics = self.__split_by_songs(soup)
-        if not songs_with_lyrics or len(songs_with_lyrics) == 0:
+        return self.lyrics_for_title(self.parse_album(html), song_title)
+
+    def parse_album(self, html: str) -> Optional[Dict[str, str]]:
+        key = hashlib.sha1(html.encode('UTF-8')).hexdigest()
+        album = self.album_cache.get(key)
+        if album is None:
+            soup = make_soup(html, lyrics_strainer)
+            # Pages without lyrics are cached as empty albums
+            album = self.__split_by_songs(soup) or dict()
+            self.album_cache.put(key, album)
+        return album
+
+    def lyrics_for_title(self, album: Optional[Dict[str, str]], song_title) -> Optional[str]:
+        if not album or len(album) == 0:
             return None
 
-        song_lyrics = songs_with_lyrics[format_song(song_title)]
+        song_lyrics = album.get(format_song(song_title))
+        if song_lyrics is None:
+            return None
         if song_lyrics == '':
             return '[Instrumental]'
         else:
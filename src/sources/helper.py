@@ -1,4 +1,7 @@
+import threading
 import unicodedata
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
 
 
 def remove_accents(input_str):
@@ -35,3 +38,36 @@ def test_lyrics(lyrics: str) -> bool:
         return False
 
     return True
+
+
+class LruCache:
+    """
+    Thread safe dictionary bounded to max_size entries, least recently used entries are evicted first.
+    Counts hits and misses of get().
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return self.__entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
@@ -4,10 +4,9 @@ import logging
 import re
 from typing import Optional
 
-import requests
-from bs4 import BeautifulSoup
-
 from build_requests import get_request_headers, get_lnm_api_key
+from lyrico.lyrico_sources.html_parser import make_soup, strainer
+from lyrico.lyrico_sources.http_session import http_get
 from song_data import SongData
 from sources.helper import test_lyrics
 from sources.lyrics_source import LyricsSource
@@ -15,6 +14,7 @@ from sources.lyrics_source import LyricsSource
 request_headers = get_request_headers()
 api_key = get_lnm_api_key()
 request_headers['Content-type'] = 'application/json'
+lyrics_strainer = strainer(id='main')
 
 log = logging.getLogger("LyricsnMusic")
 
@@ -35,7 +35,7 @@ class LyricsnMusic(LyricsSource):
         }
 
         request_headers['Content-type'] = 'application/json'
-        r_json = requests.get('http://api.lyricsnmusic.com/songs', params=data, headers=request_headers)
+        r_json = http_get('http://api.lyricsnmusic.com/songs', params=data, headers=request_headers)
         r_json.raise_for_status()
         resp_json = json.loads(r_json.text)
         if not resp_json:
@@ -50,7 +50,7 @@ class LyricsnMusic(LyricsSource):
         return lyrics_url, request_headers
 
     def parse_lyrics(self, html: str, song_title) -> Optional[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html, lyrics_strainer)
 
         # LYRICSnMUSIC pages hold lyrics in a <pre> tag contained in <div> with id='main'
         main_div = soup.find(id="main")
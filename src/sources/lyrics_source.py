@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Optional
+from typing import Dict, Optional
 
 from song_data import SongData
 
@@ -19,5 +19,17 @@ class LyricsSource:
     def parse_lyrics(self, html: str, song_title) -> Optional[str]:
         raise NotImplementedError("Please Implement this method")
 
+    def parse_album(self, html: str) -> Optional[Dict[str, str]]:
+        """
+        Album sources only: parse whole album page once into {formatted title: lyrics}
+        """
+        raise NotImplementedError("Please Implement this method")
+
+    def lyrics_for_title(self, album: Optional[Dict[str, str]], song_title) -> Optional[str]:
+        """
+        Album sources only: look up lyrics of one song in result of parse_album
+        """
+        raise NotImplementedError("Please Implement this method")
+
     def get_name(self) -> str:
         return self.name
@@ -4,9 +4,8 @@ import sys
 from typing import Optional
 from urllib.parse import quote
 
-from bs4 import BeautifulSoup
-
 from build_requests import get_request_headers
+from lyrico.lyrico_sources.html_parser import make_soup, strainer
 from song_data import SongData
 from sources.helper import test_lyrics
 from sources.lyrics_source import LyricsSource
@@ -15,6 +14,7 @@ request_headers = get_request_headers()
 
 regex_non_alphanum = re.compile(r'[^\w\s\-]*', re.UNICODE)
 regex_spaces = re.compile(r'[\s]+', re.UNICODE)
+lyrics_strainer = strainer('p', class_='mxm-lyrics__content')
 
 log = logging.getLogger("LyricsSource")
 
@@ -48,7 +48,7 @@ class MusixMatch(LyricsSource):
         return res
 
     def parse_lyrics(self, html: str, song_title) -> Optional[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html, lyrics_strainer)
         lyrics = ''
         all_p_elements = soup.findAll('p', {"class": "mxm-lyrics__content"})
         for p in all_p_elements:
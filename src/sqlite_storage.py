@@ -0,0 +1,254 @@
+"""
+SQLite backed drop-in replacement for the directory tree Storage.
+
+All pages live in one database file (WAL mode) instead of one file per
+artist/album/title/source, so a cache of hundreds of thousands of pages
+does not cost as many inodes and directory lookups.
+
+Import an existing directory tree:
+  python sqlite_storage.py migrate <storage_root_dir> <database_file> [--compression gzip]
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+from song_data import SongData
+from storage import META_SUFFIX, TEMP_SUFFIX
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+log = logging.getLogger("sqlite_storage")
+
+NO_COMPRESSION = 'none'
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+# Album level pages are stored with an empty title
+ALBUM_TITLE = ''
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    artist TEXT NOT NULL,
+    album TEXT NOT NULL,
+    title TEXT NOT NULL,
+    source TEXT NOT NULL,
+    compression TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_encoding TEXT,
+    PRIMARY KEY (artist, album, title, source)
+)
+'''
+
+# Response metadata columns, added to databases created before they existed
+METADATA_COLUMNS = ('etag', 'last_modified', 'content_encoding')
+
+
+def compress(text: str, compression: str) -> bytes:
+    data = text.encode('UTF-8')
+    if compression == GZIP:
+        return gzip.compress(data, compresslevel=6)
+    if compression == ZSTD:
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def decompress(body: bytes, compression: str) -> str:
+    if compression == GZIP:
+        # Header auto detection also reads pages stored as zlib streams by earlier versions
+        body = zlib.decompress(body, 32 + zlib.MAX_WBITS)
+    elif compression == ZSTD:
+        if zstandard is None:
+            raise Exception('Page is zstd compressed, but zstandard is not installed')
+        body = zstandard.ZstdDecompressor().decompress(body)
+    return body.decode('UTF-8')
+
+
+class SqliteStorage:
+    """
+    Same get_sources/load/store API as Storage. Every thread uses its own connection.
+    """
+
+    def __init__(self, db_path: str, compression: str = NO_COMPRESSION):
+        if compression == ZSTD and zstandard is None:
+            log.warning('zstandard is not installed, html is compressed with gzip instead')
+            compression = GZIP
+        if compression not in (NO_COMPRESSION, GZIP, ZSTD):
+            raise Exception(f'Unknown compression: {compression}')
+        self.__db_path = db_path
+        self.__compression = compression
+        self.__local = threading.local()
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        with self.__connection() as connection:
+            connection.execute(SCHEMA)
+            columns = {row[1] for row in connection.execute('PRAGMA table_info(pages)')}
+            for column in METADATA_COLUMNS:
+                if column not in columns:
+                    connection.execute(f'ALTER TABLE pages ADD COLUMN {column} TEXT')
+
+    def __connection(self) -> sqlite3.Connection:
+        connection = getattr(self.__local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.__db_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.__local.connection = connection
+        return connection
+
+    def get_sources(self, song_data: SongData) -> List[str]:
+        """
+        Return list of sources for which html is available
+        """
+        rows = self.__connection().execute(
+            'SELECT source FROM pages WHERE artist = ? AND album = ? AND title IN (?, ?) ORDER BY title != ?',
+            (song_data.artist, song_data.album, ALBUM_TITLE, song_data.title, ALBUM_TITLE))
+        return [source for (source,) in rows]
+
+    def load(self, source: str, song_data: SongData, is_album=False) -> str:
+        row = self.__connection().execute(
+            'SELECT compression, body FROM pages WHERE artist = ? AND album = ? AND title = ? AND source = ?',
+            (song_data.artist, song_data.album, self.__title(song_data, is_album), source)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f'No {source} page stored for {song_data}')
+        compression, body = row
+        return decompress(body, compression)
+
+    def load_metadata(self, source: str, song_data: SongData, is_album=False) -> Dict[str, str]:
+        """
+        Return response metadata stored with the page, empty when there is none
+        """
+        row = self.__connection().execute(
+            'SELECT etag, last_modified, content_encoding FROM pages '
+            'WHERE artist = ? AND album = ? AND title = ? AND source = ?',
+            (song_data.artist, song_data.album, self.__title(song_data, is_album), source)).fetchone()
+        if row is None:
+            return dict()
+        return {column: value for column, value in zip(METADATA_COLUMNS, row) if value}
+
+    def store(self, source: str, song_data: SongData, text: str, is_album=False,
+              metadata: Optional[Dict[str, str]] = None):
+        if not text:
+            raise Exception('Text must not be none')
+        with self.__connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO pages (artist, album, title, source, compression, body, '
+                'etag, last_modified, content_encoding) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (song_data.artist, song_data.album, self.__title(song_data, is_album), source,
+                 self.__compression, compress(text, self.__compression)) + metadata_values(metadata))
+
+    def store_metadata(self, source: str, song_data: SongData, metadata: Dict[str, str], is_album=False):
+        with self.__connection() as connection:
+            connection.execute(
+                'UPDATE pages SET etag = ?, last_modified = ?, content_encoding = ? '
+                'WHERE artist = ? AND album = ? AND title = ? AND source = ?',
+                metadata_values(metadata) +
+                (song_data.artist, song_data.album, self.__title(song_data, is_album), source))
+
+    def import_tree(self, root_path: str, batch_size: int = 1000) -> int:
+        """
+        Import all pages of a directory tree Storage rooted at root_path. Returns number of imported pages.
+        """
+        imported = 0
+        batch = []
+        for artist, album, title, source, path in walk_tree(root_path):
+            with open(path, 'r', encoding='UTF-8') as f:
+                text = f.read()
+            batch.append((artist, album, title, source, self.__compression, compress(text, self.__compression))
+                         + metadata_values(read_metadata(path + META_SUFFIX)))
+            if len(batch) >= batch_size:
+                imported += self.__insert(batch)
+                batch = []
+        if batch:
+            imported += self.__insert(batch)
+        return imported
+
+    def __insert(self, rows) -> int:
+        with self.__connection() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO pages (artist, album, title, source, compression, body, '
+                'etag, last_modified, content_encoding) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        log.info(f'Imported {len(rows)} pages')
+        return len(rows)
+
+    def close(self):
+        connection = getattr(self.__local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
+
+    @staticmethod
+    def __title(song_data: SongData, is_album: bool) -> str:
+        return ALBUM_TITLE if is_album else song_data.title
+
+
+def metadata_values(metadata: Optional[Dict[str, str]]) -> tuple:
+    metadata = metadata or dict()
+    return tuple(metadata.get(column) for column in METADATA_COLUMNS)
+
+
+def read_metadata(path: str) -> Dict[str, str]:
+    try:
+        with open(path, 'r', encoding='UTF-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return dict()
+
+
+def walk_tree(root_path: str):
+    """
+    Yield (artist, album, title, source, path) of every page in a directory tree Storage.
+    Album level pages have an empty title.
+    """
+    for artist in os.scandir(root_path):
+        if not artist.is_dir():
+            continue
+        for album in os.scandir(artist.path):
+            if not album.is_dir():
+                continue
+            for entry in os.scandir(album.path):
+                if entry.is_file() and not entry.name.endswith((TEMP_SUFFIX, META_SUFFIX)):
+                    yield artist.name, album.name, ALBUM_TITLE, entry.name, entry.path
+                elif entry.is_dir():
+                    for page in os.scandir(entry.path):
+                        if page.is_file() and not page.name.endswith((TEMP_SUFFIX, META_SUFFIX)):
+                            yield artist.name, album.name, entry.name, page.name, page.path
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = p.add_subparsers(dest='command', required=True)
+    migrate = commands.add_parser('migrate', help='Import a directory tree storage into a database')
+    migrate.add_argument('root_dir', help='Root directory of the existing storage')
+    migrate.add_argument('db_path', help='Database file, created if missing')
+    migrate.add_argument('--compression', choices=[NO_COMPRESSION, GZIP, ZSTD], default=NO_COMPRESSION)
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(filename)s:%(lineno)d] %(message)s')
+    args = parse_args(argv)
+    if not os.path.isdir(args.root_dir):
+        log.error(f'Storage directory does not exist: {args.root_dir}')
+        return 1
+    storage = SqliteStorage(args.db_path, args.compression)
+    imported = storage.import_tree(args.root_dir)
+    storage.close()
+    log.info(f'Imported {imported} pages from {args.root_dir} into {args.db_path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,29 +1,56 @@
+import logging
+import threading
 from typing import Dict
 
+log = logging.getLogger("stats")
 
-class Status:
-    def __init__(self):
-        pass
+SUCCESS = 'success'
+FAILED = 'failed'
+EXISTS = 'exists'
 
+__lock = threading.Lock()
 
-stats: Dict[str, Status] = dict()
+stats: Dict[str, str] = dict()
+
+# Named objects with 'hits' and 'misses' counters, reported in the summary
+caches: Dict[str, object] = dict()
 
 
 def mk_key(artist: str, title: str) -> str:
     return f'{artist}-{title}'
 
 
+def __set(artist: str, title: str, status: str):
+    with __lock:
+        stats[mk_key(artist, title)] = status
+
+
 def set_success(artist: str, title: str):
-    stats[mk_key(artist, title)]
+    __set(artist, title, SUCCESS)
 
 
 def set_failed(artist: str, title: str):
-    pass
+    __set(artist, title, FAILED)
 
 
 def set_exists(artist: str, title: str):
-    pass
+    __set(artist, title, EXISTS)
+
+
+def register_cache(name: str, cache):
+    caches[name] = cache
+
+
+def count(status: str) -> int:
+    with __lock:
+        return sum(1 for value in stats.values() if value == status)
 
 
 def print_stats():
-    pass
+    log.info("------------------------------")
+    log.info(f'Songs processed: {len(stats)}')
+    log.info(f'\tLyrics found: {count(SUCCESS)}')
+    log.info(f'\tLyrics already present: {count(EXISTS)}')
+    log.info(f'\tLyrics not found: {count(FAILED)}')
+    for name, cache in caches.items():
+        log.info(f'\t{name}: {cache.hits} hits, {cache.misses} misses')
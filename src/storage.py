@@ -1,52 +1,108 @@
 import codecs
+import json
 import os.path
+import threading
 from os import walk
-from typing import List
+from typing import Dict, List, Optional
 
 from song_data import SongData
 
+TEMP_SUFFIX = '.tmp'
+# Response metadata (ETag, Last-Modified, Content-Encoding) of a page is kept next to it in '<source>.meta'
+META_SUFFIX = '.meta'
+
 
 class Storage:
     def __init__(self, root_path):
         self.__root_path = root_path
-        pass
+        # Stored sources by directory relative to root, built by one walk of the whole tree on first use
+        self.__index: Optional[Dict[str, List[str]]] = None
+        self.__index_lock = threading.Lock()
 
     def get_sources(self, song_data: SongData) -> List[str]:
         """
         Return list of sources for which html is available
         """
-        result = []
-        album_path = self.__make_dir_path_album(song_data)
-        title_path = self.__make_dir_path(song_data)
-        for (curr_dir, _, filenames) in walk(album_path):
-            if album_path == curr_dir:
-                result.extend(filenames)
-            elif title_path == curr_dir:
-                result.extend(filenames)
-        return result
+        index = self.__get_index()
+        album_sources = index.get(self.__make_key(self.__make_dir_path_album(song_data)), [])
+        title_sources = index.get(self.__make_key(self.__make_dir_path(song_data)), [])
+        return album_sources + title_sources
 
     def load(self, source: str, song_data: SongData, is_album=False) -> str:
-        if is_album:
-            dir_path = self.__make_dir_path_album(song_data)
-        else:
-            dir_path = self.__make_dir_path(song_data)
-        target = os.path.join(dir_path, source)
-        os.makedirs(dir_path, exist_ok=True)
+        target = os.path.join(self.__make_dir_path_for(song_data, is_album), source)
         with codecs.open(target, 'r', 'UTF-8') as f:
             return str(f.read())
 
-    def store(self, source: str, song_data: SongData, text: str, is_album=False):
+    def load_metadata(self, source: str, song_data: SongData, is_album=False) -> Dict[str, str]:
+        """
+        Return response metadata stored with the page, empty when there is none
+        """
+        target = os.path.join(self.__make_dir_path_for(song_data, is_album), source + META_SUFFIX)
+        try:
+            with codecs.open(target, 'r', 'UTF-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict()
+
+    def store(self, source: str, song_data: SongData, text: str, is_album=False,
+              metadata: Optional[Dict[str, str]] = None):
         if not text:
             raise Exception('Text must not be none')
-        if is_album:
-            dir_path = self.__make_dir_path_album(song_data)
-        else:
-            dir_path = self.__make_dir_path(song_data)
+        dir_path = self.__make_dir_path_for(song_data, is_album)
         target = os.path.join(dir_path, source)
         os.makedirs(dir_path, exist_ok=True)
-        with codecs.open(target, 'w', 'UTF-8') as f:
+        self.__write(target, text)
+        if metadata:
+            self.__write(target + META_SUFFIX, json.dumps(metadata))
+        else:
+            # Validators of the previous page do not match the new one
+            try:
+                os.remove(target + META_SUFFIX)
+            except FileNotFoundError:
+                pass
+
+        with self.__index_lock:
+            # An index not built yet picks the file up when it walks the tree
+            if self.__index is not None:
+                sources = self.__index.setdefault(self.__make_key(dir_path), [])
+                if source not in sources:
+                    sources.append(source)
+
+    def store_metadata(self, source: str, song_data: SongData, metadata: Dict[str, str], is_album=False):
+        dir_path = self.__make_dir_path_for(song_data, is_album)
+        self.__write(os.path.join(dir_path, source + META_SUFFIX), json.dumps(metadata))
+
+    @staticmethod
+    def __write(target: str, text: str):
+        # Write to a temporary file first so that concurrent readers never see a half written page
+        temp_target = f'{target}.{threading.get_ident()}{TEMP_SUFFIX}'
+        with codecs.open(temp_target, 'w', 'UTF-8') as f:
             f.write(text)
             f.flush()
+        os.replace(temp_target, target)
+
+    def __get_index(self) -> Dict[str, List[str]]:
+        with self.__index_lock:
+            if self.__index is None:
+                self.__index = self.__build_index()
+            return self.__index
+
+    def __build_index(self) -> Dict[str, List[str]]:
+        index = dict()
+        for (curr_dir, _, filenames) in walk(self.__root_path):
+            sources = [name for name in filenames if not name.endswith((TEMP_SUFFIX, META_SUFFIX))]
+            if sources:
+                index[self.__make_key(curr_dir)] = sources
+        return index
+
+    def __make_key(self, dir_path: str) -> str:
+        # normcase makes keys case insensitive where the file system is (Windows)
+        return os.path.normcase(os.path.relpath(dir_path, self.__root_path))
+
+    def __make_dir_path_for(self, song_data: SongData, is_album: bool) -> str:
+        if is_album:
+            return self.__make_dir_path_album(song_data)
+        return self.__make_dir_path(song_data)
 
     def __make_dir_path_album(self, song_data: SongData) -> str:
         return os.path.join(self.__root_path, song_data.artist, song_data.album)
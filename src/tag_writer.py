@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from song_data import SongData
+from song_helper import embedd_lyrics_in_song, padding_stats
+from storage import TEMP_SUFFIX
+
+log = logging.getLogger("tag_writer")
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+class TagWriter:
+    """
+    Write-behind queue for embedding lyrics, so slow tag rewrites do not hold up fetching.
+
+    submit() records the write in a journal (JSON lines) and queues it. Writer threads embed
+    the lyrics, then every `fsync_batch` writes the files are fsynced together and marked
+    done in the journal. Writes still pending in the journal of an interrupted run are
+    replayed by start(). At most `max_backlog` writes are queued, submit() blocks when the
+    writers fall behind.
+    """
+
+    def __init__(self, journal_path: str, workers: int = 2, max_backlog: int = 256, fsync_batch: int = 16,
+                 on_written: Optional[Callable[[SongData], None]] = None,
+                 embed: Callable[[SongData, str], bool] = embedd_lyrics_in_song):
+        self.journal_path = journal_path
+        self.workers = workers
+        self.fsync_batch = fsync_batch
+        self.on_written = on_written
+        self.embed = embed
+        self.__queue: queue.Queue = queue.Queue(max_backlog)
+        self.__journal = None
+        self.__journal_lock = threading.Lock()
+        self.__next_id = 0
+        self.__pending: Dict[int, dict] = dict()
+        # Written, but neither fsynced nor marked done yet
+        self.__unsynced: List[Tuple[int, SongData]] = []
+        self.__threads: List[threading.Thread] = []
+        # Seconds spent writing tags by song format
+        self.latencies: Dict[str, List[float]] = dict()
+        self.failed = 0
+        self.replayed = 0
+
+    def start(self) -> 'TagWriter':
+        journal_dir = os.path.dirname(os.path.abspath(self.journal_path))
+        os.makedirs(journal_dir, exist_ok=True)
+        leftover = read_journal(self.journal_path)
+        # Compact the journal to the writes that are still pending, replaced atomically
+        temp_path = self.journal_path + TEMP_SUFFIX
+        with open(temp_path, 'w', encoding='UTF-8') as f:
+            for write_id, entry in enumerate(leftover):
+                entry['id'] = write_id
+                self.__pending[write_id] = entry
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.journal_path)
+        self.__next_id = len(leftover)
+        self.__journal = open(self.journal_path, 'a', encoding='UTF-8')
+
+        self.__threads = [threading.Thread(target=self.__write_loop, name=f'tag-writer-{i}', daemon=True)
+                          for i in range(self.workers)]
+        for thread in self.__threads:
+            thread.start()
+        if leftover:
+            log.info(f'Replaying {len(leftover)} tag writes of an interrupted run')
+        for entry in leftover:
+            song_data = SongData(None, entry['artist'], entry['album'], entry['title'], None, entry['format'],
+                                 path=entry['path'])
+            self.__queue.put((entry['id'], song_data, entry['lyrics']))
+            self.replayed += 1
+        return self
+
+    def submit(self, song_data: SongData, lyrics: str):
+        entry = {
+            'op': PENDING,
+            'path': song_data.path,
+            'format': song_data.song_format,
+            'artist': song_data.artist,
+            'album': song_data.album,
+            'title': song_data.title,
+            'lyrics': lyrics,
+        }
+        with self.__journal_lock:
+            entry['id'] = self.__next_id
+            self.__next_id += 1
+            self.__pending[entry['id']] = entry
+            self.__append(entry)
+            self.__journal.flush()
+        self.__queue.put((entry['id'], song_data, lyrics))
+
+    def close(self):
+        """
+        Wait for all queued writes, sync them and log write latency by format
+        """
+        for _ in self.__threads:
+            self.__queue.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__sync()
+        with self.__journal_lock:
+            self.__journal.close()
+            if not self.__pending:
+                os.remove(self.journal_path)
+        self.log_summary()
+
+    def __write_loop(self):
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                return
+            write_id, song_data, lyrics = item
+            start = time.perf_counter()
+            try:
+                written = self.embed(song_data, lyrics)
+            except Exception as e:
+                log.error(f'Failed writing lyrics to {song_data.path}: ' + str(e), exc_info=True)
+                written = False
+            elapsed = time.perf_counter() - start
+            # Tag (and its artwork) is not needed anymore, the song is kept until the batch is synced
+            song_data.release_tag()
+            with self.__journal_lock:
+                self.latencies.setdefault(song_data.song_format, []).append(elapsed)
+                if not written:
+                    # Failures are logged by embed, replaying them would fail again
+                    self.failed += 1
+                    self.__mark_done([write_id])
+                    continue
+                self.__unsynced.append((write_id, song_data))
+                full_batch = len(self.__unsynced) >= self.fsync_batch
+            if full_batch or self.__queue.empty():
+                self.__sync()
+
+    def __sync(self):
+        with self.__journal_lock:
+            batch = self.__unsynced
+            self.__unsynced = []
+        if not batch:
+            return
+        for _, song_data in batch:
+            if song_data.path is None:
+                continue
+            try:
+                with open(song_data.path, 'r+b') as f:
+                    os.fsync(f.fileno())
+            except OSError as e:
+                log.warning(f'Failed syncing {song_data.path}: ' + str(e))
+        with self.__journal_lock:
+            self.__mark_done([write_id for write_id, _ in batch])
+        if self.on_written is not None:
+            for _, song_data in batch:
+                self.on_written(song_data)
+
+    def __mark_done(self, write_ids: List[int]):
+        for write_id in write_ids:
+            self.__pending.pop(write_id, None)
+        self.__append({'op': DONE, 'ids': write_ids})
+        self.__journal.flush()
+        os.fsync(self.__journal.fileno())
+
+    def __append(self, entry: dict):
+        self.__journal.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def log_summary(self):
+        log.info(f'Tag writes: {sum(len(values) for values in self.latencies.values())}, failed: {self.failed}, '
+                 f'replayed from journal: {self.replayed}, '
+                 f'in place: {padding_stats.in_place()}, whole file rewritten: {padding_stats.rewritten()}')
+        for song_format, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            in_place, rewritten = padding_stats.counts.get(song_format, [0, 0])
+            log.info(f'\t{song_format}: {len(values)} writes ({in_place} in place, {rewritten} rewritten), '
+                     f'mean {sum(values) / len(values) * 1000:.1f}ms, '
+                     f'p95 {p95 * 1000:.1f}ms, max {values[-1] * 1000:.1f}ms')
+
+
+def read_journal(journal_path: str) -> List[dict]:
+    """
+    Return writes of the journal that were not marked done, in submission order.
+    A partially written last line of a crashed run is ignored.
+    """
+    pending: Dict[int, dict] = dict()
+    try:
+        with open(journal_path, 'r', encoding='UTF-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get('op') == PENDING:
+                    pending[entry['id']] = entry
+                elif entry.get('op') == DONE:
+                    for write_id in entry['ids']:
+                        pending.pop(write_id, None)
+    except FileNotFoundError:
+        pass
+    return list(pending.values())
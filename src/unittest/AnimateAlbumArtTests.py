@@ -0,0 +1,374 @@
+import io
+import os.path
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from mutagen.id3 import APIC, ID3
+from mutagen.mp4 import MP4, MP4Cover
+from PIL import Image
+
+import animate_album_art
+from animate_album_art import Animator, ArtScanCache, CoverArt, ExportStages, GenerationIndex, PropertiesFile, \
+    ScanError, load_cover_art, scan_library, sigterm_as_exit
+
+audio_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test_data', 'audio')
+
+
+def add_mp3_art(path: Path, artwork: bytes):
+    tag = ID3(path)
+    tag.delall('APIC')
+    tag.add(APIC(encoding=3, mime='image/png', type=3, desc='cover', data=artwork))
+    tag.save()
+
+
+def add_m4a_art(path: Path, artwork: bytes):
+    tag = MP4(path)
+    tag['covr'] = [MP4Cover(artwork, MP4Cover.FORMAT_JPEG)]
+    tag.save()
+
+
+class AnimateAlbumArtTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = Path(tempfile.mkdtemp())
+        self.files = []
+        for i, artwork in enumerate((b'cover1', b'cover2', b'cover1')):
+            path = self.root / f'{i}.mp3'
+            shutil.copy(os.path.join(audio_path, 'song.mp3'), path)
+            add_mp3_art(path, artwork)
+            self.files.append(path)
+        path = self.root / '3.m4a'
+        shutil.copy(os.path.join(audio_path, 'song.m4a'), path)
+        add_m4a_art(path, b'cover1')
+        self.files.append(path)
+        no_art = self.root / '4.mp3'
+        shutil.copy(os.path.join(audio_path, 'song.mp3'), no_art)
+        self.files.append(no_art)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_scan_returns_digests_without_image_bytes(self):
+        scanned = list(scan_library(self.files, workers=1))
+        self.assertEqual(self.files, [path for path, _ in scanned])
+        arts = [art for _, art in scanned]
+        self.assertIsNone(arts[4])
+        self.assertEqual(arts[0].digest, arts[2].digest)
+        self.assertEqual(arts[0].digest, arts[3].digest)
+        self.assertNotEqual(arts[0].digest, arts[1].digest)
+        self.assertEqual(('image/png', 6), (arts[0].mime, arts[0].size))
+        self.assertEqual('image/jpeg', arts[3].mime)
+        self.assertFalse(hasattr(arts[0], 'data'))
+
+    def test_worker_pool_matches_serial_scan(self):
+        self.assertEqual(list(scan_library(self.files, workers=1)), list(scan_library(self.files, workers=2)))
+
+    def test_cover_is_read_again_from_a_file_that_still_has_it(self):
+        digest = next(scan_library(self.files[:1], workers=1))[1].digest
+        add_mp3_art(self.files[0], b'changed')
+        art = load_cover_art(digest, [self.files[0], self.files[2]])
+        self.assertEqual(b'cover1', art.data)
+        self.assertIsNone(load_cover_art(digest, [self.files[0]]))
+
+    def dry_run(self, *args) -> list:
+        scanned = []
+
+        def counting_scan(path):
+            scanned.append(path)
+            return scan_cover_art(path)
+
+        scan_cover_art = animate_album_art.scan_cover_art
+        with mock.patch.object(animate_album_art, 'scan_cover_art', counting_scan):
+            animate_album_art.main(['--source-dir', str(self.root), '--output-dir', str(self.root / 'out'),
+                                    '--dry-run', '--scan-workers', '1', *args])
+        return sorted(path.name for path in scanned)
+
+    def test_unchanged_files_are_not_read_again(self):
+        self.assertEqual(['0.mp3', '1.mp3', '2.mp3', '3.m4a', '4.mp3'], self.dry_run())
+        self.assertEqual([], self.dry_run())
+        add_mp3_art(self.files[1], b'new cover')
+        self.assertEqual(['1.mp3'], self.dry_run())
+        self.assertEqual(['0.mp3', '1.mp3', '2.mp3', '3.m4a', '4.mp3'], self.dry_run('--rescan'))
+
+    def test_scan_cache_keeps_files_without_art(self):
+        cache = ArtScanCache(self.root)
+        for path, art in scan_library(self.files, workers=1):
+            cache.update(path, path.stat(), art)
+        cache.save()
+        os.remove(self.files[1])
+
+        loaded = ArtScanCache(self.root)
+        self.assertEqual((True, None), loaded.lookup(self.files[4], self.files[4].stat()))
+        hit, art = loaded.lookup(self.files[0], self.files[0].stat())
+        self.assertTrue(hit)
+        self.assertEqual(('image/png', 6), (art.mime, art.size))
+        loaded.save()
+        self.assertNotIn(str(self.files[1]), ArtScanCache(self.root).data)
+
+    def test_read_errors_are_not_cached_as_no_art(self):
+        missing = self.root / 'missing.mp3'
+        [(_, art)] = scan_library([missing], workers=1)
+        self.assertIsInstance(art, ScanError)
+        cache = ArtScanCache(self.root)
+        cache.update(missing, self.files[4].stat(), art)
+        cache.update(self.files[4], self.files[4].stat(), None)
+        self.assertEqual([str(self.files[4])], list(cache.seen))
+
+    def test_unreadable_file_is_read_again_next_run(self):
+        scan_cover_art = animate_album_art.scan_cover_art
+
+        def locked(path):
+            if path == self.files[1]:
+                return ScanError(path=path, error='locked')
+            return scan_cover_art(path)
+
+        with mock.patch.object(animate_album_art, 'scan_cover_art', locked):
+            self.dry_run()
+        self.assertEqual(['1.mp3'], self.dry_run())
+
+
+class PersistenceTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = Path(tempfile.mkdtemp())
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_index_updates_are_journaled_and_replayed(self):
+        index = GenerationIndex(self.root)
+        index.mark_done('a' * 64, self.root / 'a.mp4')
+        index.mark_failed('b' * 64, 'out of memory')
+        self.assertFalse(index.path.exists())
+        # Interrupted run: journal is not compacted and its last line is cut short
+        with open(index.journal_path, 'a', encoding='utf-8') as f:
+            f.write('["cccc", {"sta')
+
+        loaded = GenerationIndex(self.root)
+        self.assertEqual('done', loaded.data['a' * 64]['status'])
+        self.assertEqual('out of memory', loaded.data['b' * 64]['error'])
+        loaded.close()
+        self.assertTrue(loaded.path.exists())
+        self.assertFalse(loaded.journal_path.exists())
+        self.assertEqual(loaded.data, GenerationIndex(self.root).data)
+
+    def test_index_is_compacted_periodically(self):
+        index = GenerationIndex(self.root, compact_every=3)
+        for i in range(4):
+            index.mark_done(f'{i:064d}', self.root / f'{i}.mp4')
+        with open(index.journal_path, encoding='utf-8') as f:
+            self.assertEqual(1, len(f.readlines()))
+        self.assertEqual(4, len(GenerationIndex(self.root).data))
+
+    def test_properties_are_written_at_flush_interval(self):
+        path = self.root / 'mapping.properties'
+        props = PropertiesFile(path, flush_interval=3600)
+        props.set(Path('/music/a.mp3'), Path('/out/a.mp4'))
+        props.flush()
+        self.assertFalse(path.exists())
+        props.flush_interval = 0
+        props.flush()
+        self.assertEqual({'/music/a.mp3': '/out/a.mp4'}, PropertiesFile(path).entries)
+        self.assertFalse(props.dirty)
+        self.assertEqual(['mapping.properties'], os.listdir(self.root))
+
+    def test_sigterm_raises_system_exit(self):
+        previous = signal.getsignal(signal.SIGTERM)
+        with self.assertRaises(SystemExit) as raised:
+            with sigterm_as_exit():
+                os.kill(os.getpid(), signal.SIGTERM)
+        self.assertEqual(128 + signal.SIGTERM, raised.exception.code)
+        self.assertEqual(previous, signal.getsignal(signal.SIGTERM))
+
+
+def png(color: tuple) -> bytes:
+    out = io.BytesIO()
+    Image.new('RGB', (32, 32), color).save(out, format='PNG')
+    return out.getvalue()
+
+
+class FakeResult:
+    def __init__(self, frames):
+        self.frames = frames
+
+
+class FakePipe:
+    """Stands in for the SVD pipeline: every frame is the input canvas, so outputs can be traced to inputs."""
+
+    def __init__(self, max_batch: int = 100):
+        self.max_batch = max_batch
+        self.batches = []
+
+    def __call__(self, canvases, num_frames, **kwargs):
+        self.batches.append(len(canvases))
+        if len(canvases) > self.max_batch:
+            raise RuntimeError('CUDA out of memory. Tried to allocate 2.00 GiB')
+        return FakeResult([[canvas.copy() for _ in range(num_frames)] for canvas in canvases])
+
+
+def fake_animator(pipe: FakePipe, batch_size: int) -> Animator:
+    animator = Animator(model_id='fake', width=64, height=36, num_frames=3, fps=7, motion_bucket_id=127,
+                        noise_aug_strength=0.02, decode_chunk_size=2, seed=None, batch_size=batch_size)
+    animator._pipe = pipe
+    return animator
+
+
+def center_color(frame) -> tuple:
+    return frame.getpixel((frame.width // 2, frame.height // 2))
+
+
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (0, 255, 255)]
+
+
+class AnimatorBatchTests(unittest.TestCase):
+
+    def test_batched_frames_match_unbatched(self):
+        images = [png(color) for color in COLORS]
+        single = fake_animator(FakePipe(), batch_size=1)
+        batched_pipe = FakePipe()
+        batched = fake_animator(batched_pipe, batch_size=2)
+        single_frames = [single.animate(image) for image in images]
+        batched_frames = batched.animate_batch(images)
+        self.assertEqual([2, 2, 1], batched_pipe.batches)
+        self.assertEqual(len(images), len(batched_frames))
+        for color, one, many in zip(COLORS, single_frames, batched_frames):
+            self.assertEqual(3, len(many))
+            self.assertEqual((36, 36), many[0].size)
+            self.assertEqual(color, center_color(many[0]))
+            self.assertEqual(one[0].tobytes(), many[0].tobytes())
+
+    def test_batch_size_backs_off_on_out_of_memory(self):
+        pipe = FakePipe(max_batch=2)
+        animator = fake_animator(pipe, batch_size=8)
+        frames = animator.animate_batch([png(color) for color in COLORS])
+        self.assertEqual(COLORS, [center_color(f[0]) for f in frames])
+        self.assertEqual([5, 2, 2, 1], pipe.batches)
+        self.assertEqual(2, animator.batch_size)
+
+    def test_other_errors_are_raised(self):
+        pipe = FakePipe(max_batch=0)
+        with self.assertRaises(RuntimeError):
+            fake_animator(pipe, batch_size=1).animate(png(COLORS[0]))
+
+    def test_generated_files_map_back_to_their_digests(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root, True)
+        source = root / 'music'
+        source.mkdir()
+        for i, color in enumerate(COLORS * 2):
+            path = source / f'{i}.mp3'
+            shutil.copy(os.path.join(audio_path, 'song.mp3'), path)
+            add_mp3_art(path, png(color))
+        pipe = FakePipe(max_batch=2)
+
+        def export(frames, dest, fps):
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.write_text(repr(center_color(frames[0])))
+
+        def load(animator):
+            animator._pipe = pipe
+
+        with mock.patch.object(animate_album_art, 'export_mp4', export), \
+                mock.patch.object(Animator, '_load', load):
+            animate_album_art.main(['--source-dir', str(source), '--output-dir', str(root / 'out'),
+                                    '--scan-workers', '1', '--batch-size', '4'])
+
+        self.assertEqual([4, 2, 2, 1], pipe.batches)
+        for color in COLORS:
+            digest = CoverArt(data=png(color), mime='image/png').sha256
+            cache_file = animate_album_art.cache_path_for_hash(root / 'out', digest)
+            self.assertEqual(repr(color), cache_file.read_text())
+        for i, color in enumerate(COLORS * 2):
+            self.assertEqual(repr(color), (root / 'out' / f'{i}.mp4').read_text())
+
+    def test_failed_batch_time_is_counted_once(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root, True)
+        source = root / 'music'
+        source.mkdir()
+        for i, color in enumerate(COLORS[:2]):
+            path = source / f'{i}.mp3'
+            shutil.copy(os.path.join(audio_path, 'song.mp3'), path)
+            add_mp3_art(path, png(color))
+
+        def slow_animate_batch(animator, images):
+            time.sleep(0.2)
+            if len(images) > 1:
+                raise ValueError('one bad image')
+            return [[Image.new('RGB', (8, 8))]]
+
+        summaries = []
+        with mock.patch.object(animate_album_art, 'export_mp4'), \
+                mock.patch.object(Animator, 'animate_batch', slow_animate_batch), \
+                mock.patch.object(animate_album_art, '_print_summary', summaries.append):
+            animate_album_art.main(['--source-dir', str(source), '--output-dir', str(root / 'out'),
+                                    '--scan-workers', '1', '--batch-size', '2'])
+
+        # Three calls of 0.2s: the failed batch and two single retries
+        self.assertEqual(2, summaries[0].generated)
+        self.assertAlmostEqual(0.6, summaries[0].generate_seconds, delta=0.15)
+
+
+class ExportStagesTests(unittest.TestCase):
+
+    def test_generation_does_not_wait_for_encoding_until_backlog_is_full(self):
+        release = threading.Event()
+        encoded, mirrored = [], []
+
+        def slow_encode(digest, frames):
+            release.wait()
+            encoded.append(digest)
+            return Path(f'/cache/{digest}.mp4') if digest != 'bad' else None
+
+        export = ExportStages(slow_encode, lambda digest, path: mirrored.append((digest, path.name)),
+                              encode_workers=1, encode_backlog=2).start()
+        # One animation is being encoded, two more fit in the backlog
+        for digest in ('a', 'bad', 'c'):
+            export.encode(digest, [])
+        self.assertEqual([], encoded)
+        blocked = threading.Thread(target=export.encode, args=('d', []))
+        blocked.start()
+        blocked.join(0.2)
+        self.assertTrue(blocked.is_alive())
+        export.mirror('existing', Path('/cache/existing.mp4'))
+
+        release.set()
+        blocked.join()
+        export.close()
+        self.assertEqual(['a', 'bad', 'c', 'd'], encoded)
+        self.assertEqual([('a', 'a.mp4'), ('c', 'c.mp4'), ('d', 'd.mp4'), ('existing', 'existing.mp4')],
+                         sorted(mirrored))
+        self.assertGreater(export.blocked_seconds, 0.1)
+        self.assertGreater(export.encode_seconds, 0.1)
+
+    def test_failing_callbacks_do_not_stop_the_stages(self):
+        mirrored = []
+
+        def encode(digest, frames):
+            if digest == 'bad encode':
+                raise OSError('index not writable')
+            return Path(f'/cache/{digest}.mp4')
+
+        def mirror(digest, path):
+            if digest == 'bad mirror':
+                raise OSError('properties not writable')
+            mirrored.append(digest)
+
+        export = ExportStages(encode, mirror, encode_workers=1, encode_backlog=1, mirror_backlog=1).start()
+        producer = threading.Thread(target=lambda: [export.encode(digest, []) for digest in
+                                                    ('bad encode', 'bad mirror', 'a', 'b', 'c')] + [export.close()],
+                                    daemon=True)
+        producer.start()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(['a', 'b', 'c'], mirrored)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+from typing import Optional
+from unittest import mock
+
+import song_helper
+from async_pipeline import AsyncPipeline
+from song_data import SongData
+from sources.lyrics_source import LyricsSource
+from storage import Storage
+
+LYRICS = 'line 1\nline 2\nline 3\nline 4\nline 5'
+
+
+class CachedOnlySource(LyricsSource):
+    def __init__(self, name: str, has_lyrics: bool):
+        super().__init__(name)
+        self.has_lyrics = has_lyrics
+
+    def is_album(self) -> bool:
+        return False
+
+    def prepare_request(self, song_data: SongData):
+        return None, None
+
+    def parse_lyrics(self, html: str, song_title) -> Optional[str]:
+        return LYRICS if self.has_lyrics else None
+
+
+def fake_song_data(path: str, keep_tag=True, header_only=False) -> SongData:
+    return SongData(None, 'artist', 'album', path, None, 'mp3')
+
+
+class AsyncPipelineTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.html_storage = Storage(os.path.join(self.root, 'html'))
+        self.lyrics_storage = Storage(os.path.join(self.root, 'lyrics'))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_first_source_with_lyrics_wins(self):
+        sources = [CachedOnlySource('empty', False), CachedOnlySource('full', True)]
+        for title in ('t1', 't2', 't3'):
+            for source in sources:
+                self.html_storage.store(source.get_name(), fake_song_data(title), '<html/>')
+        embedded = []
+
+        pipeline = AsyncPipeline(sources, self.html_storage, self.lyrics_storage, {},
+                                 accept=lambda song_data: song_data.title != 't3',
+                                 embed=lambda song_data, lyrics: embedded.append(song_data.title),
+                                 max_in_flight=2, per_host=1, queue_size=1)
+        with mock.patch.object(song_helper, 'get_song_data', fake_song_data):
+            result = pipeline.run(['t1', 't2', 't3'])
+
+        self.assertEqual(3, result.scanned)
+        self.assertEqual(2, result.found)
+        self.assertEqual(0, result.requests)
+        self.assertEqual(['t1', 't2'], sorted(embedded))
+        self.assertEqual(['full'], self.lyrics_storage.get_sources(fake_song_data('t1')))
+
+    def test_song_without_any_cached_html_is_not_found(self):
+        sources = [CachedOnlySource('full', True)]
+        pipeline = AsyncPipeline(sources, self.html_storage, self.lyrics_storage, {},
+                                 accept=lambda song_data: True, embed=None, max_in_flight=1, per_host=1)
+        with mock.patch.object(song_helper, 'get_song_data', fake_song_data):
+            result = pipeline.run(['t1'])
+        self.assertEqual(0, result.found)
+        self.assertEqual(1, result.not_found)
+
+    def test_scan_uses_pool_and_header_only_reads(self):
+        reads = []
+
+        def recording_song_data(path, keep_tag=True, header_only=False):
+            reads.append((path, keep_tag, header_only))
+            return fake_song_data(path)
+
+        pipeline = AsyncPipeline([CachedOnlySource('full', True)], self.html_storage, self.lyrics_storage, {},
+                                 accept=lambda song_data: True, embed=None, max_in_flight=1, per_host=1,
+                                 queue_size=1, scan_workers=2, header_only=True)
+        with mock.patch.object(song_helper, 'get_song_data', recording_song_data):
+            result = pipeline.run([f't{i}' for i in range(10)])
+        self.assertEqual(10, result.scanned)
+        self.assertEqual(10, result.queued)
+        self.assertEqual([(f't{i}', True, True) for i in range(10)], sorted(reads, key=lambda read: int(read[0][1:])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 import codecs
 import logging
+import os.path
 import unittest
 
+from lyrico.lyrico_sources import html_parser
 from sources.darklyrics import DarkLyrics
 
 log = logging.getLogger(__file__)
@@ -10,6 +12,8 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s [%(fi
 store_song_path = r'D:\Programming\git\lyrico\test_data\storage\Dark_Lyrics'
 store_song_path2 = r'D:\Programming\git\lyrico\test_data\storage\Dark_Lyrics_nightfall'
 
+test_data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test_data', 'storage')
+
 
 class StorageTests(unittest.TestCase):
 
@@ -24,5 +28,55 @@ class StorageTests(unittest.TestCase):
             print(lyrics)
 
 
+class DarkLyricsAlbumTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        with codecs.open(os.path.join(test_data_path, 'Dark_Lyrics'), 'r', encoding='UTF-8') as f:
+            self.html = f.read()
+
+    def test_album_is_parsed_into_all_songs(self):
+        album = DarkLyrics().parse_album(self.html)
+        self.assertIn('häxprocess', album)
+        self.assertGreater(len(album), 5)
+
+    def test_lyrics_for_title_matches_parse_lyrics(self):
+        source = DarkLyrics()
+        album = source.parse_album(self.html)
+        for title in ('Häxprocess', 'Folklore'):
+            self.assertEqual(source.parse_lyrics(self.html, title), source.lyrics_for_title(album, title))
+
+    def test_album_page_is_parsed_once(self):
+        source = DarkLyrics()
+        first = source.parse_album(self.html)
+        second = source.parse_album(self.html)
+        self.assertIs(first, second)
+        self.assertEqual(1, source.album_cache.misses)
+        self.assertEqual(1, source.album_cache.hits)
+
+    def test_album_cache_is_bounded(self):
+        source = DarkLyrics()
+        source.album_cache.max_size = 1
+        source.parse_album(self.html)
+        source.parse_album('<html></html>')
+        self.assertEqual(1, len(source.album_cache))
+        self.assertIsNone(source.lyrics_for_title(source.parse_album('<html></html>'), 'Folklore'))
+
+    def test_all_parser_backends_give_same_album(self):
+        expected = DarkLyrics().parse_album(self.html)
+        try:
+            for backend in html_parser.available_backends():
+                html_parser.set_parser_backend(backend)
+                self.assertEqual(expected, DarkLyrics().parse_album(self.html), backend)
+        finally:
+            html_parser.set_parser_backend(html_parser.DEFAULT_BACKEND)
+
+    def test_no_album(self):
+        self.assertIsNone(DarkLyrics().lyrics_for_title(None, 'Folklore'))
+
+    def test_title_missing_from_album(self):
+        source = DarkLyrics()
+        self.assertIsNone(source.lyrics_for_title(source.parse_album(self.html), 'Not On This Album'))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,140 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from mutagen.flac import FLAC, Picture
+from mutagen.id3 import APIC, ID3, TPE1, USLT
+from mutagen.mp4 import MP4, MP4Cover
+from mutagen.oggvorbis import OggVorbis
+
+import fast_tags
+from song_helper import get_song_data
+
+audio_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test_data', 'audio')
+
+ARTWORK = b'\x89PNG' + os.urandom(256 * 1024)
+LYRICS = 'First line\nВторая строка'
+
+
+def picture() -> Picture:
+    result = Picture()
+    result.type = 3
+    result.mime = 'image/png'
+    result.data = ARTWORK
+    return result
+
+
+class FastTagsTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def copy(self, song_format: str) -> str:
+        path = os.path.join(self.root, 'song.' + song_format)
+        shutil.copy(os.path.join(audio_path, 'song.' + song_format), path)
+        return path
+
+    def assertSameAsMutagen(self, path: str, lyrics=LYRICS):
+        song_format = path[path.rfind('.') + 1:]
+        fields = fast_tags.read_fields(path, song_format)
+        self.assertIsNotNone(fields)
+        self.assertEqual({'artist': 'Artist', 'album': 'Album', 'title': 'Title', 'lyrics': lyrics}, fields)
+
+        fast = get_song_data(path, header_only=True)
+        full = get_song_data(path)
+        self.assertIsNone(fast.tag)
+        self.assertEqual((full.artist, full.album, full.title, full.lyrics),
+                         (fast.artist, fast.album, fast.title, fast.lyrics))
+
+    def test_id3(self):
+        for version in (3, 4):
+            for encoding in (0, 1, 2, 3) if version == 4 else (0, 1):
+                with self.subTest(version=version, encoding=encoding):
+                    path = self.copy('mp3')
+                    tag = ID3(path)
+                    tag.add(APIC(encoding=3, mime='image/png', type=3, desc='cover', data=ARTWORK))
+                    tag.add(USLT(encoding=encoding, lang='eng', desc='desc',
+                                 text='First line\nSecond line' if encoding == 0 else LYRICS))
+                    # v2.3 joins several values with '/', mutagen does not split them again
+                    tag.add(TPE1(encoding=encoding, text=['Artist', 'Other artist'] if version == 4 else 'Artist'))
+                    tag.save(v2_version=version)
+                    self.assertSameAsMutagen(path, 'First line\nSecond line' if encoding == 0 else LYRICS)
+
+    def test_id3_without_lyrics(self):
+        self.assertSameAsMutagen(self.copy('mp3'), None)
+
+    def test_mp4(self):
+        path = self.copy('m4a')
+        tag = MP4(path)
+        tag['covr'] = [MP4Cover(ARTWORK, MP4Cover.FORMAT_PNG)]
+        tag['\xa9lyr'] = LYRICS
+        tag.save()
+        self.assertSameAsMutagen(path)
+
+    def test_flac(self):
+        path = self.copy('flac')
+        tag = FLAC(path)
+        tag.add_picture(picture())
+        tag['UNSYNCEDLYRICS'] = LYRICS
+        tag.save()
+        self.assertSameAsMutagen(path)
+
+    def test_ogg(self):
+        path = self.copy('ogg')
+        tag = OggVorbis(path)
+        tag['LYRICS'] = LYRICS
+        tag.save()
+        self.assertSameAsMutagen(path)
+
+    def test_reads_only_needed_frames(self):
+        path = self.copy('mp3')
+        tag = ID3(path)
+        tag.add(APIC(encoding=3, mime='image/png', type=3, desc='cover', data=ARTWORK))
+        tag.save()
+        read = []
+        real_open = open
+
+        class CountingFile:
+            def __init__(self, f):
+                self.f = f
+
+            def read(self, size=-1):
+                data = self.f.read(size)
+                read.append(len(data))
+                return data
+
+            def __getattr__(self, name):
+                return getattr(self.f, name)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.f.close()
+
+        with mock.patch('fast_tags.open', lambda *args: CountingFile(real_open(*args)), create=True):
+            self.assertIsNotNone(fast_tags.read_fields(path, 'mp3'))
+        self.assertLess(sum(read), 1024)
+
+    def test_fallback_to_mutagen(self):
+        no_tag = os.path.join(self.root, 'no_tag.mp3')
+        with open(no_tag, 'wb') as f:
+            f.write(b'\x00' * 100)
+        self.assertIsNone(fast_tags.read_fields(no_tag, 'mp3'))
+        self.assertIsNone(fast_tags.read_fields(self.copy('mp3'), 'wma'))
+
+        path = self.copy('mp3')
+        ID3(path).save(v2_version=3, padding=lambda info: 0)
+        with open(path, 'r+b') as f:
+            f.seek(5)
+            f.write(b'\x80')  # unsynchronisation flag
+        self.assertIsNone(fast_tags.read_fields(path, 'mp3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import os.path
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from unittest import mock
+
+import song_helper
+from async_pipeline import AsyncPipeline
+from html_refresh import HtmlRefresher
+from lyrico.lyrico_sources import http_session
+from scheduler import TokenBucket
+from song_data import SongData
+from sources.lyrics_source import LyricsSource
+from storage import Storage
+
+LYRICS = 'line 1\nline 2\nline 3\nline 4\nline 5'
+
+
+class EtagHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    etag = '"v1"'
+    body = b'<html>v1</html>'
+    conditional = []
+
+    def do_GET(self):
+        if_none_match = self.headers.get('If-None-Match')
+        EtagHandler.conditional.append(if_none_match)
+        if if_none_match == EtagHandler.etag:
+            self.send_response(304)
+            self.send_header('ETag', EtagHandler.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', EtagHandler.etag)
+        self.send_header('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.send_header('Content-Length', str(len(EtagHandler.body)))
+        self.end_headers()
+        self.wfile.write(EtagHandler.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class UrlSource(LyricsSource):
+    def __init__(self, url: str):
+        super().__init__('source')
+        self.url = url
+
+    def is_album(self) -> bool:
+        return False
+
+    def prepare_request(self, song_data: SongData):
+        return self.url, None
+
+    def parse_lyrics(self, html: str, song_title) -> Optional[str]:
+        return LYRICS
+
+
+class AlbumUrlSource(UrlSource):
+    def is_album(self) -> bool:
+        return True
+
+
+def fake_song_data(path: str, keep_tag=True, header_only=False) -> SongData:
+    return SongData(None, 'artist', 'album', path, None, 'mp3')
+
+
+class HtmlRefreshTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), EtagHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/lyrics'
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        http_session.close_sessions()
+
+    def setUp(self) -> None:
+        http_session.configure(timeout=(2, 2), retries=0, backoff_factor=0)
+        self.root = tempfile.mkdtemp()
+        self.html_storage = Storage(os.path.join(self.root, 'html'))
+        self.lyrics_storage = Storage(os.path.join(self.root, 'lyrics'))
+        EtagHandler.etag = '"v1"'
+        EtagHandler.body = b'<html>v1</html>'
+        EtagHandler.conditional = []
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def run_pipeline(self, refresher: Optional[HtmlRefresher], source: Optional[LyricsSource] = None,
+                     titles=('title',), max_in_flight=1):
+        # Album pages are requested at most every 10 seconds, like Dark_Lyrics
+        pipeline = AsyncPipeline([source or UrlSource(self.url)], self.html_storage, self.lyrics_storage,
+                                 {'source': TokenBucket(10)}, accept=lambda song_data: True, embed=None,
+                                 max_in_flight=max_in_flight, per_host=1, html_refresher=refresher)
+        with mock.patch.object(song_helper, 'get_song_data', fake_song_data):
+            return pipeline.run(list(titles))
+
+    def test_metadata_is_kept_next_to_page(self):
+        self.html_storage.store('source', fake_song_data('title'), 'text', metadata={'etag': '"v1"'})
+        self.assertEqual({'etag': '"v1"'}, self.html_storage.load_metadata('source', fake_song_data('title')))
+        self.assertEqual(['source'], Storage(os.path.join(self.root, 'html')).get_sources(fake_song_data('title')))
+        self.html_storage.store('source', fake_song_data('title'), 'new text')
+        self.assertEqual({}, self.html_storage.load_metadata('source', fake_song_data('title')))
+
+    def test_conditional_headers(self):
+        self.assertEqual({'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'},
+                         http_session.conditional_headers({'etag': '"v1"',
+                                                           'last_modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}))
+        self.assertEqual({}, http_session.conditional_headers({}))
+
+    def test_downloaded_page_keeps_validators(self):
+        result = self.run_pipeline(None)
+        self.assertEqual(1, result.requests)
+        self.assertEqual({'etag': '"v1"', 'last_modified': 'Mon, 01 Jan 2024 00:00:00 GMT'},
+                         self.html_storage.load_metadata('source', fake_song_data('title')))
+
+    def test_unchanged_page_is_not_downloaded_again(self):
+        self.run_pipeline(None)
+        refresher = HtmlRefresher(self.html_storage)
+        result = self.run_pipeline(refresher)
+        self.assertEqual(1, result.found)
+        self.assertEqual([None, '"v1"'], EtagHandler.conditional)
+        self.assertEqual((1, 0), (refresher.hits, refresher.misses))
+        self.assertEqual(len('<html>v1</html>'), refresher.saved)
+
+    def test_changed_page_is_stored_again(self):
+        self.run_pipeline(None)
+        EtagHandler.etag = '"v2"'
+        EtagHandler.body = b'<html>v2</html>'
+        refresher = HtmlRefresher(self.html_storage)
+        self.run_pipeline(refresher)
+        self.assertEqual((0, 1), (refresher.hits, refresher.misses))
+        self.assertEqual('<html>v2</html>', self.html_storage.load('source', fake_song_data('title')))
+        self.assertEqual('"v2"', self.html_storage.load_metadata('source', fake_song_data('title'))['etag'])
+
+    def test_album_page_is_requested_once_per_album(self):
+        titles = [f'title {i}' for i in range(12)]
+        result = self.run_pipeline(None, AlbumUrlSource(self.url), titles, max_in_flight=8)
+        self.assertEqual(12, result.found)
+        self.assertEqual(1, result.requests)
+        self.assertGreater(result.shared_album_pages, 0)
+        self.assertEqual([None], EtagHandler.conditional)
+
+        refresher = HtmlRefresher(self.html_storage)
+        result = self.run_pipeline(refresher, AlbumUrlSource(self.url), titles, max_in_flight=8)
+        self.assertEqual(12, result.found)
+        self.assertEqual([None, '"v1"'], EtagHandler.conditional)
+        self.assertEqual((1, 0), (refresher.hits, refresher.misses))
+
+    def test_stored_page_is_used_when_revalidation_fails(self):
+        self.html_storage.store('source', fake_song_data('title'), '<html>stored</html>')
+        refresher = HtmlRefresher(self.html_storage)
+        pipeline = AsyncPipeline([UrlSource('http://127.0.0.1:1/lyrics')], self.html_storage, self.lyrics_storage,
+                                 {}, accept=lambda song_data: True, embed=None, max_in_flight=1, per_host=1,
+                                 html_refresher=refresher)
+        with mock.patch.object(song_helper, 'get_song_data', fake_song_data):
+            result = pipeline.run(['title'])
+        self.assertEqual(1, result.found)
+        self.assertEqual('<html>stored</html>', self.html_storage.load('source', fake_song_data('title')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import async_pipeline
+from async_pipeline import AsyncHttpClient
+from lyrico.lyrico_sources import http_session
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    failures_left = 0
+    connections = set()
+
+    def do_GET(self):
+        FlakyHandler.connections.add(self.client_address)
+        if self.path == '/slow':
+            time.sleep(2)
+        if self.path == '/etag' and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+        if FlakyHandler.failures_left > 0:
+            FlakyHandler.failures_left -= 1
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            body = b'busy'
+        else:
+            self.send_response(200)
+            self.send_header('ETag', '"v1"')
+            body = b'lyrics page'
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def async_get(url, headers=None):
+    async def get():
+        client = AsyncHttpClient(executor)
+        try:
+            return await client.get(url, headers)
+        finally:
+            await client.close()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return asyncio.run(get())
+
+
+class HttpSessionTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/lyrics'
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        http_session.close_sessions()
+
+    def setUp(self) -> None:
+        http_session.configure(timeout=(2, 2), retries=3, backoff_factor=0)
+        FlakyHandler.connections.clear()
+
+    def test_transient_errors_are_retried(self):
+        FlakyHandler.failures_left = 2
+        response = http_session.http_get(self.url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('lyrics page', response.text)
+
+    def test_last_response_is_returned_when_retries_are_exhausted(self):
+        FlakyHandler.failures_left = 10
+        response = http_session.http_get(self.url)
+        self.assertEqual(503, response.status_code)
+        FlakyHandler.failures_left = 0
+
+    def test_connection_is_reused(self):
+        for _ in range(3):
+            http_session.http_get(self.url)
+        self.assertEqual(1, len(FlakyHandler.connections))
+
+    def async_get(self, url=None, headers=None):
+        return async_get(url or self.url, headers)
+
+    def test_async_client_retries_transient_errors(self):
+        FlakyHandler.failures_left = 2
+        text, _ = self.async_get()
+        self.assertEqual('lyrics page', text)
+
+    def test_async_client_raises_when_retries_are_exhausted(self):
+        FlakyHandler.failures_left = 10
+        with self.assertRaises(Exception):
+            self.async_get()
+        self.assertEqual(6, FlakyHandler.failures_left)
+        FlakyHandler.failures_left = 0
+
+    def test_backoff(self):
+        http_session.configure(backoff_factor=2.0)
+        self.assertEqual([2.0, 4.0, 8.0], [http_session.backoff_seconds(retry) for retry in (1, 2, 3)])
+        self.assertEqual(5.0, http_session.backoff_seconds(1, '5'))
+        self.assertEqual(0.0, http_session.backoff_seconds(1, 'Mon, 01 Jan 2024 00:00:00 GMT'))
+        self.assertEqual(4.0, http_session.backoff_seconds(2, 'soon'))
+
+
+
+@unittest.skipIf(async_pipeline.aiohttp is None, 'aiohttp is not installed')
+class AiohttpClientTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+
+    def setUp(self) -> None:
+        http_session.configure(timeout=(2, 2), retries=2, backoff_factor=0)
+        FlakyHandler.failures_left = 0
+
+    def test_retry_statuses_are_retried(self):
+        FlakyHandler.failures_left = 2
+        text, metadata = async_get(self.base_url + '/lyrics')
+        self.assertEqual(('lyrics page', {'etag': '"v1"'}), (text, metadata))
+        self.assertEqual(0, FlakyHandler.failures_left)
+
+    def test_error_is_raised_when_retries_are_exhausted(self):
+        FlakyHandler.failures_left = 10
+        with self.assertRaises(async_pipeline.aiohttp.ClientResponseError) as raised:
+            async_get(self.base_url + '/lyrics')
+        self.assertEqual(503, raised.exception.status)
+        self.assertEqual(7, FlakyHandler.failures_left)
+
+    def test_not_modified_has_no_text(self):
+        text, metadata = async_get(self.base_url + '/etag', {'If-None-Match': '"v1"'})
+        self.assertIsNone(text)
+        self.assertEqual({'etag': '"v1"'}, metadata)
+
+    def test_read_timeout_comes_from_http_session(self):
+        http_session.configure(timeout=(2, 0.5), retries=0)
+        started = time.monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            async_get(self.base_url + '/slow')
+        self.assertLess(time.monotonic() - started, 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
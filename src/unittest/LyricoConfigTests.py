@@ -0,0 +1,39 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from lyrico.config import Config
+
+
+class LyricsFileExistsTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        for name in ['Artist - Title.txt', os.path.join('sub', 'Other - Song.TXT'), 'Artist - Cover.jpg']:
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+        self.saved = Config.lyrics_dir, Config.lyric_files_in_dir, Config.lyrics_dir_ignores_case
+        Config.lyrics_dir = self.root
+        Config.lyric_files_in_dir = None
+
+    def tearDown(self) -> None:
+        Config.lyrics_dir, Config.lyric_files_in_dir, Config.lyrics_dir_ignores_case = self.saved
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_existing_files(self):
+        self.assertTrue(Config.lyrics_file_exists(os.path.join(self.root, 'Artist - Title.txt')))
+        self.assertTrue(Config.lyrics_file_exists(os.path.join(self.root, 'sub', 'Other - Song.TXT')))
+        self.assertTrue(Config.lyrics_file_exists(os.path.join(self.root, 'sub', '..', 'Artist - Title.txt')))
+        self.assertFalse(Config.lyrics_file_exists(os.path.join(self.root, 'Artist - Cover.jpg')))
+        self.assertFalse(Config.lyrics_file_exists(os.path.join(self.root, 'Artist - Missing.txt')))
+        self.assertIsInstance(Config.lyric_files_in_dir, set)
+
+    def test_case_follows_filesystem(self):
+        exists = Config.lyrics_file_exists(os.path.join(self.root, 'ARTIST - TITLE.txt'))
+        self.assertEqual(Config.lyrics_dir_ignores_case, exists)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from lyrico.config import Config
+from lyrico.song import Song, SongResult
+
+audio_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test_data', 'audio')
+
+
+class SongReleaseTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.saved = Config.lyrics_dir, Config.lyric_files_in_dir, Config.save_to_file, Config.save_to_tag
+        Config.lyrics_dir = self.root
+        Config.lyric_files_in_dir = None
+        Config.save_to_file, Config.save_to_tag = True, False
+        self.path = os.path.join(self.root, 'song.mp3')
+        shutil.copy(os.path.join(audio_path, 'song.mp3'), self.path)
+        open(os.path.join(self.root, 'Artist - Title.txt'), 'w').close()
+
+    def tearDown(self) -> None:
+        Config.lyrics_dir, Config.lyric_files_in_dir, Config.save_to_file, Config.save_to_tag = self.saved
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_release_keeps_only_result(self):
+        song = Song(self.path)
+        self.assertIsNotNone(song.tag)
+        log_string = song.get_log_string()
+
+        result = song.release()
+        self.assertIsNone(song.tag)
+        self.assertIsInstance(result, SongResult)
+        self.assertEqual(log_string, result.get_log_string())
+        self.assertEqual('Artist - Title', result.song)
+        self.assertEqual(('Present', 'Ignored'), (result.file, result.tag))
+
+    def test_log_results(self):
+        missing = os.path.join(self.root, 'missing.mp3')
+        results = [Song(self.path).release(), Song(missing).release()]
+        Song.log_results(results)
+        with open(os.path.join(self.root, 'log.txt'), encoding='utf-8') as f:
+            log = f.read()
+        self.assertIn('Audio files detected: 2', log)
+        self.assertIn('1. \tPresent\tIgnored\tNone\t\tArtist - Title', log)
+        self.assertIn('2. \tFailed\tIgnored\tNone\t\t' + missing, log)
+
+
+if __name__ == '__main__':
+    unittest.main()
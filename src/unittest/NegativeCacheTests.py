@@ -0,0 +1,104 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from negative_cache import DAY, MINUTE, NETWORK_ERROR, NO_LYRICS, NOT_FOUND, RATE_LIMITED, SERVER_ERROR, \
+    NegativeCache, failure_reason
+from song_data import SongData
+
+
+def song(title: str) -> SongData:
+    return SongData(None, 'artist', 'album', title, None, 'mp3')
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+class NegativeCacheTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.root, 'negative_cache.json')
+        self.now = 1_000_000.0
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def cache(self, **kwargs) -> NegativeCache:
+        return NegativeCache(self.cache_path, clock=lambda: self.now, **kwargs)
+
+    def test_failure_reasons(self):
+        self.assertEqual(NOT_FOUND, failure_reason(http_error(404)))
+        self.assertEqual(RATE_LIMITED, failure_reason(http_error(429)))
+        self.assertEqual(SERVER_ERROR, failure_reason(http_error(503)))
+        self.assertEqual(NETWORK_ERROR, failure_reason(requests.ConnectionError()))
+        self.assertIsNone(failure_reason(AttributeError("'NoneType' object has no attribute 'text'")))
+
+    def test_unclassified_errors_are_not_cached(self):
+        cache = self.cache()
+        cache.record_error(song('title'), 'DarkLyrics', IndexError('list index out of range'))
+        self.assertFalse(cache.should_skip(song('title'), 'DarkLyrics'))
+        cache.record_failure(song('title'), 'DarkLyrics', NO_LYRICS)
+        self.assertTrue(cache.should_skip(song('title'), 'DarkLyrics'))
+
+    def test_skips_until_ttl_of_reason_passes(self):
+        cache = self.cache()
+        cache.record_error(song('missing'), 'DarkLyrics', http_error(404))
+        cache.record_error(song('limited'), 'DarkLyrics', http_error(429))
+        self.now += 5 * MINUTE
+        self.assertTrue(cache.should_skip(song('missing'), 'DarkLyrics'))
+        self.assertTrue(cache.should_skip(song('limited'), 'DarkLyrics'))
+        self.now += 10 * MINUTE
+        self.assertTrue(cache.should_skip(song('missing'), 'DarkLyrics'))
+        self.assertFalse(cache.should_skip(song('limited'), 'DarkLyrics'))
+        self.now += 28 * DAY
+        self.assertFalse(cache.should_skip(song('missing'), 'DarkLyrics'))
+        self.assertEqual((3, 2), (cache.hits, cache.misses))
+
+    def test_failures_are_per_source(self):
+        cache = self.cache()
+        cache.record_failure(song('title'), 'DarkLyrics', NOT_FOUND, 404)
+        self.assertTrue(cache.should_skip(song('title'), 'DarkLyrics'))
+        self.assertFalse(cache.should_skip(song('title'), 'MusixMatch'))
+        self.assertFalse(cache.should_skip(song('other'), 'DarkLyrics'))
+
+    def test_success_clears_failures(self):
+        cache = self.cache()
+        cache.record_failure(song('title'), 'DarkLyrics', NOT_FOUND, 404)
+        cache.record_success(song('title'))
+        self.assertFalse(cache.should_skip(song('title'), 'DarkLyrics'))
+
+    def test_saved_without_expired_entries(self):
+        cache = self.cache()
+        cache.record_failure(song('missing'), 'DarkLyrics', NOT_FOUND, 404)
+        cache.record_failure(song('limited'), 'LyricsMode', RATE_LIMITED, 429)
+        self.now += 11 * MINUTE
+        cache.save()
+
+        loaded = self.cache()
+        self.assertTrue(loaded.should_skip(song('missing'), 'DarkLyrics'))
+        self.assertFalse(loaded.should_skip(song('limited'), 'LyricsMode'))
+        with open(self.cache_path, encoding='UTF-8') as f:
+            self.assertNotIn('limited', f.read())
+
+    def test_disabled_cache_still_records(self):
+        cache = self.cache(enabled=False)
+        cache.record_failure(song('title'), 'DarkLyrics', NOT_FOUND, 404)
+        self.assertFalse(cache.should_skip(song('title'), 'DarkLyrics'))
+        cache.save()
+        self.assertTrue(self.cache().should_skip(song('title'), 'DarkLyrics'))
+
+    def test_unreadable_file_is_ignored(self):
+        with open(self.cache_path, 'w', encoding='UTF-8') as f:
+            f.write('{"artist-album-ti')
+        self.assertFalse(self.cache().should_skip(song('title'), 'DarkLyrics'))
+
+
+if __name__ == '__main__':
+    unittest.main()
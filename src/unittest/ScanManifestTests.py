@@ -0,0 +1,96 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from mutagen.id3 import ID3, TALB, TIT2, TPE1
+
+import song_helper
+from scan_manifest import ScanManifest
+from song_helper import embedd_lyrics_in_song, scan_song_data
+
+
+def write_song(path: str, title: str):
+    tag = ID3()
+    tag.add(TPE1(encoding=3, text='artist'))
+    tag.add(TALB(encoding=3, text='album'))
+    tag.add(TIT2(encoding=3, text=title))
+    tag.save(path)
+
+
+class ScanManifestTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.root, 'manifest.json')
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.root, f'song{i}.mp3')
+            write_song(path, title=f'title{i}')
+            self.paths.append(path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def scan(self, manifest: ScanManifest):
+        songs = list(scan_song_data(self.paths, workers=2, use_processes=False, manifest=manifest))
+        manifest.save()
+        return songs
+
+    def test_unchanged_files_are_not_read(self):
+        first = ScanManifest(self.manifest_path)
+        self.scan(first)
+        self.assertEqual((0, 3), (first.hits, first.misses))
+
+        second = ScanManifest(self.manifest_path)
+        with mock.patch.object(song_helper, 'read_tag', side_effect=AssertionError('file was read')):
+            songs = self.scan(second)
+        self.assertEqual((3, 0), (second.hits, second.misses))
+        self.assertEqual(['title0', 'title1', 'title2'], [song.title for song in songs])
+        self.assertEqual(self.paths, [song.path for song in songs])
+        self.assertFalse(any(song.has_lyrics() for song in songs))
+
+    def test_changed_file_is_read_again(self):
+        self.scan(ScanManifest(self.manifest_path))
+        write_song(self.paths[1], title='changed title with a longer name')
+        manifest = ScanManifest(self.manifest_path)
+        songs = self.scan(manifest)
+        self.assertEqual((2, 1), (manifest.hits, manifest.misses))
+        self.assertEqual('changed title with a longer name', songs[1].title)
+
+    def test_full_rescan(self):
+        self.scan(ScanManifest(self.manifest_path))
+        manifest = ScanManifest(self.manifest_path, full_rescan=True)
+        self.scan(manifest)
+        self.assertEqual((0, 3), (manifest.hits, manifest.misses))
+
+    def test_embedded_lyrics_are_recorded(self):
+        manifest = ScanManifest(self.manifest_path)
+        song = self.scan(manifest)[0]
+        self.assertTrue(embedd_lyrics_in_song(song, 'some lyrics'))
+        manifest.update(song, has_lyrics=True)
+        manifest.save()
+
+        songs = self.scan(ScanManifest(self.manifest_path))
+        self.assertEqual([True, False, False], [song.has_lyrics() for song in songs])
+
+    def test_deleted_files_are_dropped(self):
+        self.scan(ScanManifest(self.manifest_path))
+        os.remove(self.paths[2])
+        del self.paths[2]
+        self.scan(ScanManifest(self.manifest_path))
+        self.paths.append(os.path.join(self.root, 'song2.mp3'))
+        manifest = ScanManifest(self.manifest_path)
+        self.assertIsNone(manifest.lookup(self.paths[2]))
+
+    def test_corrupted_manifest(self):
+        with open(self.manifest_path, 'w') as f:
+            f.write('{not json')
+        manifest = ScanManifest(self.manifest_path)
+        self.assertEqual(3, len(self.scan(manifest)))
+        self.assertEqual(3, manifest.misses)
+
+
+if __name__ == '__main__':
+    unittest.main()
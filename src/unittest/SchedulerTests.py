@@ -0,0 +1,57 @@
+import threading
+import time
+import unittest
+
+from scheduler import FetchScheduler, TokenBucket
+
+
+class TokenBucketTests(unittest.TestCase):
+
+    def test_first_token_is_free(self):
+        bucket = TokenBucket(interval=10)
+        self.assertEqual(0, bucket.reserve())
+
+    def test_next_token_waits_for_interval(self):
+        bucket = TokenBucket(interval=10)
+        bucket.reserve()
+        self.assertAlmostEqual(10, bucket.reserve(), delta=0.1)
+        self.assertAlmostEqual(20, bucket.reserve(), delta=0.1)
+
+    def test_burst(self):
+        bucket = TokenBucket(interval=10, capacity=2)
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertGreater(bucket.reserve(), 0)
+
+
+class FetchSchedulerTests(unittest.TestCase):
+
+    def test_sources_do_not_block_each_other(self):
+        scheduler = FetchScheduler(['a', 'b', 'c'], interval=0.2, workers=3)
+        start = time.monotonic()
+        scheduler.run(['a', 'b', 'c'], scheduler.wait_turn)
+        self.assertLess(time.monotonic() - start, 0.15)
+
+    def test_same_source_is_rate_limited(self):
+        scheduler = FetchScheduler(['a'], interval=0.1, workers=3)
+        start = time.monotonic()
+        scheduler.run(['a', 'a', 'a'], scheduler.wait_turn)
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_failing_job_does_not_stop_others(self):
+        processed = []
+        lock = threading.Lock()
+
+        def job(item):
+            if item == 2:
+                raise Exception('failure')
+            with lock:
+                processed.append(item)
+
+        scheduler = FetchScheduler([], interval=0, workers=2)
+        self.assertEqual(4, scheduler.run([1, 2, 3, 4], job))
+        self.assertEqual([1, 3, 4], sorted(processed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from mutagen.id3 import ID3, TALB, TIT2, TPE1
+
+from mutagen.flac import FLAC
+from mutagen.mp4 import MP4
+from mutagen.oggvorbis import OggVorbis
+
+from song_helper import REWRITE_PADDING, PaddingStats, embedd_lyrics_in_song, get_song_data, get_song_list, \
+    iter_song_files, scan_song_data
+import song_helper
+
+audio_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test_data', 'audio')
+
+
+def write_song(path: str, artist='artist', album='album', title='title'):
+    tag = ID3()
+    tag.add(TPE1(encoding=3, text=artist))
+    tag.add(TALB(encoding=3, text=album))
+    tag.add(TIT2(encoding=3, text=title))
+    tag.save(path)
+
+
+class ScanSongDataTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(10):
+            path = os.path.join(self.root, f'song{i}.mp3')
+            write_song(path, title=f'title{i}')
+            self.paths.append(path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_threads_keep_order_and_tags(self):
+        songs = list(scan_song_data(self.paths, workers=3, use_processes=False))
+        self.assertEqual([f'title{i}' for i in range(10)], [song.title for song in songs])
+        self.assertEqual(self.paths, [song.path for song in songs])
+        self.assertTrue(all(song.tag is not None for song in songs))
+
+    def test_processes_drop_tags(self):
+        songs = list(scan_song_data(self.paths, workers=2, use_processes=True))
+        self.assertEqual([f'title{i}' for i in range(10)], [song.title for song in songs])
+        self.assertTrue(all(song.tag is None for song in songs))
+
+    def test_unreadable_files_are_skipped(self):
+        broken = os.path.join(self.root, 'broken.mp3')
+        with open(broken, 'w') as f:
+            f.write('not a song')
+        no_title = os.path.join(self.root, 'no_title.mp3')
+        ID3().save(no_title)
+        songs = list(scan_song_data([broken, self.paths[0], no_title, self.paths[1]], workers=2,
+                                    use_processes=False))
+        self.assertEqual(['title0', 'title1'], [song.title for song in songs])
+
+    def test_is_lazy(self):
+        def paths():
+            # One worker reads at most 4 files ahead
+            yield from self.paths[:4]
+            raise AssertionError('Read past first songs')
+
+        songs = scan_song_data(paths(), workers=1, use_processes=False)
+        self.assertEqual('title0', next(songs).title)
+
+    def test_embed_reopens_dropped_tag(self):
+        song = next(scan_song_data(self.paths, workers=1, use_processes=True))
+        embedd_lyrics_in_song(song, 'some lyrics')
+        self.assertEqual('some lyrics', get_song_data(self.paths[0]).lyrics)
+
+
+class IterSongFilesTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        for path in ['a/1.mp3', 'a/2.FLAC', 'a/cover.jpg', 'a/b/3.Ogg', 'c/4.wma', '.hidden/5.mp3', 'a/.6.mp3',
+                     'top.m4a', 'not_audio.mp3.txt']:
+            path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'w').close()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def relative(self, paths):
+        return [os.path.relpath(path, self.root).replace(os.sep, '/') for path in paths]
+
+    def test_single_pass_in_name_order(self):
+        self.assertEqual(['top.m4a', 'a/1.mp3', 'a/2.FLAC', 'a/b/3.Ogg', 'c/4.wma'],
+                         self.relative(iter_song_files(self.root)))
+        self.assertEqual(self.relative(iter_song_files(self.root)), self.relative(get_song_list(self.root)))
+
+    def test_hidden(self):
+        files = self.relative(iter_song_files(self.root, skip_hidden=False))
+        self.assertIn('.hidden/5.mp3', files)
+        self.assertIn('a/.6.mp3', files)
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'symlinks are not supported')
+    def test_symlinks(self):
+        try:
+            os.symlink(os.path.join(self.root, 'c'), os.path.join(self.root, 'a', 'link'))
+            # Loop back to the root must not be walked forever
+            os.symlink(self.root, os.path.join(self.root, 'c', 'loop'))
+        except OSError:
+            self.skipTest('symlinks are not permitted')
+        self.assertNotIn('a/link/4.wma', self.relative(iter_song_files(self.root)))
+        files = self.relative(iter_song_files(self.root, follow_symlinks=True))
+        self.assertEqual(1, len([path for path in files if path.endswith('4.wma')]))
+        self.assertEqual(5, len(files))
+
+    def test_missing_dir(self):
+        self.assertEqual([], list(iter_song_files(os.path.join(self.root, 'missing'))))
+
+
+class PaddingTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.stats = PaddingStats()
+        self.patcher = mock.patch.object(song_helper, 'padding_stats', self.stats)
+        self.patcher.start()
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def copy_without_padding(self, song_format: str) -> str:
+        path = os.path.join(self.root, 'song.' + song_format)
+        shutil.copy(os.path.join(audio_path, 'song.' + song_format), path)
+        tags = {'mp3': ID3, 'flac': FLAC, 'ogg': OggVorbis, 'm4a': MP4}
+        tags[song_format](path).save(padding=lambda info: 0)
+        return path
+
+    def test_rewrite_reserves_padding_for_next_writes(self):
+        for song_format in ('mp3', 'flac', 'ogg', 'm4a'):
+            with self.subTest(song_format=song_format):
+                path = self.copy_without_padding(song_format)
+                size = os.path.getsize(path)
+                self.assertTrue(embedd_lyrics_in_song(get_song_data(path), 'lyrics ' * 100))
+                self.assertEqual([0, 1], self.stats.counts[song_format])
+                self.assertGreaterEqual(os.path.getsize(path), size + REWRITE_PADDING)
+
+                size = os.path.getsize(path)
+                self.assertTrue(embedd_lyrics_in_song(get_song_data(path), 'longer lyrics ' * 1000))
+                self.assertEqual([1, 1], self.stats.counts[song_format])
+                self.assertEqual(size, os.path.getsize(path))
+                self.assertEqual('longer lyrics ' * 999 + 'longer lyrics', get_song_data(path).lyrics)
+
+    def test_large_padding_is_kept(self):
+        path = self.copy_without_padding('mp3')
+        ID3(path).save(padding=lambda info: 200 * 1024)
+        size = os.path.getsize(path)
+        self.assertTrue(embedd_lyrics_in_song(get_song_data(path), 'lyrics'))
+        self.assertEqual(1, self.stats.in_place())
+        self.assertEqual(size, os.path.getsize(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
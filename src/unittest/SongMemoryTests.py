@@ -0,0 +1,81 @@
+import gc
+import os.path
+import shutil
+import tempfile
+import tracemalloc
+import unittest
+
+from mutagen.id3 import APIC, ID3
+
+from lyrico.config import Config
+from lyrico.song import Song
+from song_helper import get_song_data
+
+audio_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test_data', 'audio')
+
+SONGS = 20
+ARTWORK_SIZE = 64 * 1024
+# Upper bound of what a released song may keep: names, path and a few flags
+RELEASED_SONG_BYTES = 2048
+
+
+class SongMemoryTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(SONGS):
+            path = os.path.join(self.root, f'song{i}.mp3')
+            shutil.copy(os.path.join(audio_path, 'song.mp3'), path)
+            tag = ID3(path)
+            tag.add(APIC(encoding=3, mime='image/png', type=3, desc='cover', data=os.urandom(ARTWORK_SIZE)))
+            tag.save()
+            self.paths.append(path)
+        tracemalloc.start()
+
+    def tearDown(self) -> None:
+        tracemalloc.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    @staticmethod
+    def traced() -> int:
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+
+    def assertReleased(self, start: int, loaded: int, released: int):
+        per_song_loaded = (loaded - start) / SONGS
+        per_song_released = (released - start) / SONGS
+        self.assertGreater(per_song_loaded, ARTWORK_SIZE)
+        self.assertLess(per_song_released, RELEASED_SONG_BYTES)
+
+    def test_song_data_release_tag(self):
+        start = self.traced()
+        songs = [get_song_data(path) for path in self.paths]
+        loaded = self.traced()
+        for song in songs:
+            song.release_tag()
+        released = self.traced()
+        self.assertReleased(start, loaded, released)
+        self.assertFalse(hasattr(songs[0], '__dict__'))
+        self.assertEqual('Title', songs[0].title)
+
+    def test_lyrico_song_release(self):
+        saved = Config.lyrics_dir, Config.lyric_files_in_dir
+        Config.lyrics_dir = self.root
+        Config.lyric_files_in_dir = None
+        try:
+            Config.lyrics_file_exists(self.paths[0])  # build the index before measuring
+            start = self.traced()
+            songs = [Song(path) for path in self.paths]
+            loaded = self.traced()
+            results = [song.release() for song in songs]
+            del songs
+            released = self.traced()
+        finally:
+            Config.lyrics_dir, Config.lyric_files_in_dir = saved
+        self.assertReleased(start, loaded, released)
+        self.assertFalse(hasattr(results[0], '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+from typing import Optional
+
+from song_data import SongData
+from source_ranking import SourceRanking, expected_requests
+from sources.lyrics_source import LyricsSource
+
+
+class NamedSource(LyricsSource):
+    def is_album(self) -> bool:
+        return False
+
+    def prepare_request(self, song_data: SongData):
+        return None, None
+
+    def parse_lyrics(self, html: str, song_title) -> Optional[str]:
+        return None
+
+
+def song(artist: str) -> SongData:
+    return SongData(None, artist, 'album', 'title', None, 'mp3')
+
+
+def names(sources) -> list:
+    return [source.get_name() for source in sources]
+
+
+class SourceRankingTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.ranking_path = os.path.join(self.root, 'ranking.json')
+        self.sources = [NamedSource('DarkLyrics'), NamedSource('LyricsMode'), NamedSource('MusixMatch')]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def record(self, ranking: SourceRanking, artist: str, source_name: str, found: int, missed: int,
+               seconds: float = 1.0):
+        for _ in range(found):
+            ranking.record(song(artist), source_name, True, seconds)
+        for _ in range(missed):
+            ranking.record(song(artist), source_name, False, seconds)
+
+    def test_configured_order_without_stats(self):
+        ranking = SourceRanking(self.ranking_path)
+        self.assertEqual(['DarkLyrics', 'LyricsMode', 'MusixMatch'], names(ranking.order(song('a'), self.sources)))
+        self.assertEqual(0, ranking.reordered)
+
+    def test_sources_with_higher_hit_rate_go_first(self):
+        ranking = SourceRanking(self.ranking_path)
+        self.record(ranking, 'a', 'DarkLyrics', 0, 10)
+        self.record(ranking, 'a', 'MusixMatch', 8, 2)
+        self.assertEqual(['MusixMatch', 'LyricsMode', 'DarkLyrics'], names(ranking.order(song('a'), self.sources)))
+        self.assertEqual(1, ranking.reordered)
+        self.assertGreater(ranking.expected_saved, 0)
+
+    def test_artist_stats_win_over_overall_stats(self):
+        ranking = SourceRanking(self.ranking_path)
+        self.record(ranking, 'pop', 'DarkLyrics', 0, 20)
+        self.record(ranking, 'pop', 'MusixMatch', 20, 0)
+        self.record(ranking, 'metal', 'DarkLyrics', 5, 0)
+        self.record(ranking, 'metal', 'MusixMatch', 0, 5)
+        self.assertEqual('MusixMatch', names(ranking.order(song('pop'), self.sources))[0])
+        self.assertEqual('DarkLyrics', names(ranking.order(song('metal'), self.sources))[0])
+        # Unknown artist follows overall stats
+        self.assertEqual('MusixMatch', names(ranking.order(song('new'), self.sources))[0])
+
+    def test_faster_source_first_on_same_hit_rate(self):
+        ranking = SourceRanking(self.ranking_path)
+        for source in self.sources:
+            seconds = 0.5 if source.get_name() == 'MusixMatch' else 3.0
+            self.record(ranking, 'a', source.get_name(), 5, 5, seconds)
+        self.assertEqual('MusixMatch', names(ranking.order(song('a'), self.sources))[0])
+
+    def test_unmeasured_source_after_measured_on_same_hit_rate(self):
+        ranking = SourceRanking(self.ranking_path)
+        # 6/12 smoothed hit rate, same as a source without stats
+        self.record(ranking, 'a', 'MusixMatch', 5, 5, 3.0)
+        self.assertEqual(['MusixMatch', 'DarkLyrics', 'LyricsMode'], names(ranking.order(song('a'), self.sources)))
+
+    def test_stats_persist(self):
+        ranking = SourceRanking(self.ranking_path)
+        self.record(ranking, 'a', 'LyricsMode', 10, 0)
+        ranking.save()
+        loaded = SourceRanking(self.ranking_path)
+        self.assertEqual('LyricsMode', names(loaded.order(song('a'), self.sources))[0])
+
+    def test_disabled_ranking_keeps_order(self):
+        ranking = SourceRanking(self.ranking_path, enabled=False)
+        self.record(ranking, 'a', 'MusixMatch', 10, 0)
+        self.assertEqual(['DarkLyrics', 'LyricsMode', 'MusixMatch'], names(ranking.order(song('a'), self.sources)))
+
+    def test_expected_requests(self):
+        self.assertEqual(1.0, expected_requests([1.0, 0.5]))
+        self.assertEqual(1.5, expected_requests([0.5, 1.0]))
+        self.assertEqual(3.0, expected_requests([0.0, 0.0, 0.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
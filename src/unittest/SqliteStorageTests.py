@@ -0,0 +1,113 @@
+import gzip
+import os.path
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from song_data import SongData
+from sqlite_storage import SqliteStorage, GZIP
+
+existing_sources_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     '..', '..', 'test_data', 'storage', 'existing_sources')
+
+
+def song(artist='artist', album='album', title='title') -> SongData:
+    return SongData(None, artist, album, title, None, None)
+
+
+class SqliteStorageTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.root, 'html.sqlite')
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_store_and_load_song(self):
+        storage = SqliteStorage(self.db_path)
+        storage.store('source_x', song(), 'dummy_text', False)
+        self.assertEqual('dummy_text', storage.load('source_x', song(), False))
+        self.assertEqual(['source_x'], storage.get_sources(song()))
+
+    def test_album_page_is_shared_by_titles(self):
+        storage = SqliteStorage(self.db_path)
+        storage.store('album_source', song(title='title1'), 'album_text', True)
+        storage.store('song_source', song(title='title1'), 'song_text', False)
+        self.assertEqual(['album_source', 'song_source'], storage.get_sources(song(title='title1')))
+        self.assertEqual(['album_source'], storage.get_sources(song(title='title2')))
+        self.assertEqual('album_text', storage.load('album_source', song(title='title2'), is_album=True))
+
+    def test_load_missing(self):
+        storage = SqliteStorage(self.db_path)
+        with self.assertRaises(FileNotFoundError):
+            storage.load('source_x', song())
+
+    def test_store_empty_text(self):
+        storage = SqliteStorage(self.db_path)
+        with self.assertRaises(Exception):
+            storage.store('source_x', song(), None)
+
+    def test_compressed_pages(self):
+        storage = SqliteStorage(self.db_path, GZIP)
+        text = 'Привет <html>' * 100
+        storage.store('source_x', song(), text)
+        self.assertEqual(text, SqliteStorage(self.db_path).load('source_x', song()))
+        body = sqlite3.connect(self.db_path).execute('SELECT body FROM pages').fetchone()[0]
+        self.assertEqual(text, gzip.decompress(body).decode('UTF-8'))
+
+    def test_pages_persist(self):
+        SqliteStorage(self.db_path).store('source_x', song(), 'dummy_text')
+        self.assertEqual('dummy_text', SqliteStorage(self.db_path).load('source_x', song()))
+
+    def test_store_from_threads(self):
+        storage = SqliteStorage(self.db_path)
+        threads = [threading.Thread(target=storage.store, args=(f'source{i}', song(), 'text')) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(8, len(storage.get_sources(song())))
+
+    def test_import_tree(self):
+        storage = SqliteStorage(self.db_path)
+        self.assertEqual(6, storage.import_tree(existing_sources_path))
+        sources = storage.get_sources(song())
+        self.assertEqual(['source3', 'source1', 'source2'], sources[:1] + sorted(sources[1:]))
+        self.assertEqual('source_3_text', storage.load('source3', song(), is_album=True))
+        self.assertEqual('source_2_text', storage.load('source2', song(), is_album=False))
+        sources = storage.get_sources(song('artist2', 'albumX', 'title1'))
+        self.assertIn('sourcX', sources)
+        self.assertIn('album_source', sources)
+        self.assertNotIn('sourceY', sources)
+
+    def test_metadata_is_stored_with_page(self):
+        storage = SqliteStorage(self.db_path)
+        storage.store('source_x', song(), 'text', metadata={'etag': '"v1"', 'last_modified': 'Mon, 01 Jan 2024'})
+        self.assertEqual({'etag': '"v1"', 'last_modified': 'Mon, 01 Jan 2024'},
+                         storage.load_metadata('source_x', song()))
+        storage.store_metadata('source_x', song(), {'etag': '"v2"'})
+        self.assertEqual({'etag': '"v2"'}, storage.load_metadata('source_x', song()))
+        storage.store('source_x', song(), 'new text')
+        self.assertEqual({}, storage.load_metadata('source_x', song()))
+        self.assertEqual({}, storage.load_metadata('missing', song()))
+
+    def test_metadata_columns_are_added_to_old_database(self):
+        connection = sqlite3.connect(self.db_path)
+        connection.execute('''CREATE TABLE pages (artist TEXT NOT NULL, album TEXT NOT NULL, title TEXT NOT NULL,
+            source TEXT NOT NULL, compression TEXT NOT NULL, body BLOB NOT NULL,
+            PRIMARY KEY (artist, album, title, source))''')
+        connection.execute("INSERT INTO pages VALUES ('artist', 'album', 'title', 'source_x', 'none', X'74657874')")
+        connection.commit()
+        connection.close()
+        storage = SqliteStorage(self.db_path)
+        self.assertEqual({}, storage.load_metadata('source_x', song()))
+        storage.store_metadata('source_x', song(), {'etag': '"v1"'})
+        self.assertEqual({'etag': '"v1"'}, storage.load_metadata('source_x', song()))
+        self.assertEqual('text', storage.load('source_x', song()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 import logging
 import os.path
 import shutil
+import tempfile
 import unittest
+from unittest import mock
 
 from song_data import SongData
 from storage import Storage
@@ -62,6 +64,43 @@ class StorageTests(unittest.TestCase):
         self.assertNotIn('sourcX', sources)
 
 
+class StorageIndexTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_index_is_updated_on_store(self):
+        storage = Storage(self.root)
+        song = SongData(None, 'artist', 'album', 'title', None, None)
+        self.assertEqual([], storage.get_sources(song))
+        storage.store('album_source', song, 'album_text', True)
+        storage.store('song_source', song, 'song_text', False)
+        storage.store('song_source', song, 'song_text_2', False)
+        self.assertEqual(['album_source', 'song_source'], storage.get_sources(song))
+        other_song = SongData(None, 'artist', 'album', 'other', None, None)
+        self.assertEqual(['album_source'], storage.get_sources(other_song))
+
+    def test_index_is_built_from_existing_tree(self):
+        song = SongData(None, 'artist', 'album', 'title', None, None)
+        Storage(self.root).store('source_x', song, 'text', False)
+        self.assertEqual(['source_x'], Storage(self.root).get_sources(song))
+
+    def test_store_does_not_walk_tree(self):
+        song = SongData(None, 'artist', 'album', 'title', None, None)
+        storage = Storage(self.root)
+        with mock.patch('storage.walk') as walk:
+            storage.store('source_x', song, 'text', False)
+        walk.assert_not_called()
+        self.assertEqual(['source_x'], storage.get_sources(song))
+
+    def test_artist_with_path_separator(self):
+        song = SongData(None, 'AC/DC', 'album', 'title', None, None)
+        Storage(self.root).store('source_x', song, 'text', True)
+        self.assertEqual(['source_x'], Storage(self.root).get_sources(song))
+
 
 if __name__ == '__main__':
     unittest.main()
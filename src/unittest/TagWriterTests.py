@@ -0,0 +1,119 @@
+import json
+import os.path
+import shutil
+import tempfile
+import threading
+import unittest
+
+from song_data import SongData
+from song_helper import get_song_data
+from tag_writer import TagWriter, read_journal
+
+audio_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'test_data', 'audio')
+
+
+def song(title: str, path=None) -> SongData:
+    return SongData(None, 'artist', 'album', title, None, 'mp3', path=path)
+
+
+class TagWriterTests(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.root = tempfile.mkdtemp()
+        self.journal = os.path.join(self.root, 'journal.jsonl')
+        self.written = []
+        self.lock = threading.Lock()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def fake_embed(self, song_data: SongData, lyrics: str) -> bool:
+        with self.lock:
+            self.written.append((song_data.title, lyrics))
+        return lyrics != 'fail'
+
+    def test_writes_are_flushed_on_close(self):
+        on_written = []
+        writer = TagWriter(self.journal, workers=3, fsync_batch=4, on_written=on_written.append,
+                           embed=self.fake_embed).start()
+        for i in range(20):
+            writer.submit(song(f'title{i}'), f'lyrics{i}')
+        writer.close()
+        self.assertEqual(sorted((f'title{i}', f'lyrics{i}') for i in range(20)), sorted(self.written))
+        self.assertEqual(20, len(on_written))
+        self.assertEqual(20, len(writer.latencies['mp3']))
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_failed_writes_are_not_replayed(self):
+        on_written = []
+        writer = TagWriter(self.journal, on_written=on_written.append, embed=self.fake_embed).start()
+        writer.submit(song('title'), 'fail')
+        writer.close()
+        self.assertEqual(1, writer.failed)
+        self.assertEqual([], on_written)
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_pending_writes_are_replayed(self):
+        blocked = threading.Event()
+
+        def stuck_embed(song_data, lyrics):
+            blocked.wait()
+            return True
+
+        interrupted = TagWriter(self.journal, workers=1, embed=stuck_embed).start()
+        interrupted.submit(song('title1'), 'lyrics1')
+        interrupted.submit(song('title2'), 'lyrics2')
+        # Run is interrupted: nothing was marked done and a half written line is left behind
+        with open(self.journal, 'a', encoding='UTF-8') as f:
+            f.write('{"op": "pend')
+        self.assertEqual(['title1', 'title2'], [entry['title'] for entry in read_journal(self.journal)])
+
+        writer = TagWriter(self.journal, embed=self.fake_embed).start()
+        writer.close()
+        blocked.set()
+        self.assertEqual(2, writer.replayed)
+        self.assertEqual([('title1', 'lyrics1'), ('title2', 'lyrics2')], sorted(self.written))
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_journal_keeps_only_pending_writes(self):
+        with open(self.journal, 'w', encoding='UTF-8') as f:
+            for i in range(3):
+                f.write(json.dumps({'op': 'pending', 'id': i, 'path': None, 'format': 'mp3', 'artist': 'artist',
+                                    'album': 'album', 'title': f'title{i}', 'lyrics': 'lyrics'}) + '\n')
+            f.write(json.dumps({'op': 'done', 'ids': [0, 2]}) + '\n')
+        self.assertEqual(['title1'], [entry['title'] for entry in read_journal(self.journal)])
+
+    def test_backlog_is_bounded(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_embed(song_data, lyrics):
+            started.set()
+            release.wait()
+            return True
+
+        writer = TagWriter(self.journal, workers=1, max_backlog=2, embed=slow_embed).start()
+        writer.submit(song('title0'), 'lyrics')
+        started.wait()
+        writer.submit(song('title1'), 'lyrics')
+        writer.submit(song('title2'), 'lyrics')
+        blocked = threading.Thread(target=writer.submit, args=(song('title3'), 'lyrics'))
+        blocked.start()
+        blocked.join(0.2)
+        self.assertTrue(blocked.is_alive())
+        release.set()
+        blocked.join()
+        writer.close()
+        self.assertEqual(4, len(writer.latencies['mp3']))
+
+    def test_embeds_into_file(self):
+        path = os.path.join(self.root, 'song.mp3')
+        shutil.copy(os.path.join(audio_path, 'song.mp3'), path)
+        writer = TagWriter(self.journal).start()
+        writer.submit(song('Title', path), 'some lyrics')
+        writer.close()
+        self.assertEqual('some lyrics', get_song_data(path).lyrics)
+
+
+if __name__ == '__main__':
+    unittest.main()